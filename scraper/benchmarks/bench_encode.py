@@ -0,0 +1,107 @@
+# benchmarks/bench_encode.py
+"""Items encoded per second and output size, old json.dumps path against the encoder module.
+
+    python benchmarks/bench_encode.py [--items 100000]
+"""
+import argparse
+import gzip
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+
+import encoder  # noqa: E402
+from data_types import BookItem, QuoteItem, as_dict  # noqa: E402
+from encoder import BatchWriter, _stdlib_encode, encode  # noqa: E402
+
+CATEGORIES = ["Travel", "Mystery", "Historical Fiction", "Sequential Art", "Classics", "Philosophy"]
+TAGS = ["love", "inspirational", "life", "humor", "books", "reading", "friendship", "truth"]
+
+
+def make_items(n):
+    """Half books, half quotes, with the repetition of a real catalogue."""
+    items = []
+    for i in range(n):
+        if i % 2:
+            items.append(QuoteItem(
+                id=f"quote-{i:08d}", type="quote", text=f"Quote number {i}, long enough to look like a real one. " * 2,
+                author=f"Author {i % 50}", tags=TAGS[i % 5:i % 5 + 3],
+                page_url=f"https://quotes.toscrape.com/page/{i // 10}/", author_id=f"author-{i % 50:04d}",
+            ))
+        else:
+            items.append(BookItem(
+                id=f"book-{i:08d}", type="book", title=f"Book title number {i}", price=10 + i % 5000 / 100,
+                availability=f"In stock ({i % 22} available)", rating=i % 5 + 1,
+                category=CATEGORIES[i % len(CATEGORIES)],
+                product_url=f"https://books.toscrape.com/catalogue/book-{i}_{i}/index.html",
+            ))
+    return items
+
+
+def old_path(items, path):
+    """What the sink did before: one json.dumps per item with a __dict__-style default, text writes."""
+    with path.open("w", encoding="utf-8") as f:
+        for item in items:
+            f.write(json.dumps(item, default=as_dict, ensure_ascii=False) + "\n")
+
+
+def batched(encode_one):
+    def write(items, path):
+        with path.open("wb") as f:
+            batch = BatchWriter(f)
+            for item in items:
+                batch.write(encode_one(item) + b"\n")
+            batch.drain()
+    return write
+
+
+def timed(write, items, path):
+    started = time.perf_counter()
+    write(items, path)
+    return time.perf_counter() - started
+
+
+def main(argv=None):
+    args_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    args_parser.add_argument("--items", type=int, default=100_000)
+    args = args_parser.parse_args(argv)
+
+    items = make_items(args.items)
+    paths = {
+        "json.dumps per item (old)": old_path,
+        "stdlib encoder, batched": batched(lambda item: _stdlib_encode(item).encode("utf-8")),
+    }
+    if encoder.orjson is not None:
+        paths["orjson, batched"] = batched(encode)
+    else:
+        print("orjson is not installed; pip install orjson to benchmark the fast path")
+
+    with tempfile.TemporaryDirectory() as scratch:
+        path = Path(scratch) / "items.jsonl"
+        baseline = None
+        print(f"{'path':<28}{'items/s':>12}{'MB':>10}{'speed-up':>10}")
+        for name, write in paths.items():
+            timed(write, items[:1000], path)  # warm-up
+            seconds = timed(write, items, path)
+            baseline = baseline or seconds
+            size = path.stat().st_size
+            print(f"{name:<28}{len(items) / seconds:>12,.0f}{size / 1e6:>10.1f}{baseline / seconds:>9.1f}x")
+
+        raw = path.read_bytes()
+        print(f"\n{'compression':<28}{'MB':>10}{'ratio':>10}{'seconds':>10}")
+        for name in ("gzip", "zstd"):
+            if name == "zstd" and encoder.zstandard is None:
+                print(f"{name:<28}  (pip install zstandard)")
+                continue
+            started = time.perf_counter()
+            packed = gzip.compress(raw, 6, mtime=0) if name == "gzip" else encoder.zstandard.ZstdCompressor(level=10).compress(raw)
+            seconds = time.perf_counter() - started
+            print(f"{name:<28}{len(packed) / 1e6:>10.1f}{len(raw) / len(packed):>9.1f}x{seconds:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
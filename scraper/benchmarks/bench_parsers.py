@@ -0,0 +1,71 @@
+# benchmarks/bench_parsers.py
+"""Pages parsed per second for each parser backend, on the test fixtures.
+
+    python benchmarks/bench_parsers.py [--seconds 2]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+
+from html_backend import BACKENDS, get_backend, use_backend  # noqa: E402
+from parser import cache_author_page, extract_author_urls, parse_book_page, parse_quotes_from_a_page  # noqa: E402
+from pagination import get_quotes_next_page_url  # noqa: E402
+
+FIXTURES = ROOT / "tests" / "fixtures"
+BOOK_URL = "https://books.toscrape.com/catalogue/the-long-shadow-of-small-ghosts-murder-and-memory-in-an-american-city_848/index.html"
+QUOTES_URL = "https://quotes.toscrape.com/"
+
+
+def rate(fn, seconds):
+    """Call fn repeatedly for about `seconds`; return calls per second."""
+    fn()  # warm-up
+    calls = 0
+    started = time.perf_counter()
+    while (elapsed := time.perf_counter() - started) < seconds:
+        fn()
+        calls += 1
+    return calls / elapsed
+
+
+def main(argv=None):
+    args_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    args_parser.add_argument("--seconds", type=float, default=2.0, help="time spent on each measurement")
+    args = args_parser.parse_args(argv)
+
+    book_html = (FIXTURES / "sample_book_page.html").read_text(encoding="utf-8")
+    quote_html = (FIXTURES / "sample_quote_page.html").read_text(encoding="utf-8")
+    # Quote parsing looks up author details; seed the cache so nothing goes to the network.
+    for url in extract_author_urls(quote_html):
+        cache_author_page(url, None)
+
+    def quotes_page():
+        # What the crawl does per quotes page: one tree for items, authors and the next link.
+        tree = get_backend().tree(quote_html)
+        parse_quotes_from_a_page(QUOTES_URL, tree)
+        extract_author_urls(tree)
+        get_quotes_next_page_url(tree, QUOTES_URL)
+
+    results = {}
+    for name in BACKENDS:
+        use_backend(name)
+        results[name] = {
+            "book pages/s": rate(lambda: parse_book_page(BOOK_URL, None, book_html), args.seconds),
+            "quote pages/s": rate(quotes_page, args.seconds),
+        }
+
+    columns = list(next(iter(results.values())))
+    print(f"{'backend':<8}" + "".join(f"{c:>16}" for c in columns))
+    for name, row in results.items():
+        print(f"{name:<8}" + "".join(f"{row[c]:>16.1f}" for c in columns))
+    baseline = results["bs4"]
+    for name, row in results.items():
+        if name != "bs4":
+            print(f"{name} speed-up: " + ", ".join(f"{c} x{row[c] / baseline[c]:.1f}" for c in columns))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+# benchmarks/fakesite.py
+"""Local stand-in for books.toscrape.com and quotes.toscrape.com, built from the test fixtures.
+
+    python benchmarks/fakesite.py [--categories 10] [--books-per-category 60] [--quote-pages 20]
+                                  [--latency 0.02] [--error-rate 0.01] [--duplicates 0.1] [--seed 0]
+
+Serves the two sites on two local ports and prints "books=<url> quotes=<url>"
+once both are listening. Every page is one of the saved fixtures with its
+title, price, category, rating and so on rewritten, so page sizes and markup
+match the real sites. --latency delays every response; --error-rate answers
+that share of page requests with a 503 (robots.txt is always served).
+--duplicates also lists that share of each listing page's books under the
+next category, half through a second spelling of the book's URL and half
+through a "-reissue" URL serving the same page.
+"""
+import argparse
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+FIXTURES = Path(__file__).resolve().parent.parent / "tests" / "fixtures"
+BOOKS_PER_PAGE = 20
+RATINGS = ["One", "Two", "Three", "Four", "Five"]
+ROBOTS_TXT = "User-agent: *\nDisallow:\n"
+
+# Values in the fixtures that each generated page replaces.
+FIXTURE_TITLE = "The Long Shadow of Small Ghosts: Murder and Memory in an American City"
+FIXTURE_PRICE = "£10.97"
+FIXTURE_AVAILABILITY = "In stock (15 available)"
+FIXTURE_CATEGORY = 'books/crime_51/index.html">Crime</a>'
+FIXTURE_UPC = "abeafe151a587d3b"
+
+
+class Catalogue:
+    """Every page of a synthetic books + quotes site, generated on demand from the fixtures."""
+
+    def __init__(self, categories=10, books_per_category=60, quote_pages=20, seed=0, duplicates=0.0):
+        self.categories = [(f"Category {n}", f"category-{n}_{n}") for n in range(1, categories + 1)]
+        self.books_per_category = books_per_category
+        self.quote_pages = quote_pages
+        self.seed = seed
+        self.duplicates = duplicates
+
+        # Absolute links in the fixtures become site-relative, so they resolve against this server.
+        book = (FIXTURES / "sample_book_page.html").read_text(encoding="utf-8")
+        self._book = book.replace("https://books.toscrape.com/", "/")
+        quotes = (FIXTURES / "sample_quote_page.html").read_text(encoding="utf-8")
+        self._quotes = quotes.replace("https://quotes.toscrape.com/", "/")
+        self._product_pod = re.search(r'<article class="product_pod">.*?</article>', self._book, re.S).group(0)
+        self._head = self._book[: self._book.index("<body")]
+        self.authors = sorted(set(re.findall(r'href="/author/([^"]+)"', self._quotes)))
+
+    # ----- books -----
+
+    def category_pages(self):
+        return -(-self.books_per_category // BOOKS_PER_PAGE)
+
+    def book_slug(self, category, n):
+        return f"{self.categories[category][1]}-book-{n}_{category * self.books_per_category + n}"
+
+    def home(self):
+        links = "".join(
+            f'<li><a href="catalogue/category/books/{slug}/index.html">\n{name}\n</a></li>'
+            for name, slug in self.categories
+        )
+        return self._listing(f'<div class="side_categories"><ul><li><ul>{links}</ul></li></ul></div>', "")
+
+    def category_page(self, slug, page):
+        category = next((i for i, (_, s) in enumerate(self.categories) if s == slug), None)
+        if category is None or not 1 <= page <= self.category_pages():
+            return None
+        first = (page - 1) * BOOKS_PER_PAGE
+        pods = []
+        for n in range(first, min(first + BOOKS_PER_PAGE, self.books_per_category)):
+            slug_n = self.book_slug(category, n)
+            pods.append(re.sub(
+                r'href="[^"]*"', f'href="../../../{slug_n}/index.html"', self._product_pod
+            ))
+        rng = random.Random(f"{self.seed}:{slug}:{page}")
+        other = (category + 1) % len(self.categories)
+        for n in range(first, min(first + BOOKS_PER_PAGE, self.books_per_category)):
+            if rng.random() < self.duplicates:
+                slug_n = self.book_slug(other, n)
+                href = f"{slug_n}-reissue/" if rng.random() < 0.5 else f"./{slug_n}/index.html?ref=listing"
+                pods.append(re.sub(r'href="[^"]*"', f'href="../../../{href}"', self._product_pod))
+        pager = f'<ul class="pager"><li class="current">Page {page} of {self.category_pages()}</li>'
+        if page < self.category_pages():
+            pager += f'<li class="next"><a href="page-{page + 1}.html">next</a></li>'
+        return self._listing("".join(pods), pager + "</ul>")
+
+    def book_page(self, slug):
+        slug = slug.removesuffix("-reissue")  # same book, same page
+        match = re.fullmatch(r"(category-(\d+)_\d+)-book-(\d+)_\d+", slug)
+        if not match or not 1 <= int(match.group(2)) <= len(self.categories):
+            return None
+        category, n = int(match.group(2)) - 1, int(match.group(3))
+        if n >= self.books_per_category:
+            return None
+        rng = random.Random(f"{self.seed}:{slug}")
+        name, category_slug = self.categories[category]
+        html = self._book.replace(FIXTURE_TITLE, f"Synthetic Book {category + 1}.{n}")
+        html = html.replace(FIXTURE_PRICE, f"£{rng.uniform(10, 60):.2f}", 1)
+        html = html.replace(FIXTURE_AVAILABILITY, f"In stock ({rng.randint(1, 22)} available)")
+        html = html.replace(FIXTURE_CATEGORY, f'books/{category_slug}/index.html">{name}</a>')
+        html = html.replace(FIXTURE_UPC, f"{rng.getrandbits(64):016x}")
+        return html.replace("star-rating One", f"star-rating {rng.choice(RATINGS)}", 1)
+
+    def _listing(self, content, pager):
+        return f"{self._head}<body><div class=\"page_inner\">{content}{pager}</div></body></html>"
+
+    # ----- quotes -----
+
+    def quotes_page(self, page):
+        if page < 1:
+            return None
+        if page > self.quote_pages:
+            # Like the real site: past the last page is a 200 without quotes or a next link.
+            return f"{self._head}<body><div class=\"col-md-8\">No quotes found!</div></body></html>"
+        html = re.sub(r'(<span class="text" itemprop="text">“)', rf"\1({page}) ", self._quotes)
+        if page < self.quote_pages:
+            return html.replace('href="/page/2/"', f'href="/page/{page + 1}/"')
+        return re.sub(r'<li class="next">.*?</li>', "", html, flags=re.S)
+
+    def author_page(self, slug):
+        if slug not in self.authors:
+            return None
+        name = slug.replace("-", " ")
+        return (
+            f"<html><body><div class=\"author-details\"><h3 class=\"author-title\">{name}</h3>"
+            f"<p><strong>Born:</strong> <span class=\"author-born-date\">March 14, 1879</span> "
+            f"<span class=\"author-born-location\">in Ulm, Germany</span></p>"
+            f"<div class=\"author-description\">Synthetic biography of {name}.</div></div></body></html>"
+        )
+
+    # ----- routing -----
+
+    def books_route(self, path):
+        if path in ("/", "/index.html"):
+            return self.home()
+        parts = path.strip("/").split("/")
+        if parts[:3] == ["catalogue", "category", "books"] and len(parts) == 5:
+            leaf = parts[4]
+            page = 1 if leaf == "index.html" else int(leaf[5:-5]) if re.fullmatch(r"page-\d+\.html", leaf) else 0
+            return self.category_page(parts[3], page)
+        if parts[0] == "catalogue" and len(parts) == 3:
+            return self.book_page(parts[1])
+        return None
+
+    def quotes_route(self, path):
+        if path == "/":
+            return self.quotes_page(1)
+        parts = path.strip("/").split("/")
+        if parts[0] == "page" and len(parts) == 2 and parts[1].isdigit():
+            return self.quotes_page(int(parts[1]))
+        if parts[0] == "author" and len(parts) == 2:
+            return self.author_page(parts[1])
+        return None
+
+
+def _handler(route, latency, error_rate, seed):
+    rng = random.Random(seed)
+    rng_lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Headers and body go out in separate writes; with Nagle on, every keep-alive response stalls ~40ms.
+        disable_nagle_algorithm = True
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            if latency:
+                time.sleep(latency)
+            path = self.path.split("?", 1)[0]
+            if path == "/robots.txt":
+                return self._send(200, ROBOTS_TXT, "text/plain")
+            with rng_lock:
+                failed = rng.random() < error_rate
+            if failed:
+                return self._send(503, "Service Unavailable", "text/plain")
+            body = route(path)
+            if body is None:
+                return self._send(404, "Not Found", "text/plain")
+            self._send(200, body, "text/html; charset=utf-8")
+
+        def _send(self, status, body, content_type):
+            data = body.encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+    return Handler
+
+
+def serve(catalogue, latency=0.0, error_rate=0.0, host="127.0.0.1", books_port=0, quotes_port=0):
+    """Start both sites on background threads; returns (books_url, quotes_url, stop)."""
+    servers = [
+        ThreadingHTTPServer((host, port), _handler(route, latency, error_rate, catalogue.seed))
+        for route, port in ((catalogue.books_route, books_port), (catalogue.quotes_route, quotes_port))
+    ]
+    for server in servers:
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    def stop():
+        for server in servers:
+            server.shutdown()
+            server.server_close()
+
+    books_url, quotes_url = (f"http://{host}:{server.server_address[1]}/" for server in servers)
+    return books_url, quotes_url, stop
+
+
+def add_site_arguments(args_parser):
+    args_parser.add_argument("--categories", type=int, default=10)
+    args_parser.add_argument("--books-per-category", type=int, default=60)
+    args_parser.add_argument("--quote-pages", type=int, default=20)
+    args_parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    args_parser.add_argument("--error-rate", type=float, default=0.0, help="share of page requests answered with 503")
+    args_parser.add_argument(
+        "--duplicates", type=float, default=0.0, help="share of books also listed, under other URLs, in another category"
+    )
+    args_parser.add_argument("--seed", type=int, default=0)
+
+
+def site_arguments(args):
+    """The add_site_arguments() values as fakesite.py command-line arguments."""
+    return [
+        "--categories", str(args.categories), "--books-per-category", str(args.books_per_category),
+        "--quote-pages", str(args.quote_pages), "--latency", str(args.latency),
+        "--error-rate", str(args.error_rate), "--duplicates", str(args.duplicates), "--seed", str(args.seed),
+    ]
+
+
+def main(argv=None):
+    args_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_site_arguments(args_parser)
+    args_parser.add_argument("--books-port", type=int, default=0)
+    args_parser.add_argument("--quotes-port", type=int, default=0)
+    args = args_parser.parse_args(argv)
+
+    catalogue = Catalogue(args.categories, args.books_per_category, args.quote_pages, args.seed, args.duplicates)
+    books_url, quotes_url, stop = serve(
+        catalogue, args.latency, args.error_rate, books_port=args.books_port, quotes_port=args.quotes_port
+    )
+    print(f"books={books_url} quotes={quotes_url}", flush=True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,284 @@
+# benchmarks/run.py
+"""End-to-end crawl benchmarks against the local stand-in sites (benchmarks/fakesite.py).
+
+    python benchmarks/run.py [--scenarios books quotes parse main] [--workers 10]
+                             [--categories 10 --books-per-category 60 --quote-pages 20]
+                             [--latency 0.02 --error-rate 0.01] [--compare benchmarks/results/<commit>.json]
+
+Each scenario runs in a fresh process, so its peak RSS is its own:
+
+    books   fetch_all_books_parallel(): home, category and listing pages
+    quotes  fetch_all_quotes_pages_parallel()
+    parse   every generated book and quotes page through each parser backend, no HTTP
+    main    main.main() with no limits, in a scratch directory
+
+Results (pages/s, items/s, peak RSS, p50/p99 time per HTTP attempt) are
+printed and saved to benchmarks/results/<commit>.json; pass an earlier file
+to --compare to see the change between two commits.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import shlex
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "benchmarks"))
+
+import fakesite  # noqa: E402
+
+RESULTS_DIR = ROOT / "benchmarks" / "results"
+SCENARIOS = ["books", "quotes", "parse", "main"]
+COLUMNS = ["pages/s", "items/s", "peak_rss_mb", "p50_ms", "p99_ms"]
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of values (0 < q <= 100), or None for no values."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, -(-len(ordered) * q // 100) - 1)]
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024  # bytes on macOS, KiB elsewhere
+
+
+# ----------------------------
+# Scenario side: runs in a fresh child process
+# ----------------------------
+
+def _setup(books_url, quotes_url, rate):
+    """Point the scraper at the local sites; returns the list collecting every HTTP attempt's duration."""
+    sys.path.insert(0, str(ROOT / "src"))
+    import fetcher
+    import metrics
+    import parser
+    from ratelimit import rate_limiter
+
+    fetcher.BASE_BOOKS_URL = books_url
+    fetcher.BASE_QUOTES_URL = quotes_url
+    parser.BASE_QUOTES = quotes_url
+    rate_limiter.default_rate = rate
+    metrics.configure_logging("WARNING")
+
+    # The histogram only keeps bucket counts; keep the raw durations for exact percentiles.
+    durations = []
+    observe = metrics.FETCH_SECONDS.observe
+
+    def record(value, **labels):
+        durations.append(value)
+        observe(value, **labels)
+
+    metrics.FETCH_SECONDS.observe = record
+    return durations
+
+
+def _ok_responses():
+    from metrics import HTTP_RESPONSES
+    return sum(value for _, labels, value in HTTP_RESPONSES.samples() if labels.get("status") == "200")
+
+
+def _result(seconds, pages, items, durations=()):
+    return {
+        "seconds": round(seconds, 3),
+        "pages": pages,
+        "items": items,
+        "pages/s": round(pages / seconds, 1) if pages is not None else None,
+        "items/s": round(items / seconds, 1) if items is not None else None,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "p50_ms": round(percentile(durations, 50) * 1000, 2) if durations else None,
+        "p99_ms": round(percentile(durations, 99) * 1000, 2) if durations else None,
+    }
+
+
+def run_books(site, options):
+    durations = _setup(site["books"], site["quotes"], options["rate"])
+    from fetcher import fetch_all_books_parallel
+
+    started = time.perf_counter()
+    books = fetch_all_books_parallel(max_workers=options["workers"])
+    seconds = time.perf_counter() - started
+    return {"books": _result(seconds, _ok_responses(), sum(map(len, books.values())), durations)}
+
+
+def run_quotes(site, options):
+    durations = _setup(site["books"], site["quotes"], options["rate"])
+    from fetcher import fetch_all_quotes_pages_parallel
+
+    started = time.perf_counter()
+    pages = fetch_all_quotes_pages_parallel(max_workers=options["workers"])
+    seconds = time.perf_counter() - started
+    return {"quotes": _result(seconds, _ok_responses(), None, durations)}
+
+
+def run_parse(site, options):
+    _setup(site["books"], site["quotes"], options["rate"])
+    from html_backend import BACKENDS, get_backend, use_backend
+    from parser import cache_author_page, extract_author_urls, parse_book_page, parse_quotes_from_a_page
+
+    catalogue = fakesite.Catalogue(**options["site"])
+    books = [
+        (f"{site['books']}catalogue/{slug}/index.html", catalogue.categories[c][0], catalogue.book_page(slug))
+        for c in range(len(catalogue.categories))
+        for slug in (catalogue.book_slug(c, n) for n in range(catalogue.books_per_category))
+    ]
+    quotes = [(f"{site['quotes']}page/{n}/", catalogue.quotes_page(n)) for n in range(1, catalogue.quote_pages + 1)]
+    # Quote items embed author details; seed them so parsing never goes to the network.
+    for url in extract_author_urls(quotes[0][1]):
+        cache_author_page(url, None)
+
+    results = {}
+    for name in BACKENDS:
+        use_backend(name)
+        started = time.perf_counter()
+        items = sum(parse_book_page(url, category, html) is not None for url, category, html in books)
+        for url, html in quotes:
+            tree = get_backend().tree(html)
+            items += len(parse_quotes_from_a_page(url, tree))
+            extract_author_urls(tree)
+        seconds = time.perf_counter() - started
+        results[f"parse_{name}"] = _result(seconds, len(books) + len(quotes), items)
+    return results
+
+
+def run_main(site, options):
+    durations = _setup(site["books"], site["quotes"], options["rate"])
+    import main
+
+    with tempfile.TemporaryDirectory() as scratch:
+        os.chdir(scratch)
+        started = time.perf_counter()
+        main.main(["--books-limit", "0", "--quotes-limit", "0", "--log-level", "WARNING", *options["main_args"]])
+        seconds = time.perf_counter() - started
+        with (main.DATA_DIR / "items.jsonl").open(encoding="utf-8") as f:
+            items = sum(1 for _ in f)
+        os.chdir(ROOT)
+    return {"main": _result(seconds, _ok_responses(), items, durations)}
+
+
+RUNNERS = {"books": run_books, "quotes": run_quotes, "parse": run_parse, "main": run_main}
+
+
+# ----------------------------
+# Parent side
+# ----------------------------
+
+def start_site(args):
+    """Run fakesite.py in its own process, so serving pages does not compete with the crawl for the GIL."""
+    process = subprocess.Popen(
+        [sys.executable, str(ROOT / "benchmarks" / "fakesite.py"), *fakesite.site_arguments(args)],
+        stdout=subprocess.PIPE, text=True,
+    )
+    urls = dict(part.split("=", 1) for part in process.stdout.readline().split())
+    if set(urls) != {"books", "quotes"}:
+        process.kill()
+        raise SystemExit("fakesite.py did not start")
+    return urls, process
+
+
+def run_scenario(name, site, options):
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+        return executor.submit(RUNNERS[name], site, options).result()
+
+
+def commit_id():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--", "src"], cwd=ROOT, capture_output=True, text=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return commit + ("-dirty" if dirty.strip() else "")
+
+
+def format_value(value):
+    return "-" if value is None else f"{value:.1f}"
+
+
+def print_results(results, baseline=None):
+    print(f"{'scenario':<12}" + "".join(f"{c:>14}" for c in COLUMNS))
+    for name, row in results.items():
+        print(f"{name:<12}" + "".join(f"{format_value(row[c]):>14}" for c in COLUMNS))
+        old = (baseline or {}).get(name)
+        if old:
+            changes = [
+                f"{row[c] / old[c] - 1:+.0%}" if row[c] is not None and old.get(c) else "-"
+                for c in COLUMNS
+            ]
+            print(f"{'  vs base':<12}" + "".join(f"{change:>14}" for change in changes))
+
+
+def main(argv=None):
+    args_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    args_parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    args_parser.add_argument("--workers", type=int, default=10, help="max_workers for the fetch scenarios")
+    args_parser.add_argument(
+        "--rate", type=float, default=1000.0,
+        help="requests/s per host allowed by the rate limiter (the real sites get ratelimit.DEFAULT_RATE)",
+    )
+    args_parser.add_argument("--main-args", default="", help='extra main.py arguments, e.g. "--parse-workers 4"')
+    fakesite.add_site_arguments(args_parser)
+    args_parser.add_argument("--output", type=Path, help="where to save results (default: results/<commit>.json)")
+    args_parser.add_argument("--compare", type=Path, metavar="RESULTS", help="earlier results file to compare against")
+    args = args_parser.parse_args(argv)
+
+    options = {
+        "workers": args.workers,
+        "rate": args.rate,
+        "main_args": shlex.split(args.main_args),
+        "site": {
+            "categories": args.categories, "books_per_category": args.books_per_category,
+            "quote_pages": args.quote_pages, "seed": args.seed, "duplicates": args.duplicates,
+        },
+        "latency": args.latency,
+        "error_rate": args.error_rate,
+    }
+    site, server = start_site(args)
+    results = {}
+    try:
+        for name in args.scenarios:
+            print(f"Running {name}...", file=sys.stderr)
+            results.update(run_scenario(name, site, options))
+    finally:
+        server.kill()
+        server.wait()
+
+    commit = commit_id()
+    report = {
+        "commit": commit,
+        "created": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "machine": f"{platform.system()} {platform.machine()}, {os.cpu_count()} CPUs",
+        "options": options,
+        "results": results,
+    }
+    output = args.output or RESULTS_DIR / f"{commit}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+    baseline = None
+    if args.compare:
+        base = json.loads(args.compare.read_text(encoding="utf-8"))
+        if base["options"] != options:
+            print(f"Warning: {args.compare} was run with different options: {base['options']}")
+        print(f"Baseline: {base['commit']} ({base['created']})")
+        baseline = base["results"]
+    print_results(results, baseline)
+    print(f"Saved results to {output}")
+
+
+if __name__ == "__main__":
+    main()
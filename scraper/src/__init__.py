@@ -7,8 +7,29 @@ from .fetcher import (
     fetch_all_books_parallel,
     fetch_all_quotes_pages_parallel,
     fetch_page,
+    fetch_pages,
 )
 
+# ----------------------------
+# Crawl engine
+# ----------------------------
+from .engine import CrawlEngine, run_crawl
+
+# ----------------------------
+# Crawl frontier
+# ----------------------------
+from .frontier import CrawlFrontier, SharedFrontier
+
+# ----------------------------
+# URL canonicalisation and duplicate detection
+# ----------------------------
+from .dedup import Deduplicator, book_dedup, book_fingerprint, canonical_url
+
+# ----------------------------
+# Shared HTTP client
+# ----------------------------
+from .http_client import HttpClient, configure_client, connection_stats, get_client
+
 # ----------------------------
 # Pagination helpers
 # ----------------------------
@@ -17,6 +38,11 @@ from .pagination import (
     get_quotes_next_page_url,
 )
 
+# ----------------------------
+# HTML parser backends
+# ----------------------------
+from .html_backend import get_backend, use_backend
+
 # ----------------------------
 # Parsing / processing
 # ----------------------------
@@ -26,12 +52,47 @@ from .parser import (
     parse_quotes_from_a_page,
     get_author_details,
     generate_unique_id,
+    stable_id,
 )
 
+# ----------------------------
+# Multiprocess parsing
+# ----------------------------
+from .parse_pool import ParsePool
+
+# ----------------------------
+# Incremental re-crawl
+# ----------------------------
+from .incremental import Manifest, content_hash
+
 # ----------------------------
 # Robots.txt helper
 # ----------------------------
-from .robots import can_fetch
+from .robots import RobotsPolicy, can_fetch, can_fetch_async, crawl_rate, robots_policy
+
+# ----------------------------
+# Response cache
+# ----------------------------
+from .cache import HttpCache, open_cache, get_cache, close_cache
+
+# ----------------------------
+# Rate limiting
+# ----------------------------
+from .ratelimit import DomainRateLimiter, TokenBucket, rate_limiter
+
+# ----------------------------
+# Streaming output
+# ----------------------------
+from .sink import JsonlSink, merge_authors, merge_items, write_authors, write_dataset_json, write_summary_json
+from .summary import SummaryBuilder
+from .search_index import SearchIndex, write_search_index
+from .encoder import encode, compress_file
+from .columnar import export_columnar, read_columns
+
+# ----------------------------
+# Logging and metrics
+# ----------------------------
+from .metrics import configure_logging, get_logger, registry
 
 # ----------------------------
 # Types
@@ -44,11 +105,17 @@ from .data_types import (
     RatingCount,
     TagCount,
     AuthorCount,
+    PriceBucket,
+    CategoryRatings,
+    AuthorTags,
     SummaryData,
     MetaInfo,
     Filters,
     Dataset,
     Item,
+    FetchedPage,
+    item_from_dict,
+    as_dict,
 )
 
 # ----------------------------
@@ -59,17 +126,74 @@ __all__ = [
     "fetch_all_books_parallel",
     "fetch_all_quotes_pages_parallel",
     "fetch_page",
+    "fetch_pages",
+    # engine
+    "CrawlEngine",
+    "run_crawl",
+    # frontier
+    "CrawlFrontier",
+    "SharedFrontier",
+    # dedup
+    "Deduplicator",
+    "book_dedup",
+    "book_fingerprint",
+    "canonical_url",
+    # http client
+    "HttpClient",
+    "configure_client",
+    "connection_stats",
+    "get_client",
     # pagination
     "get_books_category_next_page_url",
     "get_quotes_next_page_url",
+    # html backends
+    "get_backend",
+    "use_backend",
     # parser/paster
     "parse_all_books",
     "parse_book_page",
     "parse_quotes_from_a_page",
     "get_author_details",
     "generate_unique_id",
+    "stable_id",
+    # parse pool
+    "ParsePool",
+    # incremental
+    "Manifest",
+    "content_hash",
     # robots
+    "RobotsPolicy",
     "can_fetch",
+    "can_fetch_async",
+    "crawl_rate",
+    "robots_policy",
+    # response cache
+    "HttpCache",
+    "open_cache",
+    "get_cache",
+    "close_cache",
+    # rate limiting
+    "DomainRateLimiter",
+    "TokenBucket",
+    "rate_limiter",
+    # streaming output
+    "JsonlSink",
+    "merge_authors",
+    "merge_items",
+    "SummaryBuilder",
+    "write_authors",
+    "write_dataset_json",
+    "write_summary_json",
+    "SearchIndex",
+    "write_search_index",
+    "encode",
+    "compress_file",
+    "export_columnar",
+    "read_columns",
+    # logging and metrics
+    "configure_logging",
+    "get_logger",
+    "registry",
     # types
     "BookItem",
     "QuoteItem",
@@ -78,9 +202,15 @@ __all__ = [
     "RatingCount",
     "TagCount",
     "AuthorCount",
+    "PriceBucket",
+    "CategoryRatings",
+    "AuthorTags",
     "SummaryData",
     "MetaInfo",
     "Filters",
     "Dataset",
     "Item",
+    "FetchedPage",
+    "item_from_dict",
+    "as_dict",
 ]
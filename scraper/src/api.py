@@ -0,0 +1,308 @@
+# src/api.py
+"""Read-only JSON API over a scraped dataset, for the UI to fetch one page at a time.
+
+    python src/api.py [--data src/data] [--host 127.0.0.1] [--port 8000]
+
+--data is the scraper's data directory (items.jsonl, plus authors.jsonl,
+summary.json and search_index.json when present) or a dataset.json written by
+main.py, compressed or not. It is loaded once at start-up; restart to serve
+a new crawl.
+
+    GET /api/summary              meta, filters and summary
+    GET /api/items                one page of items, see DatasetStore.query()
+    GET /api/items/<id>           one item, quotes with their author_details
+
+Responses carry a weak ETag and are gzipped for clients that accept it;
+a matching If-None-Match gets a 304 without building the response.
+"""
+import argparse
+import base64
+import binascii
+import bisect
+import gzip
+import hashlib
+import io
+import json
+from array import array
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from data_types import item_from_dict
+from encoder import encode, zstandard
+from metrics import get_logger
+from search_index import SearchIndex, intersect
+from sink import dataset_meta
+from summary import SummaryBuilder
+
+log = get_logger("api")
+
+DATA_DIR = Path("src/data")
+SORTS = ("title", "author", "price")
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+GZIP_MIN_BYTES = 1024  # smaller bodies are not worth compressing
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _read(path, digest):
+    """Bytes of path, decompressed if it is a .gz/.zst file; the raw bytes also feed digest."""
+    raw = path.read_bytes()
+    digest.update(raw)
+    if path.suffix == ".gz":
+        return gzip.decompress(raw)
+    if path.suffix == ".zst":
+        if zstandard is None:
+            raise RuntimeError(f"{path} needs the zstandard package (pip install zstandard)")
+        return zstandard.ZstdDecompressor().stream_reader(io.BytesIO(raw)).read()
+    return raw
+
+
+def _jsonl(data):
+    return [json.loads(line) for line in data.splitlines() if line.strip()]
+
+
+def _sort_key(item, field):
+    """Key of item in the field's order; the id breaks ties, so every key is unique."""
+    value = item.get(field)
+    if value is None:  # e.g. quotes have no title: they sort before every book
+        return (0, "", item["id"])
+    return (1, value.casefold() if isinstance(value, str) else value, item["id"])
+
+
+def encode_cursor(key):
+    return base64.urlsafe_b64encode(encode(list(key))).rstrip(b"=").decode("ascii")
+
+
+def decode_cursor(cursor):
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, ValueError):
+        raise ApiError(400, "malformed cursor")
+    if not isinstance(key, list):
+        raise ApiError(400, "malformed cursor")
+    return tuple(key)
+
+
+class DatasetStore:
+    """The loaded dataset with everything a query needs precomputed.
+
+    Filters come from the search index's postings (plus one list per item
+    type); each sort field has its items' keys in sorted order and every
+    item's rank in it. A query's matches are turned into sorted ranks once
+    (cached per filter and sort) and each page is a bisect into them from
+    the cursor, so paging deep into a result costs the same as page one.
+    """
+
+    def __init__(self, items, authors=None, summary=None, index=None, version=""):
+        self.items = items
+        self.authors = authors or {}
+        self.summary = summary or self._summarize(items)
+        if index is None or index.count != len(items):
+            index = SearchIndex.build(items)
+        self.index = index
+        self.version = version
+        self.by_id = {item["id"]: doc for doc, item in enumerate(items)}
+        self.types = {}
+        for doc, item in enumerate(items):
+            self.types.setdefault(item["type"], array("I")).append(doc)
+
+        # Per sort field: items in sorted order, their keys in that order, and each item's rank (position) in it.
+        self._orders, self._keys, self._ranks = {}, {}, {}
+        for field in SORTS:
+            order = array("I", sorted(range(len(items)), key=lambda doc: _sort_key(items[doc], field)))
+            ranks = array("I", bytes(4 * len(items)))
+            for rank, doc in enumerate(order):
+                ranks[doc] = rank
+            self._orders[field] = order
+            self._keys[field] = [_sort_key(items[doc], field) for doc in order]
+            self._ranks[field] = ranks
+        self._positions = lru_cache(maxsize=256)(self._match_positions)
+
+    @staticmethod
+    def _summarize(items):
+        builder = SummaryBuilder()
+        builder.add_many(item_from_dict(item) for item in items)
+        return {"meta": dataset_meta(builder), "filters": builder.filters(), "summary": builder.summary()}
+
+    @classmethod
+    def load(cls, path):
+        """From a data directory (items.jsonl and friends) or a dataset.json[.gz|.zst]."""
+        digest = hashlib.blake2b(digest_size=8)
+        if path.is_dir():
+            items = _jsonl(_read(path / "items.jsonl", digest))
+            authors = _jsonl(_read(path / "authors.jsonl", digest)) if (path / "authors.jsonl").exists() else []
+            summary = json.loads(_read(path / "summary.json", digest)) if (path / "summary.json").exists() else None
+            index_path = path / "search_index.json"
+            index = SearchIndex.from_json(json.loads(_read(index_path, digest))) if index_path.exists() else None
+        else:
+            dataset = json.loads(_read(path, digest))
+            items, authors, index = dataset["items"], dataset.get("authors", []), None
+            summary = {key: dataset[key] for key in ("meta", "filters", "summary")}
+        store = cls(items, {a["id"]: a for a in authors}, summary, index, digest.hexdigest())
+        log(f"Loaded {len(items)} items and {len(authors)} authors from {path}")
+        return store
+
+    def _match_positions(self, q, category, tag, author, item_type, sort):
+        """Sorted positions, in the sort's order, of the items matching the filters."""
+        matches = self.index.query(q, category, tag, author)
+        if item_type:
+            typed = self.types.get(item_type, array("I"))
+            matches = typed if matches is None else intersect(matches, typed)
+        if matches is None:
+            return range(len(self.items))
+        if sort is None:
+            return matches  # postings are already in item order
+        ranks = self._ranks[sort]
+        return array("I", sorted(ranks[doc] for doc in matches))
+
+    def _item_at(self, position, sort):
+        return self.items[position if sort is None else self._orders[sort][position]]
+
+    def query(self, q="", category=None, tag=None, author=None, item_type=None, sort=None, direction="asc",
+              after=None, limit=DEFAULT_LIMIT):
+        """One page of matching items, sorted by title, author, price or (sort=None) item order.
+
+        after is the "next" cursor of the previous page: the sort key of its
+        last item. Keys are unique, so pages never overlap or skip items
+        however the pages before them were reached.
+        """
+        if sort is not None and sort not in SORTS:
+            raise ApiError(400, f"sort must be one of {', '.join(SORTS)}")
+        if direction not in ("asc", "desc"):
+            raise ApiError(400, "dir must be asc or desc")
+        if item_type not in (None, "book", "quote"):
+            raise ApiError(400, "type must be book or quote")
+        limit = max(1, min(limit, MAX_LIMIT))
+        positions = self._positions(q.strip().lower(), category, tag, author, item_type, sort)
+
+        if after is None:
+            boundary = 0 if direction == "asc" else len(self.items)
+        else:
+            key = decode_cursor(after)
+            keys = self._keys[sort] if sort is not None else None
+            try:
+                if keys is None:  # item order: the key is the item's position
+                    (boundary,) = key
+                    boundary = int(boundary) + (direction == "asc")
+                elif direction == "asc":
+                    boundary = bisect.bisect_right(keys, key)
+                else:
+                    boundary = bisect.bisect_left(keys, key)
+            except (TypeError, ValueError):
+                raise ApiError(400, "cursor does not belong to this sort")
+
+        start = bisect.bisect_left(positions, boundary)
+        if direction == "asc":
+            page = positions[start:start + limit]
+            more = start + limit < len(positions)
+        else:
+            page = positions[max(0, start - limit):start][::-1]
+            more = start - limit > 0
+
+        items = [self._item_at(position, sort) for position in page]
+        next_cursor = None
+        if more and items:
+            last = page[-1]
+            next_cursor = encode_cursor((last,) if sort is None else self._keys[sort][last])
+        return {"items": items, "total": len(positions), "limit": limit, "next": next_cursor}
+
+    def item(self, item_id):
+        doc = self.by_id.get(item_id)
+        if doc is None:
+            raise ApiError(404, f"no item {item_id}")
+        item = self.items[doc]
+        author = self.authors.get(item.get("author_id"))
+        return {**item, "author_details": author} if author is not None else item
+
+
+def _param(params, name, default=None):
+    values = params.get(name)
+    return values[0] if values else default
+
+
+class ApiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    store = None  # the DatasetStore, set by serve()
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        etag = f'W/"{self.store.version}-{hashlib.blake2b(self.path.encode(), digest_size=8).hexdigest()}"'
+        if etag in self.headers.get("If-None-Match", ""):
+            self._send(304, b"", etag)
+            return
+        try:
+            body = encode(self.route(url.path, parse_qs(url.query)))
+            status = 200
+        except ApiError as e:
+            body, status, etag = encode({"error": str(e)}), e.status, None
+        self._send(status, body, etag)
+
+    def route(self, path, params):
+        if path == "/api/summary":
+            return self.store.summary
+        if path == "/api/items":
+            try:
+                limit = int(_param(params, "limit", DEFAULT_LIMIT))
+            except ValueError:
+                raise ApiError(400, "limit must be an integer")
+            return self.store.query(
+                q=_param(params, "q", ""), category=_param(params, "category"), tag=_param(params, "tag"),
+                author=_param(params, "author"), item_type=_param(params, "type"), sort=_param(params, "sort"),
+                direction=_param(params, "dir", "asc"), after=_param(params, "after"), limit=limit,
+            )
+        if path.startswith("/api/items/"):
+            return self.store.item(unquote(path[len("/api/items/"):]))
+        raise ApiError(404, f"no route {path}")
+
+    def _send(self, status, body, etag):
+        self.send_response(status)
+        if etag is not None:
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")  # revalidate, which is a cheap 304
+        if status != 304:
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Vary", "Accept-Encoding")
+            if len(body) >= GZIP_MIN_BYTES and "gzip" in self.headers.get("Accept-Encoding", ""):
+                body = gzip.compress(body, 6, mtime=0)
+                self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        log.debug(format % args)
+
+
+def serve(store, host="127.0.0.1", port=8000):
+    """A server for store (not yet serving: call serve_forever()); port 0 picks a free port."""
+    handler = type("Handler", (ApiHandler,), {"store": store})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def main(argv=None):
+    args_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    args_parser.add_argument("--data", type=Path, default=DATA_DIR,
+                             help="data directory with items.jsonl, or a dataset.json[.gz|.zst]")
+    args_parser.add_argument("--host", default="127.0.0.1")
+    args_parser.add_argument("--port", type=int, default=8000)
+    args = args_parser.parse_args(argv)
+
+    server = serve(DatasetStore.load(args.data), args.host, args.port)
+    log(f"Serving the API on http://{args.host}:{server.server_address[1]}/api/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
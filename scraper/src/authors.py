@@ -0,0 +1,201 @@
+# src/authors.py
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import asdict
+from pathlib import Path
+
+from data_types import AuthorDetails
+
+DEFAULT_TTL = 7 * 24 * 3600  # author bios hardly ever change
+
+
+class AuthorService:
+    """Author details by author URL: single-flight, optionally persistent, with a TTL.
+
+    get()/get_async() return the cached AuthorDetails or run fetch() to
+    produce it. While one caller is fetching a URL, every other caller for
+    that URL (thread or task) waits on the same fetch instead of starting its
+    own. With a path, details are stored in SQLite and reused by later runs
+    until they are ttl seconds old; records for pages that could not be
+    fetched (no name) are kept for this run only, so the next run retries.
+
+    counters: hits (served from memory or the store), misses (fetched),
+    coalesced (waited on someone else's fetch), expired (stored but too old);
+    peek() is not counted.
+    """
+
+    def __init__(self, path=None, ttl=DEFAULT_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._memory = {}
+        self._inflight = {}
+        self.counters = {"hits": 0, "misses": 0, "coalesced": 0, "expired": 0}
+        self._conn = None
+        if path is not None:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(path), check_same_thread=False)
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS authors (
+                    url TEXT PRIMARY KEY,
+                    details TEXT NOT NULL,
+                    fetched_at REAL NOT NULL
+                )"""
+            )
+            self._conn.commit()
+
+    def cached(self, url):
+        """The details for url if known and fresh, without fetching; None otherwise."""
+        with self._lock:
+            return self._lookup(url)
+
+    def peek(self, url):
+        """cached() left out of the counters: for checks such as a page fingerprint, not lookups."""
+        with self._lock:
+            return self._lookup(url, count=False)
+
+    def put(self, url, author):
+        """Store details fetched elsewhere; the first stored value wins, as with a fetch."""
+        with self._lock:
+            return self._store(url, author)
+
+    def get(self, url, fetch):
+        """Blocking lookup; fetch() -> AuthorDetails runs at most once per URL at a time.
+
+        Do not call this on the event loop while get_async() may be fetching the same URL.
+        """
+        future, leader = self._claim(url)
+        if not leader:
+            return future.result()
+        return self._finish(url, future, fetch)
+
+    async def get_async(self, url, fetch):
+        """Event-loop lookup; fetch is a coroutine function, shared with blocking callers too."""
+        future, leader = self._claim(url)
+        if not leader:
+            return await asyncio.wrap_future(future)
+        try:
+            author = await fetch()
+        except BaseException as e:
+            self._fail(url, future, e)
+            raise
+        return self._resolve(url, future, author)
+
+    def authors(self, ids):
+        """AuthorDetails for the given author IDs, from memory or the store (expired or not)."""
+        ids = set(ids)
+        with self._lock:
+            found = {author.id: author for author in self._memory.values() if author.id in ids}
+            if self._conn is not None and len(found) < len(ids):
+                for (details,) in self._conn.execute("SELECT details FROM authors"):
+                    author = AuthorDetails(**json.loads(details))
+                    if author.id in ids:
+                        found.setdefault(author.id, author)
+        return list(found.values())
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counters)
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    # _lookup() and _store() expect self._lock to be held
+
+    def _claim(self, url):
+        """(future, True) if the caller must fetch url, (future, False) to wait on an existing result."""
+        with self._lock:
+            author = self._lookup(url)
+            if author is not None:
+                future = Future()
+                future.set_result(author)
+                return future, False
+            if url in self._inflight:
+                self.counters["coalesced"] += 1
+                return self._inflight[url], False
+            self.counters["misses"] += 1
+            future = self._inflight[url] = Future()
+            return future, True
+
+    def _finish(self, url, future, fetch):
+        try:
+            author = fetch()
+        except BaseException as e:
+            self._fail(url, future, e)
+            raise
+        return self._resolve(url, future, author)
+
+    def _resolve(self, url, future, author):
+        with self._lock:
+            author = self._store(url, author)
+            del self._inflight[url]
+        future.set_result(author)
+        return author
+
+    def _fail(self, url, future, error):
+        with self._lock:
+            del self._inflight[url]
+        future.set_exception(error)
+
+    def _lookup(self, url, count=True):
+        author = self._memory.get(url)
+        if author is not None:
+            self.counters["hits"] += count
+            return author
+        if self._conn is None:
+            return None
+        row = self._conn.execute("SELECT details, fetched_at FROM authors WHERE url = ?", (url,)).fetchone()
+        if row is None:
+            return None
+        if time.time() - row[1] > self.ttl:
+            self.counters["expired"] += count
+            return None
+        author = self._memory[url] = AuthorDetails(**json.loads(row[0]))
+        self.counters["hits"] += count
+        return author
+
+    def _store(self, url, author):
+        existing = self._memory.get(url)
+        if existing is not None:
+            return existing
+        self._memory[url] = author
+        if self._conn is not None and author.name is not None:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO authors (url, details, fetched_at) VALUES (?, ?, ?)",
+                (url, json.dumps(asdict(author), ensure_ascii=False), time.time()),
+            )
+            self._conn.commit()
+        return author
+
+
+_service = AuthorService()
+_service_lock = threading.Lock()
+
+
+def get_author_service():
+    """The process-wide AuthorService (in memory only until open_author_store() is called)."""
+    with _service_lock:
+        return _service
+
+
+def open_author_store(path, ttl=DEFAULT_TTL):
+    """Replace the shared service with one persisted at path."""
+    global _service
+    with _service_lock:
+        _service.close()
+        _service = AuthorService(path, ttl)
+        return _service
+
+
+def close_author_store():
+    """Go back to an in-memory service, closing the persistent one."""
+    global _service
+    with _service_lock:
+        _service.close()
+        _service = AuthorService()
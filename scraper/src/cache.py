@@ -0,0 +1,120 @@
+# src/cache.py
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+
+@dataclass
+class CachedResponse:
+    url: str
+    body: str
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    fetched_at: float = 0.0
+
+    def conditional_headers(self):
+        """Validators to send so the server can answer 304 Not Modified."""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class HttpCache:
+    """Persistent response cache keyed by URL, stored in a single SQLite file.
+
+    Every 200 response is stored with its ETag/Last-Modified validators.
+    Later runs revalidate with a conditional request and reuse the stored
+    body on 304. In offline mode nothing goes to the network: cached bodies
+    are replayed and everything else is a miss.
+    """
+
+    def __init__(self, path, offline=False):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.offline = offline
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS responses (
+                url TEXT PRIMARY KEY,
+                body TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL
+            )"""
+        )
+        self._conn.commit()
+        self.counters = {"revalidated": 0, "stored": 0, "offline_hits": 0, "offline_misses": 0}
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def lookup(self, url):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT url, body, etag, last_modified, fetched_at FROM responses WHERE url = ?", (url,)
+            ).fetchone()
+        return CachedResponse(*row) if row else None
+
+    def store(self, url, body, etag=None, last_modified=None):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (url, body, etag, last_modified, fetched_at) VALUES (?, ?, ?, ?, ?)",
+                (url, body, etag, last_modified, time.time()),
+            )
+            self._conn.commit()
+            self.counters["stored"] += 1
+
+    def revalidated(self, cached):
+        """Record a 304 for cached and return its body."""
+        with self._lock:
+            self._conn.execute("UPDATE responses SET fetched_at = ? WHERE url = ?", (time.time(), cached.url))
+            self._conn.commit()
+            self.counters["revalidated"] += 1
+        return cached.body
+
+    def replay(self, url):
+        """Offline lookup: the cached body, or None when the URL was never cached."""
+        cached = self.lookup(url)
+        self._count("offline_hits" if cached else "offline_misses")
+        return cached.body if cached else None
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counters)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_cache = None
+
+
+def open_cache(path, offline=False):
+    """Enable the shared response cache for the engine and the blocking client."""
+    global _cache
+    if _cache is not None:
+        _cache.close()
+    _cache = HttpCache(path, offline=offline)
+    return _cache
+
+
+def get_cache():
+    """The shared HttpCache, or None when caching is disabled (the default)."""
+    return _cache
+
+
+def close_cache():
+    global _cache
+    if _cache is not None:
+        _cache.close()
+        _cache = None
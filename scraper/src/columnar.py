@@ -0,0 +1,162 @@
+# src/columnar.py
+import json
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc  # noqa: F401  (pa.ipc)
+    import pyarrow.parquet as pq
+except ImportError:  # optional: only needed for --columnar
+    pa = None
+
+from metrics import get_logger
+
+log = get_logger("columnar")
+
+# File suffix per output format. Both can be read memory-mapped, one column at a time (see read_columns()).
+FORMATS = {"parquet": ".parquet", "arrow": ".arrow"}
+BATCH_ROWS = 64 * 1024
+
+# Every table and its columns. "category" columns are dictionary-encoded:
+# int32 codes into one dictionary of the distinct values.
+TABLES = {
+    "books": [
+        ("id", "string"), ("title", "string"), ("price", "float64"), ("availability", "category"),
+        ("rating", "int8"), ("category", "category"), ("product_url", "string"),
+    ],
+    "quotes": [
+        ("id", "string"), ("text", "string"), ("author", "category"), ("author_id", "category"),
+        ("page_url", "category"),
+    ],
+    # One row per (quote, tag), so tag aggregations never have to explode lists.
+    "quote_tags": [("quote_id", "string"), ("tag", "category")],
+    "authors": [
+        ("id", "string"), ("url", "string"), ("name", "string"), ("born_date", "string"),
+        ("born_location", "category"), ("description", "string"),
+    ],
+}
+
+
+def require_pyarrow():
+    if pa is None:
+        raise RuntimeError("columnar export needs pyarrow (pip install pyarrow)")
+
+
+def _rows(items_path, authors_path=None):
+    """(table, row tuple) for every record, streamed from items.jsonl and authors.jsonl."""
+    with items_path.open("rb") as items:
+        for line in items:
+            item = json.loads(line)
+            if item["type"] == "book":
+                yield "books", (
+                    item["id"], item["title"], item["price"], item["availability"],
+                    item["rating"], item["category"], item["product_url"],
+                )
+            else:
+                yield "quotes", (item["id"], item["text"], item["author"], item.get("author_id"), item["page_url"])
+                for tag in item["tags"]:
+                    yield "quote_tags", (item["id"], tag)
+    if authors_path is not None and authors_path.exists():
+        with authors_path.open("rb") as authors:
+            for line in authors:
+                a = json.loads(line)
+                yield "authors", (a["id"], a["url"], a["name"], a["born_date"], a["born_location"], a["description"])
+
+
+class _TableWriter:
+    """Buffers rows of one table and writes them as record batches sharing fixed dictionaries."""
+
+    def __init__(self, path, columns, dictionaries, fmt):
+        self.columns = columns
+        self.dictionaries = dictionaries  # column index -> (pa dictionary array, {value: code})
+        self.schema = pa.schema([
+            pa.field(name, pa.dictionary(pa.int32(), pa.string()) if kind == "category" else getattr(pa, kind)())
+            for name, kind in columns
+        ])
+        if fmt == "parquet":
+            self._writer = pq.ParquetWriter(str(path), self.schema, compression="zstd")
+        else:
+            self._writer = pa.ipc.new_file(str(path), self.schema)
+        self._fmt = fmt
+        self._rows = []
+        self.count = 0
+
+    def add(self, row):
+        self._rows.append(row)
+        if len(self._rows) >= BATCH_ROWS:
+            self.flush()
+
+    def flush(self):
+        if not self._rows:
+            return
+        arrays = []
+        for i, (field, values) in enumerate(zip(self.schema, zip(*self._rows))):
+            if i in self.dictionaries:
+                dictionary, codes = self.dictionaries[i]
+                indices = pa.array([codes.get(v) for v in values], pa.int32())
+                arrays.append(pa.DictionaryArray.from_arrays(indices, dictionary))
+            else:
+                arrays.append(pa.array(values, field.type))
+        batch = pa.record_batch(arrays, schema=self.schema)
+        if self._fmt == "parquet":
+            self._writer.write_table(pa.Table.from_batches([batch]))
+        else:
+            self._writer.write_batch(batch)
+        self.count += len(self._rows)
+        self._rows = []
+
+    def close(self):
+        self.flush()
+        self._writer.close()
+
+
+def export_columnar(items_path, out_dir, authors_path=None, fmt="parquet"):
+    """Write books, quotes, quote_tags and authors as columnar files in out_dir; returns {table: path}.
+
+    Two streaming passes over the JSONL files: the first collects each
+    categorical column's distinct values, the second writes batches whose
+    dictionaries are those fixed, sorted values. Memory grows with distinct
+    values and BATCH_ROWS, not with the number of items.
+    """
+    require_pyarrow()
+    categorical = {
+        table: [i for i, (_, kind) in enumerate(columns) if kind == "category"] for table, columns in TABLES.items()
+    }
+
+    distinct = {(table, i): set() for table, indices in categorical.items() for i in indices}
+    for table, row in _rows(items_path, authors_path):
+        for i in categorical[table]:
+            if row[i] is not None:
+                distinct[table, i].add(row[i])
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    paths = {}
+    writers = {}
+    for table, columns in TABLES.items():
+        dictionaries = {}
+        for i in categorical[table]:
+            values = sorted(distinct[table, i])
+            dictionaries[i] = (pa.array(values, pa.string()), {v: code for code, v in enumerate(values)})
+        paths[table] = out_dir / f"{table}{FORMATS[fmt]}"
+        writers[table] = _TableWriter(paths[table], columns, dictionaries, fmt)
+
+    try:
+        for table, row in _rows(items_path, authors_path):
+            writers[table].add(row)
+    finally:
+        for writer in writers.values():
+            writer.close()
+    log(f"Saved columnar tables to {out_dir}: " + ", ".join(f"{t}={w.count}" for t, w in writers.items()))
+    return paths
+
+
+def read_columns(path, columns=None):
+    """A pyarrow Table with only the given columns, memory-mapped rather than read into memory.
+
+    For .arrow files the columns are zero-copy views of the mapped file; for
+    Parquet only the requested column chunks are decoded.
+    """
+    require_pyarrow()
+    if path.suffix == FORMATS["arrow"]:
+        table = pa.ipc.open_file(pa.memory_map(str(path), "r")).read_all()
+        return table.select(columns) if columns is not None else table
+    return pq.read_table(str(path), columns=columns, memory_map=True)
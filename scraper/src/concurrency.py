@@ -0,0 +1,142 @@
+# src/concurrency.py
+import asyncio
+import time
+from collections import deque
+
+from metrics import get_logger, registry
+
+log = get_logger("concurrency")
+
+CONCURRENCY_LIMIT = registry.gauge("scraper_concurrency_limit", "Adaptive in-flight request limit per host")
+CONCURRENCY_CHANGES = registry.counter(
+    "scraper_concurrency_changes_total", "Adaptive limit changes per host and reason (healthy, latency, overload)"
+)
+
+# Every limit change of the process as {"t", "host", "limit", "reason"}, oldest first (see history()).
+_history = deque(maxlen=10_000)
+_started = time.monotonic()
+
+
+def history():
+    return list(_history)
+
+
+def _percentile(sorted_values, q):
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+class AimdLimit:
+    """In-flight request limit for one host, adjusted by additive increase / multiplicative decrease.
+
+    Used like a semaphore (``async with limit:``) whose size moves with the
+    host's health. Every finished request is reported through record(),
+    before its slot is released:
+
+    * a 429 cuts the limit by ``backoff`` (halves it) right away, at most once
+      per round of in-flight requests so one burst counts as one signal;
+    * every ``window`` requests, if more than ``max_error_rate`` of them were
+      5xx, timeouts or connection errors, the limit is cut the same way;
+      a few scattered errors do not count as overload;
+    * else, if the window used the whole limit and its p95 latency is more
+      than ``tolerance`` times the baseline p95, it shrinks by
+      ``latency_backoff``: the host is queueing. p95 is compared with p95,
+      so an ordinary long tail does not count, and a window below the limit
+      cannot be queueing on it;
+    * otherwise, if the window actually used the whole limit, it grows by one.
+
+    The baseline is the lowest window p95 seen, allowed to drift up by
+    ``BASELINE_DRIFT`` per window so a host that became slower for good
+    is not backed off forever. Every cut removes at least one slot.
+    Only touched from the event loop thread.
+    """
+
+    BASELINE_DRIFT = 1.05
+
+    def __init__(self, host, initial=10, min_limit=1, max_limit=100, window=20, max_error_rate=0.1, tolerance=2.0,
+                 backoff=0.5, latency_backoff=0.9):
+        self.host = host
+        self.min_limit = min_limit
+        self.max_limit = max(max_limit, min_limit)
+        self.window = window
+        self.max_error_rate = max_error_rate
+        self.tolerance = tolerance
+        self.backoff = backoff
+        self.latency_backoff = latency_backoff
+        self.limit = float(min(max(initial, min_limit), self.max_limit))
+        self.in_flight = 0
+        self.baseline = None
+        self._latencies = []
+        self._errors = 0
+        self._saturated = False
+        self._since_decrease = self.max_limit  # the first failure always backs off
+        self._cond = asyncio.Condition()
+        CONCURRENCY_LIMIT.set(self.current, host=host)
+
+    @property
+    def current(self):
+        return int(self.limit)
+
+    async def __aenter__(self):
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.in_flight < self.current)
+            self.in_flight += 1
+            if self.in_flight >= self.current:
+                self._saturated = True
+
+    async def __aexit__(self, exc_type, exc, tb):
+        async with self._cond:
+            self.in_flight -= 1
+            # Wakes more than one waiter when record() just raised the limit.
+            self._cond.notify(max(1, self.current - self.in_flight))
+
+    def record(self, seconds, signal=None):
+        """Feed back one finished request.
+
+        signal is None for a good response, "throttled" for a 429 and "error"
+        for a 5xx, timeout or connection error.
+        """
+        self._since_decrease += 1
+        if signal == "throttled":
+            if self._since_decrease >= self.current:
+                self._cut(self.backoff, "overload")
+        elif signal == "error":
+            self._errors += 1
+        else:
+            self._latencies.append(seconds)
+        if len(self._latencies) + self._errors < self.window:
+            return
+
+        error_rate = self._errors / (len(self._latencies) + self._errors)
+        latencies = sorted(self._latencies)
+        self._latencies, self._errors = [], 0
+        saturated, self._saturated = self._saturated, False
+        if error_rate > self.max_error_rate:
+            self._cut(self.backoff, "overload")
+            return
+        if latencies:
+            p95 = _percentile(latencies, 0.95)
+            self.baseline = p95 if self.baseline is None else min(p95, self.baseline * self.BASELINE_DRIFT)
+            if saturated and p95 > self.baseline * self.tolerance:
+                self._cut(self.latency_backoff, "latency")
+                return
+        if saturated:
+            self._set(self.limit + 1, "healthy")
+
+    def _cut(self, factor, reason):
+        # At least one slot less, or a small limit would never move.
+        self._since_decrease = 0
+        self._set(min(self.limit * factor, self.current - 1), reason)
+
+    def _set(self, limit, reason):
+        old = self.current
+        self.limit = min(max(limit, float(self.min_limit)), float(self.max_limit))
+        if self.current == old:
+            return
+        CONCURRENCY_LIMIT.set(self.current, host=self.host)
+        CONCURRENCY_CHANGES.inc(host=self.host, reason=reason)
+        _history.append({"t": round(time.monotonic() - _started, 3), "host": self.host, "limit": self.current,
+                         "reason": reason})
+        log.debug(f"[LIMIT] {self.host}: {old} -> {self.current} ({reason})")
+
+    def stats(self):
+        return {"limit": self.current, "in_flight": self.in_flight, "baseline_seconds": self.baseline}
@@ -1,10 +1,32 @@
 # src/data_types.py
+import sys
 from dataclasses import dataclass, field
-from typing import List, Optional, Literal, Union
+from typing import Any, List, Optional, Literal, Union
 
-# Book item
+
+def _intern(value):
+    return sys.intern(value) if value is not None else None
+
+
+def _set(record, name, value):
+    object.__setattr__(record, name, value)  # frozen records can only be built up this way
+
+# Fetched document
 
 @dataclass
+class FetchedPage:
+    url: str
+    html: str
+    # Tree built while the page was fetched (by the active parser backend), handed on so later stages do not re-parse it.
+    soup: Any = field(default=None, repr=False, compare=False)
+
+# Item records are slotted (no per-instance __dict__) and frozen. Values that
+# repeat across items (categories, availability, authors, tags) are interned,
+# so thousands of items share one copy of each distinct string.
+
+# Book item
+
+@dataclass(slots=True, frozen=True)
 class BookItem:
     id: str
     type: Literal["book"]
@@ -15,9 +37,13 @@ class BookItem:
     category: str
     product_url: str
 
+    def __post_init__(self):
+        _set(self, "availability", _intern(self.availability))
+        _set(self, "category", _intern(self.category))
+
 # Quote Item
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class AuthorDetails:
     id: str
     url: str
@@ -26,16 +52,27 @@ class AuthorDetails:
     born_location:Optional[str] = None
     description: Optional[str] = None
 
+    def __post_init__(self):
+        _set(self, "name", _intern(self.name))
+        _set(self, "born_location", _intern(self.born_location))
 
-@dataclass
+
+@dataclass(slots=True, frozen=True)
 class QuoteItem:
+    """A quote; its author's details are kept once, in the authors table, under author_id."""
+
     id: str
     type: Literal["quote"]
     text: str
     author: str
     tags: List[str]
     page_url: str
-    author_details: Optional[AuthorDetails] = None
+    author_id: Optional[str] = None
+
+    def __post_init__(self):
+        _set(self, "author", _intern(self.author))
+        _set(self, "tags", [sys.intern(tag) for tag in self.tags])
+        _set(self, "page_url", _intern(self.page_url))
 
 
 # Summary aggregations
@@ -64,12 +101,34 @@ class AuthorCount:
     count: int
 
 
+@dataclass
+class PriceBucket:
+    low: float  # inclusive
+    high: float  # exclusive
+    count: int
+
+
+@dataclass
+class CategoryRatings:
+    category: str
+    counts: List[int]  # counts[r] = books rated r, r = 0 (unknown) to 5
+
+
+@dataclass
+class AuthorTags:
+    author: str
+    tags: List[TagCount]  # tags on this author's quotes, with how many quotes carry each
+
+
 @dataclass
 class SummaryData:
     books_by_category: List[CategoryCount] = field(default_factory=list)
     books_by_rating: List[RatingCount] = field(default_factory=list)
     quotes_by_tag: List[TagCount] = field(default_factory=list)
     quotes_by_author: List[AuthorCount] = field(default_factory=list)
+    price_histogram: List[PriceBucket] = field(default_factory=list)
+    ratings_by_category: List[CategoryRatings] = field(default_factory=list)
+    tags_by_author: List[AuthorTags] = field(default_factory=list)
 
 
 # Top-level dataset
@@ -90,6 +149,26 @@ class Filters:
 Item = Union[BookItem, QuoteItem]
 
 
+def item_from_dict(data):
+    """Rebuild a BookItem/QuoteItem from its serialised (asdict) form."""
+    if data["type"] == "book":
+        return BookItem(**data)
+    data = dict(data)
+    # Items written before authors got their own table embedded the details.
+    details = data.pop("author_details", None)
+    if details is not None:
+        data["author_id"] = details["id"]
+    return QuoteItem(**data)
+
+
+def as_dict(obj):
+    """json.dumps default= for the records here, slotted or not (shallow: json recurses itself)."""
+    slots = getattr(type(obj), "__slots__", None)
+    if slots is not None:
+        return {name: getattr(obj, name) for name in slots}
+    return obj.__dict__
+
+
 @dataclass
 class Dataset:
     meta: MetaInfo
@@ -0,0 +1,141 @@
+# src/dedup.py
+import hashlib
+import re
+import threading
+from urllib.parse import parse_qsl, quote, unquote, urlencode, urlsplit, urlunsplit
+
+from metrics import get_logger, registry
+
+log = get_logger("dedup")
+
+DUPLICATES = registry.counter("scraper_duplicates_total", "Book pages dropped as duplicates, by how they were found")
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+# Query parameters that only say where a link came from, never which page it is.
+TRACKING_PARAMS = re.compile(r"utm_\w+|fbclid|gclid|ref|sessionid", re.I)
+# Characters left as they are in a canonical path; everything else is percent-encoded.
+PATH_SAFE = "/:@!$&'()*+,;=-._~"
+
+# Raw-HTML patterns, so duplicates are found without building a tree.
+UPC_RE = re.compile(r"<th>\s*UPC\s*</th>\s*<td>\s*([^<\s]+)\s*</td>", re.I)
+PRODUCT_MAIN_RE = re.compile(r'<div class="[^"]*\bproduct_main\b[^"]*">(.*?)</div>', re.S)
+
+
+def _remove_dot_segments(path):
+    out = []
+    for segment in path.split("/"):
+        if segment == "..":
+            if len(out) > 1:
+                out.pop()
+        elif segment != ".":
+            out.append(segment)
+    return "/".join(out) + ("/" if path.endswith(("/.", "/..")) else "")
+
+
+def canonical_url(url, index_page="index.html"):
+    """One spelling per page: lowercase scheme and host, no default port, fragment or tracking parameters.
+
+    Dot segments and repeated slashes are removed, percent-escapes
+    normalised and query parameters sorted. With index_page, a directory
+    URL and its index page (…/slug/ and …/slug/index.html) are the same
+    page, spelled the way books.toscrape.com links it.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    netloc = (parts.hostname or "").lower()
+    if parts.port is not None and parts.port != DEFAULT_PORTS.get(scheme):
+        netloc += f":{parts.port}"
+    path = _remove_dot_segments(re.sub(r"/{2,}", "/", parts.path or "/"))
+    path = quote(unquote(path), safe=PATH_SAFE)
+    if index_page and path.endswith("/"):
+        path += index_page
+    query = urlencode(sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not TRACKING_PARAMS.fullmatch(key)
+    ))
+    return urlunsplit((scheme, netloc, path, query, ""))
+
+
+def book_fingerprint(html):
+    """What identifies the product on a book page: its UPC, else a hash of the product_main block; None if neither."""
+    match = UPC_RE.search(html)
+    if match:
+        return "upc:" + match.group(1)
+    match = PRODUCT_MAIN_RE.search(html)
+    if match:
+        text = re.sub(r"\s+", " ", re.sub(r"<[^>]+>", " ", match.group(1))).strip()
+        return "product_main:" + hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+    return None
+
+
+class Deduplicator:
+    """For each content fingerprint, the URL it is kept under, and every other URL that served the same content.
+
+    canonical() is called after a page is fetched and before it is parsed;
+    a URL it maps to another one is an alias, and its page is not parsed.
+    The URL kept is the lexicographically smallest one seen, not the first
+    fetched, so ids, categories and aliases do not depend on which fetch
+    finished first. A page parsed before a smaller duplicate turned up is
+    superseded: superseded() lists those, for dropping their items when the
+    output is finalised (see sink.merge_items()).
+
+    Kept in memory, unless share() hands it a store that several processes
+    use (a SharedFrontier), so duplicates are found across a distributed crawl.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._canonical = {}  # fingerprint -> URL kept
+        self._aliases = {}  # alias URL -> fingerprint
+        self._superseded = set()
+        self._store = None
+
+    def share(self, store):
+        """Keep fingerprints and aliases in store (see SharedFrontier.canonical_for()), or in memory again with None."""
+        self._store = store
+
+    def canonical(self, url, fingerprint):
+        """The URL the fingerprinted content is kept under: url itself unless it is a duplicate."""
+        if fingerprint is None:
+            return url
+        if self._store is not None:
+            canonical = self._store.canonical_for(fingerprint, url)
+        else:
+            with self._lock:
+                canonical = self._canonical.setdefault(fingerprint, url)
+                if url < canonical:
+                    self._aliases[canonical] = fingerprint
+                    self._superseded.add(canonical)
+                    canonical = self._canonical[fingerprint] = url
+                elif url != canonical:
+                    self._aliases[url] = fingerprint
+        if canonical == url:
+            return url
+        DUPLICATES.inc(stage="content")
+        log.debug("[DUP] Same product as another page", url=url, canonical=canonical)
+        return canonical
+
+    def aliases(self):
+        """{alias URL: canonical URL} for every duplicate seen so far."""
+        if self._store is not None:
+            return self._store.aliases()
+        with self._lock:
+            return {url: self._canonical[fingerprint] for url, fingerprint in self._aliases.items()}
+
+    def superseded(self):
+        """Alias URLs whose pages were parsed before the URL kept instead turned up."""
+        if self._store is not None:
+            return self._store.superseded()
+        with self._lock:
+            return set(self._superseded)
+
+    def stats(self):
+        if self._store is not None:
+            return self._store.dedup_stats()
+        with self._lock:
+            return {"fingerprints": len(self._canonical), "aliases": len(self._aliases),
+                    "superseded": len(self._superseded)}
+
+
+# Shared by the run's book crawl; main writes its aliases out at the end.
+book_dedup = Deduplicator()
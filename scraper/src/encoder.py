@@ -0,0 +1,84 @@
+# src/encoder.py
+import gzip
+import json
+import shutil
+
+from data_types import as_dict
+
+try:
+    import orjson
+except ImportError:  # optional: the stdlib encoder below writes equivalent JSON, only slower
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# File suffix added by each output compression.
+COMPRESSIONS = {"gzip": ".gz", "zstd": ".zst"}
+
+# One encoder built once; json.dumps() with keyword arguments builds a new JSONEncoder on every call.
+_stdlib_encode = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), default=as_dict).encode
+
+
+def encode(obj):
+    """Compact UTF-8 JSON for records (slotted dataclasses), summaries and plain data.
+
+    Uses orjson when it is installed, which serialises dataclasses natively.
+    Both paths write equivalent JSON, not always the same bytes: float
+    spelling differs (orjson 1e16, json 1e+16), orjson rejects non-str keys
+    and writes NaN as null where json writes NaN.
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, default=as_dict)
+    return _stdlib_encode(obj).encode("utf-8")
+
+
+def encode_lines(items):
+    """JSONL bytes for items, one encode per item and one join for the batch."""
+    return b"".join([encode(item) + b"\n" for item in items])
+
+
+def open_output(path, compression=None):
+    """Open path for binary writing, compressed when asked; returns (file, actual path)."""
+    if compression is None:
+        return path.open("wb"), path
+    path = path.with_name(path.name + COMPRESSIONS[compression])
+    if compression == "gzip":
+        # mtime=0: identical content gives identical files, which keeps ETags and diffs stable.
+        return gzip.GzipFile(path, "wb", compresslevel=6, mtime=0), path
+    if zstandard is None:
+        raise RuntimeError("zstd output needs the zstandard package (pip install zstandard)")
+    return zstandard.ZstdCompressor(level=10).stream_writer(path.open("wb"), closefd=True), path
+
+
+def compress_file(path, compression):
+    """Write a compressed copy next to path (e.g. items.jsonl.gz); returns its path."""
+    out, out_path = open_output(path, compression)
+    with path.open("rb") as src, out:
+        shutil.copyfileobj(src, out, 1 << 20)
+    return out_path
+
+
+class BatchWriter:
+    """Collects encoded lines and writes them to a binary file in batches of about batch_bytes."""
+
+    def __init__(self, file, batch_bytes=1 << 16):
+        self.file = file
+        self.batch_bytes = batch_bytes
+        self._pending = []
+        self._size = 0
+
+    def write(self, data):
+        self._pending.append(data)
+        self._size += len(data)
+        if self._size >= self.batch_bytes:
+            self.drain()
+
+    def drain(self):
+        """Hand everything pending to the file in one write (the file may still buffer it)."""
+        if self._pending:
+            self.file.write(b"".join(self._pending))
+            self._pending.clear()
+            self._size = 0
@@ -0,0 +1,175 @@
+# src/engine.py
+import asyncio
+import time
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from cache import get_cache
+from concurrency import AimdLimit
+from http_client import DEFAULT_HEADERS, get_client, make_trace_config
+from ratelimit import rate_limiter as shared_rate_limiter
+from retry import retry_policy as shared_retry_policy
+from frontier import CrawlFrontier
+from metrics import get_logger, FETCH_BYTES, FETCH_FAILURES, FETCH_RETRIES, FETCH_SECONDS, HTTP_RESPONSES, IN_FLIGHT
+
+log = get_logger("engine")
+
+
+class CrawlEngine:
+    """Fetches pages on a single asyncio event loop.
+
+    Concurrency is bounded twice: at most ``max_per_host`` requests are open
+    against any one host and at most ``max_in_flight`` requests are open in
+    total. Waiting requests are coroutines, not threads, so hundreds of them
+    can be pending at once. Hosts given their own pool size through
+    http_client.configure_client(pool_sizes=...) use that instead of
+    ``max_per_host``. With ``adaptive`` (the default) those sizes are only
+    the starting point: each host's limit is an AimdLimit that grows while
+    the host answers quickly and backs off on 429/5xx, timeouts and rising
+    latency, up to ``max_in_flight``. Connections are kept alive and reused
+    between requests.
+    Request spacing per domain comes from the shared DomainRateLimiter and
+    retries, their delays and per-host circuit breaking from the shared
+    RetryPolicy (``retries`` overrides its number of attempts).
+    When the response cache is enabled (cache.open_cache) requests are
+    revalidated against it, or replayed from it alone in offline mode.
+
+    Use it as an async context manager so the HTTP session is opened and
+    closed on the running loop::
+
+        async with CrawlEngine(max_per_host=10) as engine:
+            html = await engine.get(url)
+    """
+
+    def __init__(self, max_per_host=10, max_in_flight=100, timeout=10, retries=None, rate_limiter=None, frontier=None,
+                 adaptive=True, retry_policy=None):
+        self.max_per_host = max_per_host
+        self.adaptive = adaptive
+        self.max_in_flight = max_in_flight
+        self.timeout = timeout
+        self.retries = retries
+        self.rate_limiter = rate_limiter or shared_rate_limiter
+        self.retry_policy = retry_policy or shared_retry_policy
+        # Each engine is one crawl run; without a persistent frontier it gets a fresh in-memory one.
+        self.frontier = frontier or CrawlFrontier()
+        self._session = None
+        self._in_flight = None
+        self._host_slots = {}
+
+    async def __aenter__(self):
+        self._in_flight = asyncio.Semaphore(self.max_in_flight)
+        self._host_slots = {}
+        # The host semaphores below enforce per-host limits, so the connector only caps the total.
+        connector = aiohttp.TCPConnector(limit=self.max_in_flight, keepalive_timeout=30, ttl_dns_cache=300)
+        self._session = aiohttp.ClientSession(
+            connector=connector,
+            headers=DEFAULT_HEADERS,
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+            trace_configs=[make_trace_config()],
+        )
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self._session.close()
+        self._session = None
+
+    def _host_slot(self, url):
+        host = urlsplit(url).netloc
+        slot = self._host_slots.get(host)
+        if slot is None:
+            # Only ever touched from the loop thread, so no lock is needed.
+            size = get_client().pool_sizes.get(host, self.max_per_host)
+            if self.adaptive:
+                slot = AimdLimit(host, initial=size, max_limit=self.max_in_flight)
+            else:
+                slot = asyncio.Semaphore(size)
+            self._host_slots[host] = slot
+        return slot
+
+    def concurrency(self):
+        """Current adaptive limit and in-flight count per host."""
+        return {host: slot.stats() for host, slot in self._host_slots.items() if isinstance(slot, AimdLimit)}
+
+    async def get(self, url):
+        """Return the body of url, or None once every attempt has failed."""
+        cache = get_cache()
+        if cache is not None and cache.offline:
+            html = cache.replay(url)
+            if html is None:
+                log.warning(f"[CACHE] Offline miss for {url}")
+            return html
+
+        cached = cache.lookup(url) if cache is not None else None
+        headers = cached.conditional_headers() if cached is not None else None
+
+        attempt = self.retry_policy.start(url, self.retries)
+        try:
+            while attempt is not None:
+                # Wait for the domain's rate limit before taking a slot, so waiting holds nothing.
+                await self.rate_limiter.wait(url)
+                slot = self._host_slot(url)
+                delay = None
+                # Host slot first: a task queued behind a saturated (or AIMD-cut) host must not
+                # hold one of the global slots that requests to other hosts need meanwhile.
+                async with slot, self._in_flight:
+                    IN_FLIGHT.inc()
+                    started = time.perf_counter()
+                    signal = None
+                    try:
+                        async with self._session.get(url, headers=headers) as resp:
+                            HTTP_RESPONSES.inc(status=str(resp.status))
+                            if resp.status == 429:
+                                signal = "throttled"
+                            elif resp.status >= 500:
+                                signal = "error"
+                            if resp.status == 304 and cached is not None:
+                                log.debug("[CACHE] Not modified", url=url)
+                                attempt.succeeded()
+                                return cache.revalidated(cached)
+                            if resp.status == 200:
+                                FETCH_BYTES.inc(len(await resp.read()))
+                                # A mislabelled charset must not raise past the retry policy.
+                                text = await resp.text(errors="replace")
+                                if cache is not None:
+                                    cache.store(url, text, resp.headers.get("ETag"), resp.headers.get("Last-Modified"))
+                                log.debug("[OK] Fetched", url=url)
+                                attempt.succeeded()
+                                return text
+                            log.warning(f"[WARN] Status {resp.status} for {url}")
+                            delay = attempt.failed(resp.status, resp.headers.get("Retry-After"))
+                    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                        signal = "error"
+                        log.warning(f"[ERROR] Attempt {attempt.number} failed for {url}: {e}")
+                        delay = attempt.failed(error=e)
+                    finally:
+                        elapsed = time.perf_counter() - started
+                        FETCH_SECONDS.observe(elapsed, source="engine")
+                        if self.adaptive:
+                            slot.record(elapsed, signal)
+                        IN_FLIGHT.dec()
+                if delay is None:
+                    break
+                FETCH_RETRIES.inc(source="engine")
+                await asyncio.sleep(delay)
+                if not attempt.resume():
+                    break
+        finally:
+            # Cancelled (e.g. a speculative page fetch no longer needed) or crashed: hand back a half-open probe.
+            if attempt is not None:
+                attempt.release()
+
+        FETCH_FAILURES.inc(source="engine")
+        log.error(f"[FAIL] Could not fetch {url}")
+        return None
+
+def run_crawl(crawl, *args, max_workers=10, frontier=None, adaptive=True):
+    """Run ``crawl(engine, *args)`` to completion on a fresh event loop and engine.
+
+    max_workers is the per-host concurrency, the starting point when adaptive.
+    """
+    async def runner():
+        async with CrawlEngine(max_per_host=max_workers, frontier=frontier, adaptive=adaptive) as engine:
+            return await crawl(engine, *args)
+
+    return asyncio.run(runner())
@@ -1,147 +1,346 @@
-from concurrent.futures import ThreadPoolExecutor, as_completed
-import threading
-from datetime import datetime
-import random
-from urllib.parse import urljoin
+import asyncio
+from urllib.parse import urljoin, urlsplit
 
 import requests
-from bs4 import BeautifulSoup
 import time
 
 from tqdm import tqdm
 
-from robots import can_fetch
-from pagination import get_books_category_next_page_url, get_quotes_next_page_url
+from cache import get_cache
+from robots import can_fetch, can_fetch_async, robots_policy
+from http_client import get_client
+from ratelimit import rate_limiter
+from retry import retry_policy
+from engine import run_crawl
+from frontier import CrawlFrontier
+from pagination import (
+    books_category_page_url,
+    books_listing_has_items,
+    get_books_category_next_page_url,
+    get_books_category_page_count,
+    get_quotes_next_page_url,
+    quotes_page_has_items,
+    quotes_page_url,
+)
+from data_types import FetchedPage
+from dedup import DUPLICATES, canonical_url
+from html_backend import get_backend
+from metrics import get_logger, FETCH_FAILURES, FETCH_RETRIES
 
-visited = set()
-visited_lock = threading.Lock()
+# Visited URLs for blocking fetch_page calls; engine crawls use their own run's frontier.
+blocking_frontier = CrawlFrontier()
 
 BASE_BOOKS_URL = "https://books.toscrape.com/"
 BASE_QUOTES_URL = "https://quotes.toscrape.com/"
+QUOTES_HOST = urlsplit(BASE_QUOTES_URL).netloc
 
-def log(msg):
-    print(f"[{datetime.now().isoformat()}] {msg}")
+# Numbered pages requested ahead of a pagination walk when the page count is unknown;
+# at most this many requests go past the real last page.
+PAGES_AHEAD = 2
 
-def fetch_page(url, retries=3, delay_range=(0.5, 1.5)):
-    with visited_lock:
-        if url in visited:
-            log(f"[SKIP] Already visited {url}")
-            return None
-        visited.add(url)
+log = get_logger("fetcher")
+
+def reset_visited():
+    """Start a fresh visited set for blocking fetch_page calls, e.g. before a second crawl."""
+    global blocking_frontier
+    blocking_frontier = CrawlFrontier()
+
+def claim_url(url, frontier=None):
+    """Mark url as visited in the run; False if some other fetch already claimed it."""
+    if not (frontier or blocking_frontier).claim(url):
+        log.debug("[SKIP] Already visited", url=url)
+        return False
+    return True
+
+def get_with_retries(url, retries=None):
+    """Blocking GET under the shared RetryPolicy (see retry.py): the body, or None once it gives up.
+
+    No robots.txt or visited checks; callers do those first.
+    """
+    cache = get_cache()
+    if cache is not None and cache.offline:
+        return cache.replay(url)
+
+    attempt = retry_policy.start(url, retries)
+    try:
+        while attempt is not None:
+            rate_limiter.wait_blocking(url)
+            try:
+                resp = get_client().get(url)
+                if resp.status_code == 200:
+                    log.debug("[OK] Fetched", url=url)
+                    attempt.succeeded()
+                    return resp.text
+                log.warning(f"[WARN] Status {resp.status_code} for {url}")
+                delay = attempt.failed(resp.status_code, resp.headers.get("Retry-After"))
+            except requests.RequestException as e:
+                log.warning(f"[ERROR] Attempt {attempt.number} failed for {url}: {e}")
+                delay = attempt.failed(error=e)
+            if delay is None:
+                break
+            FETCH_RETRIES.inc(source="blocking")
+            time.sleep(delay)
+            if not attempt.resume():
+                break
+    finally:
+        # Interrupted or crashed mid-try: hand back a half-open probe.
+        if attempt is not None:
+            attempt.release()
+
+    FETCH_FAILURES.inc(source="blocking")
+    log.error(f"[FAIL] Could not fetch {url}")
+    return None
+
+def fetch_page(url, retries=None):
+    """Blocking single-page fetch, kept for callers outside the crawl engine."""
+    if not claim_url(url):
+        return None
 
     if not can_fetch(url):
         log(f"[BLOCKED] robots.txt prevents fetching {url}")
         return None
 
-    for attempt in range(1, retries + 1):
-        try:
-            resp = requests.get(url, timeout=10)
-            if resp.status_code == 200:
-                time.sleep(random.uniform(0.5, 1.5))
-                log(f"[OK] Fetched {url}")
-                return resp.text
-            else:
-                log(f"[WARN] Status {resp.status_code} for {url}")
-        except requests.RequestException as e:
-            log(f"[ERROR] Attempt {attempt} failed for {url}: {e}")
-            time.sleep(2 ** attempt * 0.5)  # exponential backoff
+    return get_with_retries(url, retries)
 
-    log(f"[FAIL] Could not fetch {url} after {retries} attempts")
-    return None
+async def prefetch_robots():
+    """Read both sites' robots.txt up front, so no crawl task waits on it later."""
+    await robots_policy.prefetch([BASE_BOOKS_URL, BASE_QUOTES_URL])
 
-def get_books_category_urls():
-    html = fetch_page(BASE_BOOKS_URL)
-    if not html:
-        return {}
+async def fetch_page_async(engine, url):
+    """Engine counterpart of fetch_page: same visited and robots.txt checks, scoped to the engine's run."""
+    if not claim_url(url, engine.frontier):
+        return None
+
+    if not await can_fetch_async(url):
+        log(f"[BLOCKED] robots.txt prevents fetching {url}")
+        return None
+
+    return await engine.get(url)
+
+async def crawl_pages(engine, urls):
+    """Fetch urls concurrently and return the successful ones as FetchedPages, in order."""
+    htmls = await asyncio.gather(*(fetch_page_async(engine, url) for url in urls))
+    return [FetchedPage(url=url, html=html) for url, html in zip(urls, htmls) if html]
 
-    soup = BeautifulSoup(html, "lxml")
+async def crawl_books_category_urls(engine):
+    frontier = engine.frontier
+    html = await fetch_page_async(engine, BASE_BOOKS_URL)
+    while not html:
+        # With a shared frontier another worker may have the home page; it publishes the list.
+        categories = await frontier.published("categories", BASE_BOOKS_URL)
+        if categories is not None:
+            return categories
+        if not frontier.lease_expired(BASE_BOOKS_URL):
+            return {}  # this worker's own fetch failed
+        log.warning("[FRONTIER] The worker fetching the home page stopped; fetching it here")
+        html = await fetch_page_async(engine, BASE_BOOKS_URL)
+
+    backend = get_backend()
     categories = {}
-    for a in soup.select(".side_categories ul ul li a"):
-        name = a.get_text(strip=True)
-        url = urljoin(BASE_BOOKS_URL, a['href'])
+    for a in backend.select(backend.tree(html), "categories"):
+        name = backend.stripped_text(a)
+        url = urljoin(BASE_BOOKS_URL, backend.attr(a, "href"))
         categories[name] = url
+    engine.frontier.publish("categories", categories)
     return categories
 
 def extract_book_links_from_page(url, html):
-    soup = BeautifulSoup(html, "lxml")
-    return [urljoin(url, a['href']) for a in soup.select("article.product_pod h3 a")]
+    """Book page URLs linked from a listing page, canonicalised so one book has one URL."""
+    backend = get_backend()
+    return [
+        canonical_url(urljoin(url, backend.attr(a, "href")))
+        for a in backend.select(backend.tree(html), "book_links")
+    ]
 
-def fetch_books_in_category(category_name, category_url, max_pages=500):
-    book_links = []
-    url = category_url
-    page_count = 0
+async def walk_pages(engine, url, next_url_of, page_url=None, count_pages=None, has_items=None, max_pages=0,
+                     ahead=PAGES_AHEAD):
+    """Follow a listing's next links from url, yielding each page as a FetchedPage in order.
 
-    while url:
-        if max_pages and page_count >= max_pages:
-            log(f"[STOP] Reached max pages for {category_name}")
-            break
+    page_url(n) is the URL page n would have. Once page 1's next link is
+    page_url(2) the listing is taken to be numbered, and later pages are
+    requested before the walk reaches them: all of them when count_pages
+    reads the total from page 1, otherwise only ``ahead`` at a time, since
+    every page guessed past the end is a wasted request to the host. Each
+    page's next link is still checked against the pattern; the first one
+    that does not match drops back to fetching one link at a time.
 
-        html = fetch_page(url)
+    A page without a next link, or one has_items(tree) finds empty, ends
+    the walk, and as soon as one fetched ahead turns out to be such a page
+    nothing past it is requested.
+    """
+    number = 1 if page_url else None  # url's page number, while the pattern holds
+    last = None  # the last page there can be, once known
+    pending = {}  # page number -> task fetching it ahead of the walk
+    scheduled = 1
+    fetched = 0
+
+    def parse(html, page_url):
+        tree = get_backend().tree(html)
+        return tree, next_url_of(tree, page_url), has_items is None or has_items(tree)
+
+    async def fetch_ahead(n):
+        nonlocal last
+        html = await fetch_page_async(engine, page_url(n))
         if not html:
-            break
+            return None
+        tree, next_url, items = parse(html, page_url(n))
+        if not items or next_url is None:
+            end = n if items else n - 1
+            last = end if last is None else min(last, end)
+        return html, tree, next_url, items
 
-        book_links.extend(extract_book_links_from_page(url, html))
-        url = get_books_category_next_page_url(html, url)
-        page_count += 1
+    try:
+        while url:
+            if max_pages and fetched >= max_pages:
+                log(f"[STOP] Reached max pages ({max_pages}) at {url}")
+                break
+
+            task = pending.pop(number, None) if number else None
+            if task:
+                page = await task
+            else:
+                html = await fetch_page_async(engine, url)
+                page = (html, *parse(html, url)) if html else None
+            if page is None:
+                if number and last and number < last:
+                    # The page count says where the rest are, so one failed page does not end the walk.
+                    number += 1
+                    url = page_url(number)
+                    continue
+                log.error(f"[FAIL] Failed to fetch {url}")
+                break
 
-    log(f"[DONE] Fetched {len(book_links)} books from {category_name}")
-    return {category_name: list(set(book_links))}  # dedup
+            html, tree, next_url, items = page
+            if not items:
+                log.debug("[STOP] Empty listing page", url=url)
+                break
+            fetched += 1
+            if number == 1 and count_pages:
+                last = count_pages(tree)
+            yield FetchedPage(url=url, html=html, soup=tree)
 
-def fetch_all_books_parallel(max_workers=10):
-    categories = get_books_category_urls()
+            if number and next_url == page_url(number + 1):
+                number += 1
+                horizon = number + ahead - 1 if last is None else last
+                if max_pages:
+                    horizon = min(horizon, max_pages)
+                for n in range(max(number, scheduled + 1), horizon + 1):
+                    pending[n] = asyncio.ensure_future(fetch_ahead(n))
+                scheduled = max(scheduled, horizon)
+            else:
+                number = None
+            url = next_url
+    finally:
+        for task in pending.values():  # past the end, or the walk stopped early
+            task.cancel()
+
+async def crawl_books_in_category(engine, category_name, category_url, max_pages=500):
+    book_links = []
+    # Pages are numbered (page-2.html, ...) and page 1 says "Page 1 of N", so the rest are fetched together.
+    pages = walk_pages(
+        engine, category_url, get_books_category_next_page_url,
+        page_url=lambda n: books_category_page_url(category_url, n),
+        count_pages=get_books_category_page_count, has_items=books_listing_has_items, max_pages=max_pages,
+    )
+    async for page in pages:
+        book_links.extend(extract_book_links_from_page(page.url, page.soup))
+
+    unique = sorted(set(book_links))  # dedup, in a stable order
+    if len(unique) < len(book_links):
+        DUPLICATES.inc(len(book_links) - len(unique), stage="url")
+    log(f"[DONE] Fetched {len(unique)} books from {category_name}")
+    return {category_name: unique}
+
+async def crawl_all_books(engine):
+    categories = await crawl_books_category_urls(engine)
     all_books = {}
 
     log(f"Found {len(categories)} categories: {list(categories.keys())}")
+    # In a distributed crawl each worker walks its own share of the categories.
+    categories = {name: url for name, url in categories.items() if engine.frontier.owns(name)}
 
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        futures = {executor.submit(fetch_books_in_category, name, url): name for name, url in categories.items()}
+    # Every category walks its own pagination; the engine bounds how many run against the host at once.
+    tasks = {
+        asyncio.ensure_future(crawl_books_in_category(engine, name, url)): name
+        for name, url in categories.items()
+    }
 
-        for future in tqdm(as_completed(futures), total=len(futures), desc="Fetching categories"):
-            category_name = futures[future]
-            try:
-                result = future.result()
-                if result:
-                    for cat, links in result.items():
-                        if cat in all_books:
-                            all_books[cat].extend(links)
-                        else:
-                            all_books[cat] = links
-            except Exception as e:
-                log(f"[ERROR] Fetching category {category_name}: {e}")
-
-    # Final dedup
-    for cat in all_books:
-        all_books[cat] = list(set(all_books[cat]))
+    for future in tqdm(asyncio.as_completed(tasks), total=len(tasks), desc="Fetching categories"):
+        try:
+            result = await future
+            if result:
+                for cat, links in result.items():
+                    if cat in all_books:
+                        all_books[cat].extend(links)
+                    else:
+                        all_books[cat] = links
+        except Exception as e:
+            log.error(f"[ERROR] Fetching category: {e}")
+
+    # Final dedup, with categories back in site order whatever order they finished in.
+    # A book listed in several categories stays in the first one only.
+    seen = set()
+    ordered = {}
+    for cat in categories:
+        if cat not in all_books:
+            continue
+        links = sorted(set(all_books[cat]))
+        ordered[cat] = [url for url in links if url not in seen]
+        if len(ordered[cat]) < len(links):
+            DUPLICATES.inc(len(links) - len(ordered[cat]), stage="url")
+        seen.update(links)
+    all_books = ordered
 
     log("Finished fetching all categories.")
     return all_books
 
-def fetch_all_quotes_pages_parallel(max_workers=10, max_pages=1000):
-    urls = []
-    url = BASE_QUOTES_URL
+async def iter_quote_pages(engine, max_pages=1000):
+    """Walk the quotes pagination, yielding each page as a FetchedPage as soon as it arrives.
+
+    The fetched HTML (and the tree built to find the next link) travels with
+    the page so the quote parser does not download or parse it a second time.
+    Pages are /page/N/ with no total shown, so walk_pages keeps PAGES_AHEAD in flight.
+    """
     page_count = 0
     pbar = tqdm(desc="Fetching quote pages", unit="page")
 
-    while url:
-        if max_pages and page_count >= max_pages:
-            log(f"[STOP] Reached max pages for quotes")
-            break
-
-        html = fetch_page(url)
-        if not html:
-            log(f"[FAIL] Failed to fetch {url}")
-            break
-
-        urls.append(url)
+    pages = walk_pages(
+        engine, BASE_QUOTES_URL, get_quotes_next_page_url,
+        page_url=lambda n: quotes_page_url(BASE_QUOTES_URL, n), has_items=quotes_page_has_items,
+        max_pages=max_pages,
+    )
+    async for page in pages:
         page_count += 1
-        url = get_quotes_next_page_url(html, url)
         pbar.update(1)
+        yield page
 
     pbar.close()
-    log(f"Total quote pages fetched: {len(urls)}")
-    return urls
+    log(f"Total quote pages fetched: {page_count}")
+
+async def crawl_quote_pages(engine, max_pages=1000):
+    """All quote pages as a list of FetchedPages (see iter_quote_pages)."""
+    return [page async for page in iter_quote_pages(engine, max_pages)]
+
+# ----------------------------
+# Blocking entry points, each running its own event loop
+# ----------------------------
+
+def get_books_category_urls():
+    return run_crawl(crawl_books_category_urls)
+
+def fetch_books_in_category(category_name, category_url, max_pages=500):
+    return run_crawl(crawl_books_in_category, category_name, category_url, max_pages)
+
+def fetch_all_books_parallel(max_workers=10):
+    return run_crawl(crawl_all_books, max_workers=max_workers)
+
+def fetch_all_quotes_pages_parallel(max_workers=10, max_pages=1000):
+    return run_crawl(crawl_quote_pages, max_pages, max_workers=max_workers)
+
+def fetch_pages(urls, max_workers=10):
+    return run_crawl(crawl_pages, list(urls), max_workers=max_workers)
 
 if __name__ == "__main__":
     all_quotes_pages = fetch_all_quotes_pages_parallel(max_workers=10)
     log(f"Found {len(all_quotes_pages)} quotes pages in total.")
-    log(all_quotes_pages)
+    log.debug("Quotes pages", urls=[page.url for page in all_quotes_pages])
@@ -0,0 +1,555 @@
+# src/frontier.py
+import json
+import sqlite3
+import threading
+import asyncio
+import time
+import uuid
+import zlib
+from datetime import datetime
+
+from metrics import get_logger, FRONTIER_PENDING
+
+log = get_logger("frontier")
+
+
+class CrawlFrontier:
+    """Visited and pending URLs for one crawl run, kept in SQLite.
+
+    Every run gets its own run_id, so URLs visited by an earlier crawl do not
+    leak into a new one. Within a run there are two layers:
+
+    - claim() is the in-process "already being fetched" check that used to be
+      fetcher.visited; it is never persisted.
+    - add()/pop()/complete() form a persistent, priority-ordered work queue
+      (higher priority first, then insertion order). complete() is buffered
+      until checkpoint(), which the output sink calls after it has fsynced,
+      so a URL is never recorded as done before its items are on disk.
+      Queue changes from add()/pop()/fail() are committed by the same
+      checkpoint rather than one by one: losing them in a crash costs
+      nothing, as a resumed run queues its URLs again and redoes claimed ones.
+
+    With path=":memory:" (the default) nothing survives the process. With a
+    file path, CrawlFrontier(path, resume=True) picks up the latest
+    unfinished run: completed URLs stay done and interrupted ones go back to
+    pending, as do failed ones, to be tried again. Runs are tagged with their KIND, so a distributed run (see
+    SharedFrontier) sharing the file is never resumed as a plain one.
+    """
+
+    KIND = "local"
+
+    def __init__(self, path=":memory:", run_id=None, resume=False):
+        self.path = str(path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS runs (
+                run_id TEXT PRIMARY KEY,
+                started_at REAL NOT NULL,
+                finished_at REAL
+            );
+            CREATE TABLE IF NOT EXISTS urls (
+                run_id TEXT NOT NULL,
+                url TEXT NOT NULL,
+                state TEXT NOT NULL,
+                priority INTEGER NOT NULL DEFAULT 0,
+                seq INTEGER NOT NULL,
+                data TEXT,
+                PRIMARY KEY (run_id, url)
+            );
+            CREATE INDEX IF NOT EXISTS urls_pending ON urls (run_id, state, priority DESC, seq);
+            """
+        )
+        try:
+            self._conn.execute("ALTER TABLE runs ADD COLUMN kind TEXT NOT NULL DEFAULT 'local'")
+        except sqlite3.OperationalError as e:  # already there
+            if "duplicate column" not in str(e):
+                raise
+        self._claimed = set()
+        self._completed = set()
+        self._published = {}
+        self._seq = 0
+        self.resumed = False
+
+        if resume:
+            row = self._conn.execute(
+                "SELECT run_id FROM runs WHERE finished_at IS NULL AND kind = ?"
+                + (" AND run_id = ?" if run_id else "")
+                + " ORDER BY started_at DESC LIMIT 1",
+                (self.KIND, run_id) if run_id else (self.KIND,),
+            ).fetchone()
+            if row:
+                self.run_id = row[0]
+                self.resumed = True
+                # Whatever was in flight when the process died is redone, and failures are retried.
+                self._conn.execute(
+                    "UPDATE urls SET state = 'pending' WHERE run_id = ? AND state IN ('claimed', 'failed')",
+                    (self.run_id,),
+                )
+                self._seq = self._conn.execute(
+                    "SELECT COALESCE(MAX(seq), 0) FROM urls WHERE run_id = ?", (self.run_id,)
+                ).fetchone()[0]
+                self._conn.commit()
+                counts = self.counts()
+                FRONTIER_PENDING.inc(counts.get("pending", 0))
+                log(f"[FRONTIER] Resuming run {self.run_id}: {counts}")
+                return
+
+        self.run_id = run_id or datetime.now().strftime("%Y%m%d%H%M%S-") + uuid.uuid4().hex[:8]
+        self._conn.execute(
+            "INSERT OR IGNORE INTO runs (run_id, started_at, kind) VALUES (?, ?, ?)",
+            (self.run_id, time.time(), self.KIND),
+        )
+        self._conn.commit()
+
+    # In-process visited check
+
+    def claim(self, url):
+        """Mark url as being fetched in this process; False if it already was."""
+        with self._lock:
+            if url in self._claimed:
+                return False
+            self._claimed.add(url)
+            return True
+
+    # Partitioning, a no-op for a single process (see SharedFrontier)
+
+    def owns(self, key):
+        """Whether this process should crawl the part of the site named key (a category, a host)."""
+        return True
+
+    def publish(self, key, value):
+        """Make a value computed once per run (e.g. the category list) available to every worker."""
+        self._published[key] = value
+
+    async def published(self, key, url=None):
+        """The value published under key, or None."""
+        return self._published.get(key)
+
+    def lease_expired(self, url):
+        """Whether another worker claimed url and stopped before finishing it; never, in one process."""
+        return False
+
+    # Persistent work queue
+
+    def add(self, url, priority=0, data=None):
+        """Queue url unless this run already knows it; returns True if it was new."""
+        return self.add_many([(url, data)], priority) == 1
+
+    def add_many(self, entries, priority=0):
+        """Queue every (url, data) pair this run does not know yet, in one statement; returns how many were new."""
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO urls (run_id, url, state, priority, seq, data) VALUES (?, ?, 'pending', ?, ?, ?)",
+                [(self.run_id, url, priority, self._next_seq(), json.dumps(data)) for url, data in entries],
+            )
+            added = self._conn.total_changes - before
+        FRONTIER_PENDING.inc(added)
+        return added
+
+    def _next_seq(self):
+        self._seq += 1
+        return self._seq
+
+    def pop(self):
+        """Claim the highest-priority pending URL; returns (url, data) or None when the queue is empty."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT url, data FROM urls WHERE run_id = ? AND state = 'pending' "
+                "ORDER BY priority DESC, seq LIMIT 1",
+                (self.run_id,),
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE urls SET state = 'claimed' WHERE run_id = ? AND url = ?", (self.run_id, row[0])
+            )
+            FRONTIER_PENDING.dec()
+            return row[0], json.loads(row[1])
+
+    def is_done(self, url):
+        with self._lock:
+            if url in self._completed:
+                return True
+            row = self._conn.execute(
+                "SELECT state FROM urls WHERE run_id = ? AND url = ?", (self.run_id, url)
+            ).fetchone()
+            return row is not None and row[0] == "done"
+
+    def complete(self, url):
+        """Record url as finished; persisted at the next checkpoint()."""
+        with self._lock:
+            self._completed.add(url)
+
+    def fail(self, url):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE urls SET state = 'failed' WHERE run_id = ? AND url = ?", (self.run_id, url)
+            )
+
+    def checkpoint(self):
+        """Persist every complete() since the last checkpoint in one transaction."""
+        with self._lock:
+            completed, self._completed = self._completed, set()
+            self._conn.executemany(
+                "INSERT INTO urls (run_id, url, state, seq) VALUES (?, ?, 'done', 0) "
+                "ON CONFLICT (run_id, url) DO UPDATE SET state = 'done'",
+                [(self.run_id, url) for url in completed],
+            )
+            self._conn.commit()
+
+    def counts(self):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT state, COUNT(*) FROM urls WHERE run_id = ? GROUP BY state", (self.run_id,)
+            ).fetchall()
+        return dict(rows)
+
+    def finish(self):
+        """Mark the run complete and drop its per-URL rows; it can no longer be resumed.
+
+        Returns True: this process finished the run (see SharedFrontier.finish()).
+        """
+        self.checkpoint()
+        with self._lock:
+            self._conn.execute("UPDATE runs SET finished_at = ? WHERE run_id = ?", (time.time(), self.run_id))
+            self._conn.execute("DELETE FROM urls WHERE run_id = ?", (self.run_id,))
+            self._conn.commit()
+        return True
+
+    def close(self):
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
+
+
+class SharedFrontier(CrawlFrontier):
+    """A CrawlFrontier shared by several worker processes through one SQLite file.
+
+    Every worker opens the same path with the same run_id and its own index
+    (worker 0..workers-1); a worker restarted with its index resumes its
+    share. On top of CrawlFrontier:
+
+    - claim() is fleet-wide: the first worker to claim a URL holds a lease
+      on it for lease_seconds, and no other worker fetches it unless the
+      lease runs out (its worker died). Leases on queued URLs are renewed at
+      every checkpoint(); others only cover the fetch itself.
+    - owns() splits the crawl between workers by a stable hash of a
+      category or host, and add() tags queued URLs with the same partition.
+      pop() serves a worker its own partition first, then takes pending
+      URLs from the others' (or ones whose lease expired).
+    - publish()/published() share values such as the category list, so
+      only one worker fetches the page they come from.
+    - canonical_for()/aliases()/superseded() keep the content fingerprints
+      of a dedup.Deduplicator, so duplicates are found across workers.
+    - finish() returns True only for the last worker to finish, which
+      should then merge the workers' outputs.
+
+    SQLite in WAL mode is the stand-in for a networked store: workers on
+    several machines need the file (and the data directory) on shared storage.
+    """
+
+    KIND = "shared"
+
+    def __init__(self, path, run_id, worker=0, workers=1, lease_seconds=120.0, clock=time.time):
+        if not 0 <= worker < workers:
+            raise ValueError(f"worker must be in 0..{workers - 1}, got {worker}")
+        super().__init__(path, run_id=run_id)
+        self.worker = worker
+        self.workers = workers
+        self.lease_seconds = lease_seconds
+        self.clock = clock
+        self._finished_run = False
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA busy_timeout = 30000")
+        for column in ("worker INTEGER", "lease_until REAL", "part INTEGER"):
+            try:
+                self._conn.execute(f"ALTER TABLE urls ADD COLUMN {column}")
+            except sqlite3.OperationalError as e:  # already there, from another worker or an earlier run
+                if "duplicate column" not in str(e):
+                    raise
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS workers (
+                run_id TEXT NOT NULL,
+                worker INTEGER NOT NULL,
+                started_at REAL NOT NULL,
+                finished_at REAL,
+                PRIMARY KEY (run_id, worker)
+            );
+            CREATE TABLE IF NOT EXISTS published (
+                run_id TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                PRIMARY KEY (run_id, key)
+            );
+            CREATE TABLE IF NOT EXISTS fingerprints (
+                run_id TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                url TEXT NOT NULL,
+                PRIMARY KEY (run_id, fingerprint)
+            );
+            CREATE TABLE IF NOT EXISTS aliases (
+                run_id TEXT NOT NULL,
+                url TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                superseded INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (run_id, url)
+            );
+            """
+        )
+        with self._lock:
+            finished, kind = self._conn.execute(
+                "SELECT finished_at, kind FROM runs WHERE run_id = ?", (run_id,)
+            ).fetchone()
+            if kind != self.KIND:
+                raise ValueError(f"run {run_id} is not a distributed run; start one with another run id")
+            if finished is not None:
+                raise ValueError(f"run {run_id} already finished; start a new one with another run id")
+            cur = self._conn.execute(
+                "INSERT OR IGNORE INTO workers (run_id, worker, started_at) VALUES (?, ?, ?)",
+                (run_id, worker, time.time()),
+            )
+            if cur.rowcount == 0:
+                self.resumed = True
+                self._conn.execute(
+                    "UPDATE workers SET finished_at = NULL WHERE run_id = ? AND worker = ?", (run_id, worker)
+                )
+                # Queued URLs this worker held when it stopped go back to the queue; bare claims
+                # (seq 0: listing, author and quote pages) are dropped so it can claim them again.
+                self._conn.execute(
+                    "DELETE FROM urls WHERE run_id = ? AND worker = ? AND state = 'claimed' AND seq = 0",
+                    (run_id, worker),
+                )
+                self._conn.execute(  # failed ones are tried again, as in a resumed CrawlFrontier
+                    "UPDATE urls SET state = 'pending', worker = NULL WHERE run_id = ? AND worker = ? "
+                    "AND state IN ('claimed', 'failed')",
+                    (run_id, worker),
+                )
+            self._seq = self._conn.execute(
+                "SELECT COALESCE(MAX(seq), 0) FROM urls WHERE run_id = ?", (run_id,)
+            ).fetchone()[0]
+            self._conn.commit()
+        log(f"[FRONTIER] Worker {worker}/{workers} {'rejoined' if self.resumed else 'joined'} run {run_id}")
+
+    def partition(self, key):
+        if not isinstance(key, str):
+            key = json.dumps(key)
+        return zlib.crc32(key.encode()) % self.workers
+
+    def owns(self, key):
+        return self.partition(key) == self.worker
+
+    def claim(self, url):
+        """Lease url to this worker; False if another live worker has it or another worker finished it.
+
+        A worker may claim a URL it finished before a restart again, so a
+        resumed pagination walk can pass through pages that are already done.
+        """
+        if not super().claim(url):
+            return False
+        now = self.clock()
+        with self._lock:
+            cur = self._conn.execute(
+                "UPDATE urls SET state = CASE state WHEN 'done' THEN 'done' ELSE 'claimed' END, "
+                "worker = ?, lease_until = ? "
+                "WHERE run_id = ? AND url = ? AND (state = 'pending' OR (state != 'failed' AND worker = ?) "
+                "OR (state = 'claimed' AND lease_until < ?))",
+                (self.worker, now + self.lease_seconds, self.run_id, url, self.worker, now),
+            )
+            if cur.rowcount == 0:
+                cur = self._conn.execute(
+                    "INSERT OR IGNORE INTO urls (run_id, url, state, seq, worker, lease_until) "
+                    "VALUES (?, ?, 'claimed', 0, ?, ?)",
+                    (self.run_id, url, self.worker, now + self.lease_seconds),
+                )
+            self._conn.commit()
+        if cur.rowcount == 1:
+            return True
+        with self._lock:
+            self._claimed.discard(url)  # it may be ours to take once that lease expires
+        log.debug("[SKIP] Claimed by another worker", url=url)
+        return False
+
+    # Unlike CrawlFrontier, every queue change is committed at once: an open
+    # transaction would hold the write lock the other workers need.
+
+    def add_many(self, entries, priority=0):
+        """Queue each url in the partition of its data (e.g. the book's category), in one transaction."""
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO urls (run_id, url, state, priority, seq, data, part) "
+                "VALUES (?, ?, 'pending', ?, ?, ?, ?)",
+                [(self.run_id, url, priority, self._next_seq(), json.dumps(data), self.partition(data))
+                 for url, data in entries],
+            )
+            added = self._conn.total_changes - before
+            self._conn.commit()
+        FRONTIER_PENDING.inc(added)
+        return added
+
+    def fail(self, url):
+        super().fail(url)
+        with self._lock:
+            self._conn.commit()
+
+    def pop(self):
+        """Lease the next queued URL, this worker's partition first; (url, data) or None when none is left."""
+        now = self.clock()
+        with self._lock:
+            row = self._conn.execute(
+                "UPDATE urls SET state = 'claimed', worker = ?, lease_until = ? WHERE rowid = ("
+                "  SELECT rowid FROM urls WHERE run_id = ? AND seq > 0"
+                "  AND (state = 'pending' OR (state = 'claimed' AND lease_until < ?))"
+                "  ORDER BY part = ? DESC, priority DESC, seq LIMIT 1"
+                ") RETURNING url, data",
+                (self.worker, now + self.lease_seconds, self.run_id, now, self.worker),
+            ).fetchone()
+            self._conn.commit()
+        if row is None:
+            return None
+        FRONTIER_PENDING.dec()
+        return row[0], json.loads(row[1])
+
+    def checkpoint(self):
+        super().checkpoint()
+        with self._lock:  # still working: keep this worker's leases on queued URLs
+            self._conn.execute(
+                "UPDATE urls SET lease_until = ? WHERE run_id = ? AND worker = ? AND state = 'claimed' AND seq > 0",
+                (self.clock() + self.lease_seconds, self.run_id, self.worker),
+            )
+            self._conn.commit()
+
+    def publish(self, key, value):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO published (run_id, key, value) VALUES (?, ?, ?)",
+                (self.run_id, key, json.dumps(value)),
+            )
+            self._conn.commit()
+
+    async def published(self, key, url=None, poll_seconds=0.2):
+        """The value under key, waiting for the worker that claimed url (the page it comes from) to publish it.
+
+        None once that worker's lease on url has run out (see lease_expired()),
+        or, without url, after lease_seconds.
+        """
+        deadline = None if url is not None else self.clock() + self.lease_seconds
+        while True:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT value FROM published WHERE run_id = ? AND key = ?", (self.run_id, key)
+                ).fetchone()
+            if row is not None:
+                return json.loads(row[0])
+            if self.lease_expired(url) if url is not None else self.clock() >= deadline:
+                return None
+            await asyncio.sleep(poll_seconds)
+
+    def canonical_for(self, fingerprint, url):
+        """The smallest URL seen with this fingerprint by any worker, url included; the others become aliases.
+
+        A URL that was the smallest until url turned up is marked superseded.
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")  # read and update under one write lock, across workers
+            row = self._conn.execute(
+                "SELECT url FROM fingerprints WHERE run_id = ? AND fingerprint = ?", (self.run_id, fingerprint)
+            ).fetchone()
+            canonical = url if row is None else min(row[0], url)
+            if row is None:
+                self._conn.execute(
+                    "INSERT INTO fingerprints (run_id, fingerprint, url) VALUES (?, ?, ?)", (self.run_id, fingerprint, url)
+                )
+            elif url < row[0]:
+                self._conn.execute(
+                    "UPDATE fingerprints SET url = ? WHERE run_id = ? AND fingerprint = ?", (url, self.run_id, fingerprint)
+                )
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO aliases (run_id, url, fingerprint, superseded) VALUES (?, ?, ?, 1)",
+                    (self.run_id, row[0], fingerprint),
+                )
+            elif url != row[0]:
+                self._conn.execute(
+                    "INSERT OR IGNORE INTO aliases (run_id, url, fingerprint) VALUES (?, ?, ?)",
+                    (self.run_id, url, fingerprint),
+                )
+            self._conn.commit()
+        return canonical
+
+    def aliases(self):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT a.url, f.url FROM aliases a JOIN fingerprints f USING (run_id, fingerprint) WHERE run_id = ?",
+                (self.run_id,),
+            ).fetchall()
+        return dict(rows)
+
+    def superseded(self):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT url FROM aliases WHERE run_id = ? AND superseded = 1", (self.run_id,)
+            ).fetchall()
+        return {url for url, in rows}
+
+    def dedup_stats(self):
+        with self._lock:
+            fingerprints, aliases, superseded = (
+                self._conn.execute(f"SELECT COUNT(*) FROM {table} WHERE run_id = ?{where}", (self.run_id,)).fetchone()[0]
+                for table, where in (("fingerprints", ""), ("aliases", ""), ("aliases", " AND superseded = 1"))
+            )
+        return {"fingerprints": fingerprints, "aliases": aliases, "superseded": superseded}
+
+    def lease_expired(self, url):
+        """True if url is free to claim again: never claimed, or another worker's lease on it ran out."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT state, worker, lease_until FROM urls WHERE run_id = ? AND url = ?", (self.run_id, url)
+            ).fetchone()
+        if row is None or row[0] == "pending":
+            return True
+        state, worker, lease_until = row
+        return state == "claimed" and worker != self.worker and lease_until < self.clock()
+
+    def finish(self):
+        """Record this worker as finished; True if it was the last of the run's workers.
+
+        The last one also marks the run finished and drops its per-URL rows;
+        the run's fingerprints and aliases stay until it closes the frontier,
+        so it can still write them out.
+        """
+        self.checkpoint()
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE workers SET finished_at = ? WHERE run_id = ? AND worker = ?", (now, self.run_id, self.worker)
+            )
+            self._conn.execute(  # hand back anything leased but not done, e.g. past --books-limit
+                "UPDATE urls SET state = 'pending', worker = NULL WHERE run_id = ? AND worker = ? "
+                "AND state = 'claimed' AND seq > 0",
+                (self.run_id, self.worker),
+            )
+            last = self._conn.execute(
+                "UPDATE runs SET finished_at = ? WHERE run_id = ? AND finished_at IS NULL "
+                "AND (SELECT COUNT(*) FROM workers WHERE run_id = ? AND finished_at IS NOT NULL) >= ?",
+                (now, self.run_id, self.run_id, self.workers),
+            ).rowcount == 1
+            if last:
+                self._conn.execute("DELETE FROM urls WHERE run_id = ?", (self.run_id,))
+                self._conn.execute("DELETE FROM published WHERE run_id = ?", (self.run_id,))
+            self._conn.commit()
+        self._finished_run = last
+        if not last:
+            log(f"[FRONTIER] Worker {self.worker} finished; the last worker of run {self.run_id} merges the results")
+        return last
+
+    def close(self):
+        if self._finished_run:
+            with self._lock:
+                for table in ("fingerprints", "aliases"):
+                    self._conn.execute(f"DELETE FROM {table} WHERE run_id = ?", (self.run_id,))
+                self._conn.commit()
+        super().close()
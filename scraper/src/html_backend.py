@@ -0,0 +1,144 @@
+# src/html_backend.py
+import os
+import threading
+
+from bs4 import BeautifulSoup
+from lxml import etree
+
+from soup import as_soup
+
+def _cls(name):
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+# Every selector the scrapers use, by name, as (CSS for BeautifulSoup, XPath for lxml).
+# Names starting with "quote_" are looked up relative to one div.quote.
+SELECTORS = {
+    # books.toscrape.com listing pages
+    "categories": (".side_categories ul ul li a", f"//*[{_cls('side_categories')}]//ul//ul//li//a"),
+    "book_links": ("article.product_pod h3 a", f"//article[{_cls('product_pod')}]//h3//a"),
+    "books_next": (".next a", f"//*[{_cls('next')}]//a"),
+    "books_pager_current": ("ul.pager li.current", f"//ul[{_cls('pager')}]//li[{_cls('current')}]"),
+    # book detail page
+    "book_title": ("div.product_main h1", f"//div[{_cls('product_main')}]//h1"),
+    "book_price": (".price_color", f"//*[{_cls('price_color')}]"),
+    "book_availability": (".availability", f"//*[{_cls('availability')}]"),
+    "book_rating": ("p.star-rating", f"//p[{_cls('star-rating')}]"),
+    "breadcrumb": ("ul.breadcrumb li a", f"//ul[{_cls('breadcrumb')}]//li//a"),
+    # quotes.toscrape.com
+    "quotes": ("div.quote", f"//div[{_cls('quote')}]"),
+    "quote_text": ("span.text", f".//span[{_cls('text')}]"),
+    "quote_author": ("small.author", f".//small[{_cls('author')}]"),
+    "quote_tags": ("div.tags a.tag", f".//div[{_cls('tags')}]//a[{_cls('tag')}]"),
+    "quote_about": ("span a[href]", ".//span//a[@href]"),
+    "author_links": ("div.quote span a[href]", f"//div[{_cls('quote')}]//span//a[@href]"),
+    "quotes_next": ("ul.pager li.next a", f"//ul[{_cls('pager')}]//li[{_cls('next')}]//a"),
+    # author page
+    "author_title": ("h3.author-title", f"//h3[{_cls('author-title')}]"),
+    "author_born_date": ("span.author-born-date", f"//span[{_cls('author-born-date')}]"),
+    "author_born_location": ("span.author-born-location", f"//span[{_cls('author-born-location')}]"),
+    "author_description": ("div.author-description", f"//div[{_cls('author-description')}]"),
+}
+
+
+class SoupBackend:
+    """BeautifulSoup + soupsieve CSS selectors: the reference implementation."""
+
+    name = "bs4"
+
+    def tree(self, html):
+        if isinstance(html, etree._Element):
+            html = etree.tostring(html, encoding="unicode", method="html")
+        return as_soup(html)
+
+    def select(self, node, selector):
+        return node.select(SELECTORS[selector][0])
+
+    def select_one(self, node, selector):
+        return node.select_one(SELECTORS[selector][0])
+
+    def text(self, el):
+        return el.get_text()
+
+    def stripped_text(self, el):
+        return el.get_text(strip=True)
+
+    def attr(self, el, name):
+        return el.get(name)
+
+    def classes(self, el):
+        return el.get("class", [])
+
+
+class LxmlBackend:
+    """lxml tree queried with precompiled XPath; same results as SoupBackend, several times faster."""
+
+    name = "lxml"
+
+    def __init__(self):
+        # Compiled XPath objects and parsers must not be shared between threads; keep a set per thread.
+        self._local = threading.local()
+
+    def _compiled(self):
+        local = self._local
+        if not hasattr(local, "xpaths"):
+            local.xpaths = {name: etree.XPath(xpath) for name, (_, xpath) in SELECTORS.items()}
+            local.parser = etree.HTMLParser()
+        return local
+
+    def tree(self, html):
+        if isinstance(html, etree._Element):
+            return html
+        if isinstance(html, BeautifulSoup):
+            html = str(html)
+        parser = self._compiled().parser
+        try:
+            root = etree.fromstring(html, parser)
+        except ValueError:
+            # str with an XML encoding declaration
+            root = etree.fromstring(html.encode("utf-8"), parser)
+        return root if root is not None else etree.fromstring("<html></html>", parser)
+
+    def select(self, node, selector):
+        return self._compiled().xpaths[selector](node)
+
+    def select_one(self, node, selector):
+        found = self._compiled().xpaths[selector](node)
+        return found[0] if found else None
+
+    def text(self, el):
+        return "".join(el.itertext())
+
+    def stripped_text(self, el):
+        # BeautifulSoup's get_text(strip=True): each text node stripped, empty ones dropped.
+        return "".join(s.strip() for s in el.itertext())
+
+    def attr(self, el, name):
+        return el.get(name)
+
+    def classes(self, el):
+        return el.get("class", "").split()
+
+
+BACKENDS = {"bs4": SoupBackend, "lxml": LxmlBackend}
+DEFAULT_BACKEND = os.environ.get("SCRAPER_PARSER", "lxml")
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """Return the process-wide parser backend, creating it on first use."""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = BACKENDS[DEFAULT_BACKEND]()
+        return _backend
+
+
+def use_backend(name):
+    """Switch every parser to the named backend ("bs4" or "lxml")."""
+    global _backend
+    with _backend_lock:
+        _backend = BACKENDS[name]()
+        return _backend
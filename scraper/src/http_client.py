@@ -0,0 +1,219 @@
+# src/http_client.py
+import threading
+import time
+
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util import make_headers
+
+from cache import get_cache
+from metrics import FETCH_BYTES, FETCH_SECONDS, HTTP_RESPONSES
+
+# gzip/deflate always, br too when a brotli decoder is installed (urllib3 and aiohttp both pick it up).
+DEFAULT_HEADERS = {
+    "Accept-Encoding": make_headers(accept_encoding=True)["accept-encoding"],
+    "Connection": "keep-alive",
+}
+DEFAULT_POOL_MAXSIZE = 10
+DEFAULT_TIMEOUT = 10
+
+
+class ConnectionStats:
+    """Counts requests, new connections and handshake time across every client."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.connections = 0
+        self.handshake_seconds = 0.0
+        self.handshake_max = 0.0
+
+    def record_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def record_connect(self, seconds):
+        with self._lock:
+            self.connections += 1
+            self.handshake_seconds += seconds
+            self.handshake_max = max(self.handshake_max, seconds)
+
+    def snapshot(self):
+        with self._lock:
+            reused = max(self.requests - self.connections, 0)
+            return {
+                "requests": self.requests,
+                "connections_opened": self.connections,
+                "connections_reused": reused,
+                "reuse_ratio": reused / self.requests if self.requests else 0.0,
+                "handshake_avg_ms": 1000 * self.handshake_seconds / self.connections if self.connections else 0.0,
+                "handshake_max_ms": 1000 * self.handshake_max,
+            }
+
+    def reset(self):
+        with self._lock:
+            self.requests = 0
+            self.connections = 0
+            self.handshake_seconds = 0.0
+            self.handshake_max = 0.0
+
+
+connection_stats = ConnectionStats()
+
+
+# ----------------------------
+# requests/urllib3 side (blocking callers)
+# ----------------------------
+
+class _TimedHTTPConnection(HTTPConnection):
+    def connect(self):
+        started = time.perf_counter()
+        super().connect()
+        connection_stats.record_connect(time.perf_counter() - started)
+
+
+class _TimedHTTPSConnection(HTTPSConnection):
+    def connect(self):
+        # Covers TCP connect plus the TLS handshake.
+        started = time.perf_counter()
+        super().connect()
+        connection_stats.record_connect(time.perf_counter() - started)
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class PooledAdapter(HTTPAdapter):
+    """HTTPAdapter whose connections report to connection_stats."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _TimedHTTPConnectionPool,
+            "https": _TimedHTTPSConnectionPool,
+        }
+
+
+class HttpClient:
+    """Thread-safe keep-alive HTTP client shared by every blocking fetch site.
+
+    pool_sizes maps a host (e.g. "books.toscrape.com") to the number of
+    connections kept open to it; other hosts get pool_maxsize.
+    """
+
+    def __init__(self, pool_maxsize=DEFAULT_POOL_MAXSIZE, pool_sizes=None, timeout=DEFAULT_TIMEOUT):
+        self.pool_maxsize = pool_maxsize
+        self.pool_sizes = dict(pool_sizes or {})
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        self.session.headers.update(DEFAULT_HEADERS)
+        default_adapter = PooledAdapter(pool_connections=10, pool_maxsize=pool_maxsize)
+        self.session.mount("http://", default_adapter)
+        self.session.mount("https://", default_adapter)
+        for host, size in self.pool_sizes.items():
+            adapter = PooledAdapter(pool_connections=1, pool_maxsize=size)
+            self.session.mount(f"http://{host}/", adapter)
+            self.session.mount(f"https://{host}/", adapter)
+
+    def pool_size_for(self, host):
+        return self.pool_sizes.get(host, self.pool_maxsize)
+
+    def get(self, url, **kwargs):
+        """GET url, revalidating against (or, offline, replaying from) the response cache if enabled."""
+        kwargs.setdefault("timeout", self.timeout)
+        cache = get_cache()
+        if cache is not None and cache.offline:
+            return _replayed_response(url, cache.replay(url))
+
+        cached = cache.lookup(url) if cache is not None else None
+        if cached is not None:
+            kwargs["headers"] = {**cached.conditional_headers(), **kwargs.get("headers", {})}
+
+        connection_stats.record_request()
+        started = time.perf_counter()
+        try:
+            resp = self.session.get(url, **kwargs)
+        finally:
+            FETCH_SECONDS.observe(time.perf_counter() - started, source="blocking")
+        HTTP_RESPONSES.inc(status=str(resp.status_code))
+        FETCH_BYTES.inc(len(resp.content))
+
+        if cache is not None:
+            if resp.status_code == 304 and cached is not None:
+                return _replayed_response(url, cache.revalidated(cached))
+            if resp.status_code == 200:
+                cache.store(url, resp.text, resp.headers.get("ETag"), resp.headers.get("Last-Modified"))
+        return resp
+
+    def close(self):
+        self.session.close()
+
+
+def _replayed_response(url, body):
+    """A requests.Response carrying a cached body (200), or 504 when there is none."""
+    resp = requests.Response()
+    resp.url = url
+    resp.encoding = "utf-8"
+    if body is None:
+        # What a cache answers to "only-if-cached" when it has nothing stored.
+        resp.status_code = 504
+        resp._content = b""
+    else:
+        resp.status_code = 200
+        resp._content = body.encode("utf-8")
+    return resp
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Return the process-wide HttpClient, creating it on first use."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HttpClient()
+        return _client
+
+
+def configure_client(**kwargs):
+    """Replace the shared client, e.g. configure_client(pool_sizes={"books.toscrape.com": 20})."""
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+        _client = HttpClient(**kwargs)
+        return _client
+
+
+# ----------------------------
+# aiohttp side (crawl engine)
+# ----------------------------
+
+def make_trace_config():
+    """aiohttp trace hooks feeding the same connection_stats as the blocking client."""
+
+    async def on_request_start(session, ctx, params):
+        connection_stats.record_request()
+
+    async def on_connection_create_start(session, ctx, params):
+        ctx.connect_started = time.perf_counter()
+
+    async def on_connection_create_end(session, ctx, params):
+        connection_stats.record_connect(time.perf_counter() - ctx.connect_started)
+
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_request_start.append(on_request_start)
+    trace_config.on_connection_create_start.append(on_connection_create_start)
+    trace_config.on_connection_create_end.append(on_connection_create_end)
+    return trace_config
@@ -0,0 +1,180 @@
+# src/incremental.py
+import hashlib
+import json
+
+from data_types import item_from_dict
+from metrics import get_logger
+
+log = get_logger("incremental")
+
+
+def content_hash(html):
+    return hashlib.sha256(html.encode("utf-8")).hexdigest()
+
+
+def item_hash(data):
+    """Digest of one serialised item, the same whichever encoder wrote it."""
+    normalised = json.dumps(data, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.blake2b(normalised.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class Manifest:
+    """URL -> content hash -> ids of the items it produced, carried from one run to the next.
+
+    items_for() only calls the parser for pages whose content changed since
+    the previous run; unchanged pages reuse their items, read back by id from
+    the previous run's items file (items_path). Only hashes and ids are kept,
+    so memory does not grow with the items themselves. Pages not seen in this
+    run are dropped when the manifest is saved.
+    """
+
+    def __init__(self, path, items_path=None):
+        self.path = path
+        self.items_path = items_path
+        self.previous = {}
+        self.previous_items = {}  # item id -> item_hash() as of the previous run
+        if path.exists():
+            with path.open(encoding="utf-8") as f:
+                self._load(json.load(f))
+        self.current = {}
+        self.current_items = {}
+        self.counters = {"reused": 0, "parsed": 0}
+        self._offsets = None
+        self._items_file = None
+
+    def _load(self, saved):
+        if "pages" in saved:
+            self.previous, self.previous_items = saved["pages"], saved["items"]
+            return
+        # Manifests written before items were kept by id stored every item in full.
+        for url, entry in saved.items():
+            self.previous[url] = {"hash": entry["hash"], "ids": [d["id"] for d in entry["items"]]}
+            self.previous_items.update((d["id"], item_hash(d)) for d in entry["items"])
+
+    def items_for(self, page, parse, depends_on="", keep=None):
+        """Items for a FetchedPage; parse(page) runs only if the page changed.
+
+        depends_on folds in content the items derive from besides the page
+        itself (e.g. the authors of a quotes page), so a change there counts too.
+        keep(items), if given, returns the items actually emitted (e.g. cut
+        to a limit); only those are recorded and returned.
+        """
+        digest, items = self._stored(page, depends_on)
+        if items is None:
+            items = parse(page)
+            self.counters["parsed"] += 1
+        return self._record(page, digest, items, keep)
+
+    async def items_for_async(self, page, parse, depends_on="", keep=None):
+        """items_for() with a coroutine function as parse, e.g. one backed by a ParsePool."""
+        digest, items = self._stored(page, depends_on)
+        if items is None:
+            items = await parse(page)
+            self.counters["parsed"] += 1
+        return self._record(page, digest, items, keep)
+
+    def _stored(self, page, depends_on):
+        digest = content_hash(page.html + depends_on)
+        entry = self.previous.get(page.url)
+        if entry is not None and entry["hash"] == digest:
+            items = self._read_previous(entry["ids"])
+            if items is not None:
+                self.counters["reused"] += 1
+                return digest, items
+        return digest, None
+
+    def _read_previous(self, ids):
+        """The previous run's items with these ids, or None if its items file no longer has them all as recorded."""
+        if self._offsets is None:
+            self._index_previous_items()
+        items = []
+        for item_id in ids:
+            offset = self._offsets.get(item_id)
+            if offset is None:
+                return None
+            self._items_file.seek(offset)
+            data = json.loads(self._items_file.readline())
+            if item_hash(data) != self.previous_items.get(item_id):
+                return None  # rewritten since, e.g. by a run without --incremental
+            items.append(item_from_dict(data))
+        return items
+
+    def _index_previous_items(self):
+        """Byte offset of each item in the previous items file, read once and kept open until save().
+
+        Items are looked up here rather than stored in the manifest; the open
+        handle still reads the old file after this run's file replaces it.
+        """
+        self._offsets = {}
+        if self.items_path is None or not self.items_path.exists():
+            return
+        self._items_file = self.items_path.open("rb")
+        offset = 0
+        for raw in self._items_file:
+            if raw.endswith(b"\n"):
+                self._offsets[json.loads(raw)["id"]] = offset
+            offset += len(raw)
+
+    def _record(self, page, digest, items, keep):
+        kept = items if keep is None else keep(items)
+        # A page cut short is parsed again next run, so the items left out then are not taken as removed for good.
+        self.current[page.url] = {"hash": digest if len(kept) == len(items) else None, "ids": [item.id for item in kept]}
+        return kept
+
+    def delta(self, items_path):
+        """Items added, changed and removed compared with the previous run.
+
+        items_path is this run's items file: added and changed items are
+        read back from it lazily, as it is written out by save_delta(). Their
+        hashes are recorded for the next run along the way.
+        """
+        current_ids = {item_id for entry in self.current.values() for item_id in entry["ids"]}
+
+        def read(changed):
+            with items_path.open("rb") as f:
+                for raw in f:
+                    data = json.loads(raw)
+                    if data["id"] not in current_ids:
+                        continue
+                    digest = self.current_items[data["id"]] = item_hash(data)
+                    previous = self.previous_items.get(data["id"])
+                    if (previous is not None and previous != digest) if changed else previous is None:
+                        yield data
+
+        return {
+            "added": read(changed=False),
+            "changed": read(changed=True),
+            "removed": [item_id for item_id in self.previous_items if item_id not in current_ids],
+        }
+
+    def save(self):
+        """Write the manifest; call after the delta has been saved, which records the item hashes."""
+        if self._items_file is not None:
+            self._items_file.close()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        with tmp.open("w", encoding="utf-8") as f:
+            json.dump({"pages": self.current, "items": self.current_items}, f, ensure_ascii=False)
+        tmp.replace(self.path)
+        log(f"Saved manifest for {len(self.current)} pages to {self.path}")
+
+
+def save_delta(delta, path):
+    """Write delta (see Manifest.delta()) as JSON, one item per line, without holding its lists in memory."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    counts = {}
+    with path.open("w", encoding="utf-8") as f:
+        f.write("{")
+        for i, (key, values) in enumerate(delta.items()):
+            f.write(f'{"," if i else ""}\n  {json.dumps(key)}: [')
+            n = 0
+            for value in values:
+                f.write(f'{"," if n else ""}\n    {json.dumps(value, ensure_ascii=False)}')
+                n += 1
+            f.write("\n  ]" if n else "]")
+            counts[key] = n
+        f.write("\n}\n")
+    log(
+        f"Saved delta to {path}: {counts['added']} added, "
+        f"{counts['changed']} changed, {counts['removed']} removed"
+    )
@@ -1,27 +1,85 @@
-import threading
-from concurrent.futures import ThreadPoolExecutor, as_completed
-
-from fetcher import fetch_all_books_parallel, fetch_all_quotes_pages_parallel
-from parser import parse_book_page, parse_quotes_from_a_page
-from data_types import BookItem, SummaryData, CategoryCount, RatingCount, Dataset, MetaInfo, Filters, QuoteItem, TagCount, AuthorCount
-import json
+import argparse
+import asyncio
+from contextlib import ExitStack
+
+from cache import open_cache, close_cache
+from engine import run_crawl
+from retry import retry_policy
+import concurrency
+from http_client import connection_stats
+from fetcher import QUOTES_HOST, crawl_all_books, iter_quote_pages, fetch_page_async, prefetch_robots
+from robots import robots_policy
+from parser import parse_book_page, parse_quotes_from_a_page, parse_author_page, extract_author_urls
+from authors import get_author_service, open_author_store, close_author_store
+from frontier import CrawlFrontier, SharedFrontier
+from dedup import book_dedup, book_fingerprint
+from html_backend import BACKENDS, DEFAULT_BACKEND, use_backend
+from incremental import Manifest, save_delta
+from parse_pool import ParsePool
+import columnar
+from encoder import COMPRESSIONS, BatchWriter, compress_file, encode, open_output, zstandard
+from sink import JsonlSink, merge_authors, merge_items, write_authors, write_dataset_json, write_summary_json
+from summary import SummaryBuilder
+from search_index import write_search_index
+from data_types import FetchedPage, Dataset, MetaInfo, Filters
 from pathlib import Path
 from datetime import datetime, timezone
+from metrics import configure_logging, get_logger, registry, PARSE_SECONDS
+
+DATA_DIR = Path("src/data")
+CACHE_PATH = DATA_DIR / "cache" / "http.sqlite3"
+MANIFEST_PATH = DATA_DIR / "manifest.json"
+AUTHORS_PATH = DATA_DIR / "cache" / "authors.sqlite3"
+FRONTIER_PATH = DATA_DIR / "frontier.sqlite3"
+WORKERS_DIR = DATA_DIR / "workers"
 
-def log(msg):
-    print(f"[{datetime.now().isoformat()}] {msg}")
+log = get_logger("main")
 
 
 def get_output_path():
     timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-    path = Path(f"src/data/{timestamp}/dataset.json")
+    path = DATA_DIR / timestamp / "dataset.json"
     path.parent.mkdir(parents=True, exist_ok=True)
     return path
 
 
-def fetch_and_parse_books(max_workers=10, limit=None):
+async def parse_page(manifest, page, parse, depends_on="", keep=None):
+    """await parse(page) as a list of items, skipped for pages the manifest has seen unchanged.
+
+    keep(items), if given, cuts the items to those that will be emitted; the manifest records only those.
+    """
+    if manifest is None:
+        items = await parse(page)
+        return items if keep is None else keep(items)
+    return await manifest.items_for_async(page, parse, depends_on, keep)
+
+
+async def parse_book_items(page, category, pool=None):
+    with PARSE_SECONDS.time(kind="book"):
+        if pool is not None:
+            return await pool.book_items(page.url, category, page.html)
+        book = parse_book_page(page.url, category, page.html)
+        return [book] if book else []
+
+
+async def parse_quote_items(page, pool=None):
+    with PARSE_SECONDS.time(kind="quotes"):
+        if pool is not None:
+            return await pool.quote_items(page.url, page.html)
+        return parse_quotes_from_a_page(page.url, page_tree(page))
+
+
+async def crawl_and_parse_books(engine, limit=None, manifest=None, emit=None, pool=None):
+    """Crawl and parse book pages, handing each BookItem to emit as soon as it is parsed.
+
+    Without emit the items are collected and returned. With a ParsePool the
+    parsing runs in its worker processes.
+    """
+    collected = []
+    emit = emit or collected.append
+
     log("Fetching book URLs...")
-    book_pages_dict = fetch_all_books_parallel(max_workers)
+    book_pages_dict = await crawl_all_books(engine)
 
     urls_to_parse = []
     for category, urls in book_pages_dict.items():
@@ -32,69 +90,136 @@ def fetch_and_parse_books(max_workers=10, limit=None):
         if limit and len(urls_to_parse) >= limit:
             break
 
-    log(f"Parsing {len(urls_to_parse)} book pages...")
-    books = []
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        futures = [executor.submit(parse_book_page, url, category) for url, category in urls_to_parse]
-        for future in as_completed(futures):
-            book = future.result()
-            if book:
-                books.append(book)
-
-    log(f"Parsed {len(books)} books.")
-    return books
+    # Detail pages go through the run's frontier, so a resumed run skips the ones already on disk.
+    frontier = engine.frontier
+    frontier.add_many(urls_to_parse)
+
+    log(f"Fetching and parsing {len(urls_to_parse)} book pages...")
+    count = 0
+
+    # Each page is parsed as soon as it arrives and its HTML dropped right after.
+    async def fetch_and_parse(url, category):
+        nonlocal count
+        html = await fetch_page_async(engine, url)
+        if not html:
+            frontier.fail(url)
+            return
+        # The same product behind another URL is recorded as an alias, not parsed into a second BookItem.
+        if book_dedup.canonical(url, book_fingerprint(html)) != url:
+            frontier.complete(url)
+            return
+        page = FetchedPage(url=url, html=html)
+        for book in await parse_page(manifest, page, lambda page: parse_book_items(page, category, pool)):
+            emit(book)
+            count += 1
+        frontier.complete(url)
+
+    async def worker():
+        while (entry := frontier.pop()) is not None:
+            await fetch_and_parse(*entry)
+
+    await asyncio.gather(*(worker() for _ in range(min(engine.max_in_flight, len(urls_to_parse) or 1))))
+
+    log(f"Parsed {count} books.")
+    return collected
+
+
+def page_tree(page):
+    return page.soup if page.soup is not None else page.html
+
+
+async def fetch_author(engine, url):
+    html = await fetch_page_async(engine, url)
+    with PARSE_SECONDS.time(kind="author"):
+        return parse_author_page(url, html)
+
+
+async def prefetch_authors(engine, page):
+    """Make sure every author linked from a quotes page is in the author service.
+
+    Pages sharing an author wait on one request; authors stored by earlier runs are not fetched at all.
+    """
+    service = get_author_service()
+    await asyncio.gather(*(
+        service.get_async(url, lambda url=url: fetch_author(engine, url))
+        for url in extract_author_urls(page_tree(page))
+    ))
+
+
+def authors_fingerprint(page):
+    """The author details a quotes page's items embed, as a string for the manifest hash.
+
+    Peeked at in the author service, so nothing is fetched or counted as a hit: prefetch_authors() has
+    already filled it for this page.
+    """
+    service = get_author_service()
+    return "\n".join(repr(service.peek(url)) for url in extract_author_urls(page_tree(page)))
+
+
+async def crawl_and_parse_quotes(engine, limit=None, manifest=None, emit=None, pool=None):
+    """Crawl and parse quote pages, handing each QuoteItem to emit as soon as it is parsed.
+
+    Without emit the items are collected and returned. With a ParsePool the
+    parsing runs in its worker processes; author details are still fetched
+    and attached here.
+    """
+    collected = []
+    emit = emit or collected.append
+    count = 0
+
+    async def parse_when_authors_ready(page):
+        nonlocal count
+        if engine.frontier.is_done(page.url):
+            return
+        await prefetch_authors(engine, page)
+        quotes = await parse_page(
+            manifest,
+            page,
+            lambda page: parse_quote_items(page, pool),
+            authors_fingerprint(page) if manifest is not None else "",
+            # No await between this cut and the emits below, so pages parsed concurrently cannot overshoot the limit.
+            lambda quotes: quotes[:max(limit - count, 0)] if limit else quotes,
+        )
+        for quote in quotes:
+            emit(quote)
+            count += 1
+        engine.frontier.complete(page.url)
+
+    # Author pages are fetched, and finished pages parsed, while the pagination walk continues.
+    # Pages finished by an interrupted run are still walked for their next link, just not parsed.
+    tasks = []
+    page_count = 0
+    async for page in iter_quote_pages(engine):
+        page_count += 1
+        tasks.append(asyncio.ensure_future(parse_when_authors_ready(page)))
+    await asyncio.gather(*tasks)
+
+    log(f"Parsed {count} quotes from up to {page_count} pages.")
+    return collected
+
+
+async def crawl_books_and_quotes(engine, books_limit=None, quotes_limit=None, manifest=None, emit=None, pool=None):
+    """Crawl books and quotes side by side on one event loop and one engine."""
+    await prefetch_robots()
+    crawls = [crawl_and_parse_books(engine, books_limit, manifest, emit, pool)]
+    # The quotes site is one chain of pages; in a distributed crawl a single worker walks it.
+    if engine.frontier.owns(QUOTES_HOST):
+        crawls.append(crawl_and_parse_quotes(engine, quotes_limit, manifest, emit, pool))
+    return await asyncio.gather(*crawls)
 
 
-def fetch_and_parse_quotes_pages(max_workers=10, limit=None):
-    all_quotes_urls = fetch_all_quotes_pages_parallel(max_workers=max_workers)
-    all_quotes = []
+def fetch_and_parse_books(max_workers=10, limit=None, pool=None):
+    return run_crawl(crawl_and_parse_books, limit, None, None, pool, max_workers=max_workers)
 
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        futures = {executor.submit(parse_quotes_from_a_page, url): url for url in all_quotes_urls}
 
-        for future in as_completed(futures):
-            if limit and len(all_quotes) >= limit:
-                break
-
-            page_url = futures[future]
-            quotes = future.result()
-            if quotes:
-                remaining = limit - len(all_quotes) if limit else None
-                if remaining:
-                    quotes = quotes[:remaining]
-                all_quotes.extend(quotes)
-
-            if limit and len(all_quotes) >= limit:
-                break
-
-    log(f"Parsed {len(all_quotes)} quotes from up to {len(all_quotes_urls)} pages.")
-    return all_quotes
+def fetch_and_parse_quotes_pages(max_workers=10, limit=None, pool=None):
+    return run_crawl(crawl_and_parse_quotes, limit, None, None, pool, max_workers=max_workers)
 
 
 def build_summary(books, quotes=None):
-    quotes = quotes or []
-
-    category_counts = {}
-    rating_counts = {}
-
-    for book in books:
-        category_counts[book.category] = category_counts.get(book.category, 0) + 1
-        rating_counts[book.rating] = rating_counts.get(book.rating, 0) + 1
-
-    tag_counts = {}
-    author_counts = {}
-
-    for quote in quotes:
-        author_counts[quote.author] = author_counts.get(quote.author, 0) + 1
-        for tag in quote.tags:
-            tag_counts[tag] = tag_counts.get(tag, 0) + 1
-
-    return SummaryData(
-        books_by_category=[CategoryCount(category=k, count=v) for k, v in category_counts.items()],
-        books_by_rating=[RatingCount(rating=k, count=v) for k, v in rating_counts.items()],
-        quotes_by_tag=[TagCount(tag=k, count=v) for k, v in tag_counts.items()],
-        quotes_by_author=[AuthorCount(author=k, count=v) for k, v in author_counts.items()]
-    )
+    builder = SummaryBuilder()
+    builder.add_many(books + (quotes or []))
+    return builder.summary()
 
 
 def build_dataset(books, quotes=None):
@@ -116,37 +241,227 @@ def build_dataset(books, quotes=None):
     )
 
 
-def save_dataset(dataset, path):
+def save_dataset(dataset, path, compression=None):
+    """Write an in-memory Dataset as compact dataset.json (optionally compressed) plus items.jsonl."""
     try:
         path.parent.mkdir(parents=True, exist_ok=True)
-        with path.open("w", encoding="utf-8") as f:
-            json.dump(dataset, f, default=lambda o: o.__dict__, ensure_ascii=False, indent=2)
+        out, path = open_output(path, compression)
+        with out:
+            out.write(encode(dataset))
         log(f"Saved dataset to {path}")
     except Exception as e:
-        log(f"Error saving dataset JSON: {e}")
+        log.error(f"Error saving dataset JSON: {e}")
         raise
 
     try:
-        items_path = Path("src/data/items.jsonl")
+        items_path = DATA_DIR / "items.jsonl"
         items_path.parent.mkdir(parents=True, exist_ok=True)
         items = getattr(dataset, "items", [])
-        with items_path.open("w", encoding="utf-8") as f:
+        with items_path.open("wb") as f:
+            batch = BatchWriter(f, batch_bytes=1 << 20)
             for item in items:
-                f.write(json.dumps(item, default=lambda o: o.__dict__, ensure_ascii=False) + "\n")
+                batch.write(encode(item) + b"\n")
+            batch.drain()
         log(f"Saved {len(items)} items to {items_path}")
     except Exception as e:
-        log(f"Error saving items.jsonl: {e}")
+        log.error(f"Error saving items.jsonl: {e}")
         raise
 
 
 
-def main():
+def worker_spec(value):
+    """"I/N" for --worker: this process is worker I (from 0) of N."""
+    try:
+        index, workers = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected I/N, e.g. 0/4, got {value!r}")
+    if not 0 <= index < workers:
+        raise argparse.ArgumentTypeError(f"worker index must be in 0..{workers - 1}")
+    return index, workers
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Scrape books.toscrape.com and quotes.toscrape.com.")
+    parser.add_argument("--no-cache", action="store_true", help="do not use the on-disk response cache")
+    parser.add_argument("--offline", action="store_true", help="replay responses from the cache only, no network")
+    parser.add_argument(
+        "--incremental", action="store_true",
+        help="only re-parse pages that changed since the last incremental run and write a delta.json",
+    )
+    parser.add_argument(
+        "--parser", choices=sorted(BACKENDS), default=DEFAULT_BACKEND,
+        help="HTML parser backend (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--parse-workers", type=int, default=0, metavar="N",
+        help="parse pages in N worker processes instead of on the crawl's event loop",
+    )
+    parser.add_argument("--log-level", choices=["DEBUG", "INFO", "WARNING", "ERROR"], default="INFO")
+    parser.add_argument(
+        "--debug-sample", type=float, default=1.0, metavar="RATE",
+        help="share of per-URL debug lines to print, e.g. 0.01 (default: all)",
+    )
+    parser.add_argument("--log-format", choices=["text", "json"], default="text")
+    parser.add_argument(
+        "--metrics", type=Path, metavar="PATH",
+        help="where to write the run's metrics; *.prom for Prometheus text, JSON otherwise "
+             "(default: metrics.json next to dataset.json)",
+    )
+    parser.add_argument(
+        "--compress", choices=sorted(COMPRESSIONS),
+        help="write dataset.json compressed, plus compressed copies of items.jsonl and authors.jsonl",
+    )
+    parser.add_argument(
+        "--columnar", choices=sorted(columnar.FORMATS),
+        help="also write books, quotes, quote_tags and authors as columnar tables (needs pyarrow)",
+    )
+    parser.add_argument("--books-limit", type=int, default=2, metavar="N", help="book pages to parse, 0 for all")
+    parser.add_argument("--quotes-limit", type=int, default=2, metavar="N", help="quotes to keep, 0 for all")
+    parser.add_argument(
+        "--concurrency", type=int, default=10, metavar="N",
+        help="requests in flight per host; adapted to the host's latency and errors from there (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--fixed-concurrency", action="store_true",
+        help="keep --concurrency requests in flight per host instead of adapting it",
+    )
+    parser.add_argument(
+        "--resume", action="store_true",
+        help="continue the last interrupted crawl instead of starting over",
+    )
+    parser.add_argument(
+        "--run-id", metavar="ID",
+        help="join the distributed crawl ID in the shared frontier (started by whichever worker comes first); "
+             "a worker restarted with the same ID and --worker picks up where it stopped",
+    )
+    parser.add_argument(
+        "--worker", type=worker_spec, default=(0, 1), metavar="I/N",
+        help="with --run-id, be worker I of N: categories and hosts are split between the workers "
+             "and the last one to finish merges their results (default: %(default)s)",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.offline and args.no_cache:
+        raise SystemExit("--offline needs the response cache")
+    if args.resume and args.incremental:
+        # The manifest only sees pages parsed in this process, so its delta would be wrong.
+        raise SystemExit("--resume cannot be combined with --incremental")
+    if args.worker != (0, 1) and not args.run_id:
+        raise SystemExit("--worker needs --run-id, the same for every worker")
+    if args.run_id and (args.resume or args.incremental):
+        raise SystemExit("--run-id resumes by itself and cannot be combined with --resume or --incremental")
+    if args.compress == "zstd" and zstandard is None:
+        raise SystemExit("--compress zstd needs the zstandard package (pip install zstandard)")
+    if args.columnar and columnar.pa is None:
+        raise SystemExit("--columnar needs the pyarrow package (pip install pyarrow)")
+    cache = None
+    if not args.no_cache:
+        cache = open_cache(CACHE_PATH, offline=args.offline)
+        open_author_store(AUTHORS_PATH)
+    use_backend(args.parser)
+    configure_logging(args.log_level, args.debug_sample, args.log_format)
+    DATA_DIR.mkdir(parents=True, exist_ok=True)
     output_path = get_output_path()
-    books = fetch_and_parse_books(limit=2)
-    quotes = fetch_and_parse_quotes_pages(limit=2)
-    dataset = build_dataset(books, quotes)
-    save_dataset(dataset, output_path)
+    items_path = DATA_DIR / "items.jsonl"
+    # Unchanged pages take their items from the previous run's items.jsonl, still in place until this run's replaces it.
+    manifest = Manifest(MANIFEST_PATH, items_path) if args.incremental else None
+    authors_path = DATA_DIR / "authors.jsonl"
+    suffix = ""
+    if args.run_id:
+        index, workers = args.worker
+        try:
+            frontier = SharedFrontier(FRONTIER_PATH, args.run_id, index, workers)
+        except ValueError as e:
+            raise SystemExit(str(e))
+        # Content fingerprints live in the shared frontier too, so a duplicate is dropped whichever worker meets it.
+        book_dedup.share(frontier)
+        # Each worker writes its own items and authors; the last to finish merges them into the usual files.
+        parts_dir = WORKERS_DIR / args.run_id
+        worker_items_path = parts_dir / f"items-{index}.jsonl"
+        suffix = f"-{index}"
+    else:
+        frontier = CrawlFrontier(FRONTIER_PATH, resume=args.resume)
+
+    # Other modules' own stats, exported alongside the metrics.
+    registry.register_collector("scraper_robots", robots_policy.stats)
+    registry.register_collector("scraper_authors", lambda: get_author_service().stats())
+    registry.register_collector("scraper_connections", connection_stats.snapshot)
+    registry.register_collector("scraper_retry", retry_policy.stats)
+    registry.register_collector("scraper_dedup", book_dedup.stats)
+    if cache is not None:
+        registry.register_collector("scraper_http_cache", cache.stats)
 
+    try:
+        # Items are streamed to disk as they are parsed; only the summary counters stay in memory.
+        # Completed URLs reach the frontier only after the items they produced have been fsynced.
+        with ExitStack() as stack:
+            sink = stack.enter_context(JsonlSink(
+                worker_items_path if args.run_id else items_path,
+                on_checkpoint=frontier.checkpoint, resume=frontier.resumed,
+            ))
+            pool = stack.enter_context(ParsePool(args.parse_workers)) if args.parse_workers else None
+            run_crawl(
+                crawl_books_and_quotes, args.books_limit, args.quotes_limit, manifest, sink.write, pool,
+                max_workers=args.concurrency, frontier=frontier, adaptive=not args.fixed_concurrency,
+            )
+        # Quotes carry only an author_id; each author's details are written once, to the authors table.
+        authors = get_author_service().authors(sink.author_ids)
+        summary = sink.summary
+        if args.run_id:
+            write_authors(parts_dir / f"authors-{index}.jsonl", authors)
+            if not frontier.finish():
+                return
+            summary = merge_items(sorted(parts_dir.glob("items-*.jsonl")), items_path, book_dedup.superseded())
+            merge_authors(sorted(parts_dir.glob("authors-*.jsonl")), authors_path)
+        else:
+            frontier.finish()
+            write_authors(authors_path, authors)
+            superseded = book_dedup.superseded()
+            if superseded:
+                # Parsed before a duplicate with a smaller URL turned up; that one is kept instead.
+                summary = merge_items([items_path], items_path, superseded)
+        write_dataset_json(output_path, items_path, summary, authors_path=authors_path, compression=args.compress)
+        # The UI reads this instead of re-counting items in the browser.
+        write_summary_json(DATA_DIR / "summary.json", summary)
+        # Search and filters in the UI intersect these postings instead of scanning every item.
+        write_search_index(items_path, DATA_DIR / "search_index.json")
+        # Book URLs that served the same product as an earlier one, each mapped to that one.
+        aliases = book_dedup.aliases()
+        aliases_path = output_path.parent / "aliases.json"
+        aliases_path.write_bytes(encode(aliases) + b"\n")
+        log(f"Saved {len(aliases)} book aliases to {aliases_path}")
+        if args.compress:
+            # items.jsonl itself stays plain: --resume, --incremental and the UI read it as is.
+            for path in (items_path, authors_path):
+                log(f"Saved {compress_file(path, args.compress)}")
+        if args.columnar:
+            columnar.export_columnar(items_path, output_path.parent / "columnar", authors_path, args.columnar)
+        if manifest is not None:
+            save_delta(manifest.delta(items_path), output_path.parent / "delta.json")
+            manifest.save()
+            log(f"Incremental pages: {manifest.counters}")
+    finally:
+        if cache is not None:
+            log(f"Response cache: {cache.stats()}")
+        log(f"Author details: {get_author_service().stats()}")
+        log(f"robots.txt: {robots_policy.stats()}")
+        log(f"HTTP connections: {connection_stats.snapshot()}")
+        log(f"Retries: {retry_policy.stats()}")
+        log(f"Book duplicates: {book_dedup.stats()}")
+        log(f"Saved metrics to {registry.write(args.metrics or output_path.parent / f'metrics{suffix}.json')}")
+        # After the metrics: with --run-id the dedup stats are read from the frontier.
+        frontier.close()
+        if not args.fixed_concurrency:
+            # How each host's adaptive limit moved during the run; the current limits are in the metrics.
+            concurrency_path = output_path.parent / f"concurrency{suffix}.json"
+            concurrency_path.write_bytes(encode(concurrency.history()) + b"\n")
+            log(f"Saved concurrency limit history to {concurrency_path}")
+        if cache is not None:
+            close_cache()
+        close_author_store()
 
 if __name__ == "__main__":
     main()
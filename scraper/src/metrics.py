@@ -0,0 +1,272 @@
+# src/metrics.py
+import bisect
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+# ----------------------------
+# Logging
+# ----------------------------
+
+LEVELS = {"DEBUG": 10, "INFO": 20, "WARNING": 30, "ERROR": 40}
+
+_log_lock = threading.Lock()
+_log_config = {
+    "level": LEVELS[os.environ.get("SCRAPER_LOG_LEVEL", "INFO").upper()],
+    "debug_every": 1,
+    "format": "text",
+    "stream": None,
+}
+
+
+def configure_logging(level=None, debug_sample=None, fmt=None, stream=None):
+    """Set the level, the share of debug lines kept (0 < debug_sample <= 1), "text" or "json" output, and the stream.
+
+    Arguments left as None are unchanged; stream="stdout" goes back to sys.stdout.
+    """
+    with _log_lock:
+        if level is not None:
+            _log_config["level"] = LEVELS[level.upper()]
+        if debug_sample is not None:
+            _log_config["debug_every"] = max(1, round(1 / debug_sample))
+        if fmt is not None:
+            _log_config["format"] = fmt
+        if stream is not None:
+            _log_config["stream"] = None if stream == "stdout" else stream
+
+
+class Logger:
+    """Leveled logger. Calling it directly logs at INFO, like the old per-module log().
+
+    Extra keyword arguments are structured fields; nothing is formatted
+    unless the line is actually written. Debug lines are sampled: with
+    debug_sample=0.01 only every 100th debug line of a logger is kept.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._debug_seen = 0
+
+    def __call__(self, msg, **fields):
+        self._log(20, msg, fields)
+
+    def debug(self, msg, **fields):
+        if _log_config["level"] > 10:
+            return
+        self._debug_seen += 1  # a racy count only shifts which lines are sampled
+        if (self._debug_seen - 1) % _log_config["debug_every"]:
+            return
+        self._log(10, msg, fields)
+
+    def info(self, msg, **fields):
+        self._log(20, msg, fields)
+
+    def warning(self, msg, **fields):
+        self._log(30, msg, fields)
+
+    def error(self, msg, **fields):
+        self._log(40, msg, fields)
+
+    def _log(self, level, msg, fields):
+        if level < _log_config["level"]:
+            return
+        now = datetime.now().isoformat()
+        if _log_config["format"] == "json":
+            line = json.dumps(
+                {"ts": now, "level": _LEVEL_NAMES[level], "logger": self.name, "msg": str(msg), **fields},
+                default=str, ensure_ascii=False,
+            )
+        else:
+            extra = "".join(f" {k}={v}" for k, v in fields.items())
+            line = f"[{now}] {msg}{extra}"
+        stream = _log_config["stream"] or sys.stdout
+        # One write per line under a lock, so lines from different threads never interleave.
+        with _log_lock:
+            stream.write(line + "\n")
+
+
+_LEVEL_NAMES = {v: k for k, v in LEVELS.items()}
+_loggers = {}
+
+
+def get_logger(name):
+    with _log_lock:
+        if name not in _loggers:
+            _loggers[name] = Logger(name)
+        return _loggers[name]
+
+
+# ----------------------------
+# Metrics
+# ----------------------------
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help):
+        self.name = name
+        self.help = help
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, dict(key), value) for key, value in self._values.items()]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram:
+    """Cumulative-bucket histogram with sum and count, as Prometheus expects."""
+
+    kind = "histogram"
+
+    def __init__(self, name, help, buckets):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self):
+        samples = []
+        with self._lock:
+            for key, (counts, total, count) in self._values.items():
+                labels = dict(key)
+                cumulative = 0
+                for bound, n in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += n
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    samples.append((self.name + "_bucket", {**labels, "le": le}, cumulative))
+                samples.append((self.name + "_sum", labels, total))
+                samples.append((self.name + "_count", labels, count))
+        return samples
+
+
+class Registry:
+    """Every metric of the process, plus collectors that report other modules' stats() at export time."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+        self._collectors = {}
+
+    def _get(self, cls, name, *args):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args)
+            return metric
+
+    def counter(self, name, help=""):
+        return self._get(Counter, name, help)
+
+    def gauge(self, name, help=""):
+        return self._get(Gauge, name, help)
+
+    def histogram(self, name, help="", buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)):
+        return self._get(Histogram, name, help, buckets)
+
+    def register_collector(self, prefix, stats):
+        """stats() -> {name: number}, exported as gauges named <prefix>_<name>."""
+        with self._lock:
+            self._collectors[prefix] = stats
+
+    def snapshot(self):
+        """All metrics as plain data, ready for json.dump."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = dict(self._collectors)
+        out = {}
+        for metric in metrics:
+            out[metric.name] = {
+                "type": metric.kind,
+                "help": metric.help,
+                "samples": [{"name": name, "labels": labels, "value": value} for name, labels, value in metric.samples()],
+            }
+        for prefix, stats in collectors.items():
+            for key, value in stats().items():
+                if isinstance(value, (int, float)):
+                    out[f"{prefix}_{key}"] = {
+                        "type": "gauge", "help": "",
+                        "samples": [{"name": f"{prefix}_{key}", "labels": {}, "value": value}],
+                    }
+        return out
+
+    def prometheus_text(self):
+        lines = []
+        for name, metric in self.snapshot().items():
+            if metric["help"]:
+                lines.append(f"# HELP {name} {metric['help']}")
+            lines.append(f"# TYPE {name} {metric['type']}")
+            for sample in metric["samples"]:
+                labels = ",".join(f'{k}="{v}"' for k, v in sample["labels"].items())
+                lines.append(f"{sample['name']}{{{labels}}} {sample['value']}" if labels else f"{sample['name']} {sample['value']}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """Write a Prometheus text file for *.prom paths, a JSON snapshot otherwise."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if path.suffix == ".prom":
+            path.write_text(self.prometheus_text(), encoding="utf-8")
+        else:
+            with path.open("w", encoding="utf-8") as f:
+                json.dump(self.snapshot(), f, indent=2)
+        return path
+
+
+registry = Registry()
+
+# Metrics shared by several modules.
+FETCH_SECONDS = registry.histogram("scraper_fetch_seconds", "Time per HTTP attempt")
+FETCH_BYTES = registry.counter("scraper_fetch_bytes_total", "Response body bytes received")
+HTTP_RESPONSES = registry.counter("scraper_http_responses_total", "HTTP responses by status code")
+FETCH_RETRIES = registry.counter("scraper_fetch_retries_total", "Attempts after the first one")
+FETCH_FAILURES = registry.counter("scraper_fetch_failures_total", "URLs given up on after every attempt")
+PARSE_SECONDS = registry.histogram(
+    "scraper_parse_seconds", "Time to turn one page into items",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1),
+)
+IN_FLIGHT = registry.gauge("scraper_requests_in_flight", "Engine requests currently holding a slot")
+FRONTIER_PENDING = registry.gauge("scraper_frontier_pending", "URLs queued in the crawl frontier")
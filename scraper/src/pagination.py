@@ -1,18 +1,56 @@
 # src/pagination.py
-from bs4 import BeautifulSoup
+import re
 from urllib.parse import urljoin
 
+from html_backend import get_backend
+
 def get_books_category_next_page_url(html, current_url):
-    soup = BeautifulSoup(html, "lxml")
-    next_link = soup.select_one(".next a")
-    if next_link:
-        return urljoin(current_url, next_link['href'])
+    backend = get_backend()
+    next_link = backend.select_one(backend.tree(html), "books_next")
+    if next_link is not None:
+        return urljoin(current_url, backend.attr(next_link, "href"))
     return None
 
 def get_quotes_next_page_url(html, current_url):
-    soup = BeautifulSoup(html, "lxml")
-    next_li = soup.select_one("ul.pager li.next a")
-    if next_li and next_li.get("href"):
-        next_url = next_li['href'].strip()
+    backend = get_backend()
+    next_li = backend.select_one(backend.tree(html), "quotes_next")
+    if next_li is not None and backend.attr(next_li, "href"):
+        next_url = backend.attr(next_li, "href").strip()
         return urljoin(current_url, next_url)
     return None
+
+# ----------------------------
+# Page URLs by number, so later pages can be fetched without walking the next links
+# ----------------------------
+
+PAGE_OF_RE = re.compile(r"Page\s+(\d+)\s+of\s+(\d+)")
+
+
+def get_books_category_page_count(html):
+    """N from the listing pager's "Page 1 of N", or None without one."""
+    backend = get_backend()
+    current = backend.select_one(backend.tree(html), "books_pager_current")
+    if current is None:
+        return None
+    match = PAGE_OF_RE.search(backend.stripped_text(current))
+    return int(match.group(2)) if match else None
+
+
+def books_listing_has_items(html):
+    backend = get_backend()
+    return backend.select_one(backend.tree(html), "book_links") is not None
+
+
+def quotes_page_has_items(html):
+    """False for the "No quotes found!" page the site serves past the last one."""
+    backend = get_backend()
+    return backend.select_one(backend.tree(html), "quotes") is not None
+
+
+def books_category_page_url(category_url, page):
+    """Page n of a category whose first page is category_url (…/index.html, then page-2.html, …)."""
+    return urljoin(category_url, "index.html" if page == 1 else f"page-{page}.html")
+
+
+def quotes_page_url(base_url, page):
+    return urljoin(base_url, "/" if page == 1 else f"/page/{page}/")
@@ -0,0 +1,88 @@
+# src/parse_pool.py
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import astuple
+
+from data_types import BookItem
+from html_backend import get_backend, use_backend
+from parser import parse_book_page, extract_quotes, quote_item
+
+
+# ----------------------------
+# Worker side: raw HTML bytes in, compact tuples out
+# ----------------------------
+
+def _init_worker(backend_name):
+    use_backend(backend_name)
+
+
+def parse_book_record(url, category, html):
+    """BookItem fields as a tuple, or None; html is UTF-8 bytes."""
+    book = parse_book_page(url, category, html.decode("utf-8"))
+    return astuple(book) if book else None
+
+
+def parse_quote_records(html):
+    """extract_quotes() for UTF-8 bytes. Author details are left to the parent."""
+    return extract_quotes(html.decode("utf-8"))
+
+
+# ----------------------------
+# Parent side
+# ----------------------------
+
+class ParsePool:
+    """Parses pages in worker processes so parse throughput scales with cores.
+
+    Workers only ever see page HTML and return plain tuples; anything that
+    needs shared state stays in the parent. Item IDs are stable_id()s, which
+    are the same in every process, and author IDs are looked up here in the
+    parent's author service (prefetched by the crawl), so workers never fetch
+    or cache authors themselves.
+
+    Workers use the spawn start method: the crawl runs threads (asyncio.to_thread,
+    the blocking client) that must not be forked mid-flight.
+    """
+
+    def __init__(self, workers=None):
+        self.workers = workers or os.cpu_count() or 1
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(get_backend().name,),
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    async def book_items(self, url, category, html):
+        record = await asyncio.get_running_loop().run_in_executor(
+            self._executor, parse_book_record, url, category, html.encode("utf-8")
+        )
+        return [BookItem(*record)] if record else []
+
+    async def quote_items(self, page_url, html):
+        records = await asyncio.get_running_loop().run_in_executor(
+            self._executor, parse_quote_records, html.encode("utf-8")
+        )
+        return [quote_item(page_url, *fields) for fields in records]
+
+    def map_books(self, pages, categories, chunksize=8):
+        """Blocking bulk variant: BookItems for FetchedPages, in order, skipping failures."""
+        records = self._executor.map(
+            parse_book_record,
+            [page.url for page in pages],
+            [categories[page.url] for page in pages],
+            [page.html.encode("utf-8") for page in pages],
+            chunksize=chunksize,
+        )
+        return [BookItem(*record) for record in records if record]
+
+    def close(self):
+        self._executor.shutdown()
@@ -1,27 +1,28 @@
 import threading
-from datetime import datetime
 from urllib.parse import urljoin
-import requests
-from bs4 import BeautifulSoup
-from concurrent.futures import ThreadPoolExecutor, as_completed
 import uuid
 
 from robots import can_fetch
+from fetcher import fetch_pages, get_with_retries
 from data_types import BookItem, QuoteItem, AuthorDetails
+from authors import get_author_service
+from html_backend import get_backend
+from metrics import get_logger
 import re
 
 _id_lock = threading.Lock()
 _used_ids = set()
-_author_lock = threading.Lock()
-_author_cache = {}
 
 BASE_QUOTES = "https://quotes.toscrape.com/"
 
-def log(msg):
-    print(f"[{datetime.now().isoformat()}] {msg}")
+log = get_logger("parser")
 
 def generate_unique_id(prefix):
-    """Generate a globally unique ID with prefix, thread-safe."""
+    """Generate a unique ID with prefix, thread-safe.
+
+    _used_ids is per process, so IDs are only checked against this process;
+    parse workers use stable_id() instead, which needs no shared state.
+    """
     while True:
         new_id = f"{prefix}-{uuid.uuid4()}" if prefix else str(uuid.uuid4())
         with _id_lock:
@@ -29,58 +30,76 @@ def generate_unique_id(prefix):
                 _used_ids.add(new_id)
                 return new_id
 
-def get_author_details(author_href):
-    """Return AuthorDetails for a given author URL, fetching if not cached."""
-    author_url = urljoin(BASE_QUOTES, author_href)
-
-    with _author_lock:
-        if author_url in _author_cache:
-            return _author_cache[author_url]
-
+def stable_id(prefix, key):
+    """Deterministic ID for the record identified by key (a URL or quote content).
+
+    The same page yields the same ID on every run, so datasets can be diffed and merged.
+    """
+    return f"{prefix}-{uuid.uuid5(uuid.NAMESPACE_URL, key)}"
+
+def author_url_for(author_href):
+    return urljoin(BASE_QUOTES, author_href)
+
+def author_id_for(author_href):
+    """The AuthorDetails ID for an author link, derived from its URL without fetching anything."""
+    return stable_id("author", author_url_for(author_href))
+
+def extract_author_urls(html):
+    """Absolute author page URLs linked from a quotes page, without duplicates."""
+    backend = get_backend()
+    urls = (author_url_for(backend.attr(a, "href")) for a in backend.select(backend.tree(html), "author_links"))
+    return list(dict.fromkeys(urls))
+
+def parse_author_page(author_url, html):
+    """Build AuthorDetails from an author page; a minimal record if html is None."""
+    if html is None:
+        return AuthorDetails(id=author_id_for(author_url), url=author_url)
+
+    backend = get_backend()
+    tree = backend.tree(html)
+    name_el = backend.select_one(tree, "author_title")
+    born_date_el = backend.select_one(tree, "author_born_date")
+    born_loc_el = backend.select_one(tree, "author_born_location")
+    desc_el = backend.select_one(tree, "author_description")
+
+    born_location = None
+    if born_loc_el is not None:
+        text = backend.stripped_text(born_loc_el)
+        if text.lower().startswith("in "):
+            text = text[3:]
+        born_location = text
+
+    return AuthorDetails(
+        id=author_id_for(author_url),
+        url=author_url,
+        name=backend.stripped_text(name_el) if name_el is not None else None,
+        born_date=backend.stripped_text(born_date_el) if born_date_el is not None else None,
+        born_location=born_location,
+        description=backend.stripped_text(desc_el) if desc_el is not None else None
+    )
+
+def is_author_cached(author_url):
+    return get_author_service().peek(author_url) is not None
+
+def cache_author_page(author_url, html):
+    """Store details for an author page fetched elsewhere (e.g. by the crawl engine)."""
+    return get_author_service().put(author_url, parse_author_page(author_url, html))
+
+def fetch_author_details(author_url):
+    """Fetch and parse one author page; a minimal record if it is blocked or fails."""
     if not can_fetch(author_url):
         log(f"[BLOCKED] robots.txt prevents fetching {author_url}")
-        # Optionally return a minimal AuthorDetails
-        author = AuthorDetails(id=str(uuid.uuid4()), url=author_url)
-        with _author_lock:
-            _author_cache[author_url] = author
-        return author
-
-    try:
-        resp = requests.get(author_url, timeout=10)
-        resp.raise_for_status()
-        soup = BeautifulSoup(resp.text, "lxml")
-        name_el = soup.select_one("h3.author-title")
-        born_date_el = soup.select_one("span.author-born-date")
-        born_loc_el = soup.select_one("span.author-born-location")
-        desc_el = soup.select_one("div.author-description")
-
-        born_location = None
-        if born_loc_el:
-            text = born_loc_el.get_text(strip=True)
-            if text.lower().startswith("in "):
-                text = text[3:]
-            born_location = text
-
-        author = AuthorDetails(
-            id=f"author-{uuid.uuid4()}",
-            url=author_url,
-            name=name_el.get_text(strip=True) if name_el else None,
-            born_date=born_date_el.get_text(strip=True) if born_date_el else None,
-            born_location=born_location,
-            description=desc_el.get_text(strip=True) if desc_el else None
-        )
+        return parse_author_page(author_url, None)
 
-        with _author_lock:
-            _author_cache[author_url] = author
+    return parse_author_page(author_url, get_with_retries(author_url))
 
-        return author
+def get_author_details(author_href):
+    """Return AuthorDetails for a given author URL, fetching if not cached.
 
-    except requests.RequestException as e:
-        log(f"[ERROR] Failed to fetch author page {author_url}: {e}")
-        author = AuthorDetails(id=str(uuid.uuid4()), url=author_url)
-        with _author_lock:
-            _author_cache[author_url] = author
-        return author
+    Concurrent calls for the same author share one fetch (see authors.AuthorService).
+    """
+    author_url = author_url_for(author_href)
+    return get_author_service().get(author_url, lambda: fetch_author_details(author_url))
 
 def convert_rating(classes):
     """Convert 'star-rating One/Two/Three...' to integer"""
@@ -95,39 +114,38 @@ def parse_book_page(url, category, html=None):
         if html is None:
             # Always fetch if no HTML is provided
             if not can_fetch(url):
-                print(f"[BLOCKED] {url} blocked by robots.txt")
+                log(f"[BLOCKED] {url} blocked by robots.txt")
                 return None
-            response = requests.get(url, timeout=10)
-            response.raise_for_status()
-            html = response.text
+            html = get_with_retries(url)
 
         if html is None:
-            log(f"[ERROR] No HTML to parse for {url}")
+            log.error(f"[ERROR] No HTML to parse for {url}")
             return None
 
-        soup = BeautifulSoup(html, "lxml")
+        backend = get_backend()
+        tree = backend.tree(html)
 
-        title_tag = soup.select_one("div.product_main h1")
-        title = title_tag.text.strip() if title_tag else ""
+        title_tag = backend.select_one(tree, "book_title")
+        title = backend.text(title_tag).strip() if title_tag is not None else ""
 
-        price_tag = soup.select_one(".price_color")
-        price = float(re.sub(r"[^0-9.]", "", price_tag.text)) if price_tag else 0.0
+        price_tag = backend.select_one(tree, "book_price")
+        price = float(re.sub(r"[^0-9.]", "", backend.text(price_tag))) if price_tag is not None else 0.0
 
-        avail_tag = soup.select_one(".availability")
-        availability = avail_tag.text.strip() if avail_tag else ""
+        avail_tag = backend.select_one(tree, "book_availability")
+        availability = backend.text(avail_tag).strip() if avail_tag is not None else ""
 
-        rating_tag = soup.select_one("p.star-rating")
-        rating = convert_rating(rating_tag["class"]) if rating_tag else 0
+        rating_tag = backend.select_one(tree, "book_rating")
+        rating = convert_rating(backend.classes(rating_tag)) if rating_tag is not None else 0
 
         if category is None:
-            breadcrumb_items = soup.select("ul.breadcrumb li a")
+            breadcrumb_items = backend.select(tree, "breadcrumb")
             if len(breadcrumb_items) >= 2:
-                category = breadcrumb_items[-1].get_text(strip=True)
+                category = backend.stripped_text(breadcrumb_items[-1])
             else:
                 category = "Unknown"
 
         return BookItem(
-            id=generate_unique_id("book"),
+            id=stable_id("book", url),
             type="book",
             title=title,
             price=price,
@@ -138,23 +156,22 @@ def parse_book_page(url, category, html=None):
         )
 
     except Exception as e:
-        log(f"Error parsing {url}: {e}")
+        log.error(f"Error parsing {url}: {e}")
         return None
 
 
-def parse_all_books(book_pages_dict, max_workers=10):
-    """Parse all book pages concurrently using ThreadPoolExecutor"""
-    books_items = []
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        futures = []
-        for category, urls in book_pages_dict.items():
-            for url in urls:
-                futures.append(executor.submit(parse_book_page, url, category))
+def parse_all_books(book_pages_dict, max_workers=10, pool=None):
+    """Fetch all book pages on the crawl engine, then parse them (in pool's processes if given a ParsePool)"""
+    url_category = {url: category for category, urls in book_pages_dict.items() for url in urls}
+    pages = fetch_pages(url_category, max_workers=max_workers)
+    if pool is not None:
+        return pool.map_books(pages, url_category)
 
-        for future in as_completed(futures):
-            book = future.result()
-            if book:
-                books_items.append(book)
+    books_items = []
+    for page in pages:
+        book = parse_book_page(page.url, url_category[page.url], page.html)
+        if book:
+            books_items.append(book)
 
     return books_items
 
@@ -164,45 +181,55 @@ def parse_quotes_from_a_page(page_url, html=None):
             if not can_fetch(page_url):
                 log(f"[BLOCKED] {page_url} blocked by robots.txt")
                 return []
-
-            import requests
-            resp = requests.get(page_url, timeout=10)
-            resp.raise_for_status()
-            html = resp.text
+            html = get_with_retries(page_url)
 
         if html is None:
-            log(f"[ERROR] No HTML to parse for {page_url}")
+            log.error(f"[ERROR] No HTML to parse for {page_url}")
             return []
 
-        soup = BeautifulSoup(html, "lxml")
+        tree = get_backend().tree(html)
     except Exception as e:
-        log(f"Failed to parse {page_url}: {e}")
+        log.error(f"Failed to parse {page_url}: {e}")
         return []
 
+    return [quote_item(page_url, *fields) for fields in extract_quotes(tree)]
+
+def extract_quotes(html):
+    """(text, author, tags, author_href) for every complete quote on a quotes page.
+
+    Pure function of the page, so it can run in a parse worker process;
+    quote_item() looks up the author afterwards.
+    """
+    backend = get_backend()
     quotes = []
 
-    for div in soup.select("div.quote"):
-        text_el = div.select_one("span.text")
-        author_el = div.select_one("small.author")
-        tags_el = div.select("div.tags a.tag")
-        about_link_el = div.select_one("span a[href]")
-
-        if text_el and author_el and about_link_el:
-            author_details = get_author_details(about_link_el['href'])
-            quotes.append(
-                QuoteItem(
-                    id=generate_unique_id("quote"),
-                    type="quote",
-                    text=text_el.get_text(strip=True).strip("“”"),
-                    author=author_el.get_text(strip=True),
-                    tags=[a.get_text(strip=True) for a in tags_el],
-                    page_url=page_url,
-                    author_details=author_details
-                )
-            )
+    for div in backend.select(backend.tree(html), "quotes"):
+        text_el = backend.select_one(div, "quote_text")
+        author_el = backend.select_one(div, "quote_author")
+        tags_el = backend.select(div, "quote_tags")
+        about_link_el = backend.select_one(div, "quote_about")
+
+        if text_el is not None and author_el is not None and about_link_el is not None:
+            quotes.append((
+                backend.stripped_text(text_el).strip("“”"),
+                backend.stripped_text(author_el),
+                [backend.stripped_text(a) for a in tags_el],
+                backend.attr(about_link_el, "href"),
+            ))
 
     return quotes
 
+def quote_item(page_url, text, author, tags, author_href):
+    """QuoteItem referencing its author by ID; the details stay in the author service (see prefetch_authors)."""
+    return QuoteItem(
+        id=stable_id("quote", f"{author}\n{text}"),
+        type="quote",
+        text=text,
+        author=author,
+        tags=tags,
+        page_url=page_url,
+        author_id=author_id_for(author_href)
+    )
 
 if __name__ == "__main__":
     book_pages_dict = {
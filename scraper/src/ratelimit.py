@@ -0,0 +1,121 @@
+# src/ratelimit.py
+import asyncio
+import threading
+import time
+from urllib.parse import urlsplit
+
+from cache import get_cache
+from metrics import get_logger
+from robots import rate_from_parser, robots_policy
+
+# Used when robots.txt sets neither Crawl-delay nor Request-rate. Roughly the
+# ceiling of the old fixed 0.5-1.5s sleep across ten workers.
+DEFAULT_RATE = 10.0
+
+log = get_logger("ratelimit")
+
+
+class TokenBucket:
+    """Token bucket that hands out reservations instead of blocking.
+
+    reserve() always takes a token and returns how long the caller has to
+    wait before using it. The balance may go negative, which queues callers
+    one 1/rate interval apart no matter which thread or task they run on.
+    """
+
+    def __init__(self, rate, capacity=1, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+        self._tokens = capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def set_rate(self, rate):
+        """Use rate from now on; the time since the last reservation still refills at the old one."""
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self.rate = rate
+
+
+class DomainRateLimiter:
+    """One TokenBucket per domain, shared by every worker that talks to it.
+
+    The rate comes from the domain's robots.txt (Crawl-delay/Request-rate)
+    and falls back to default_rate. Each time robots re-reads a domain's
+    robots.txt, its bucket takes up the rate found there.
+    """
+
+    def __init__(self, default_rate=DEFAULT_RATE, capacity=1, user_agent="*", robots=robots_policy):
+        self.default_rate = default_rate
+        self.capacity = capacity
+        self.user_agent = user_agent
+        self.robots = robots
+        self._buckets = {}
+        self._lock = threading.Lock()
+        robots.on_refresh(self._robots_refreshed)
+
+    def _robots_refreshed(self, domain, rp):
+        bucket = self.get_bucket(domain)
+        if bucket is None:
+            return  # bucket_for() reads the rate when the domain is first used
+        rate = rate_from_parser(rp, self.user_agent) or self.default_rate
+        if rate != bucket.rate:
+            log(f"[RATE] {urlsplit(domain).netloc} now allows {rate:g} requests/s")
+            bucket.set_rate(rate)
+
+    def get_bucket(self, url):
+        with self._lock:
+            return self._buckets.get(urlsplit(url).netloc)
+
+    def bucket_for(self, url):
+        """Return the bucket for url's domain, reading robots.txt the first time."""
+        bucket = self.get_bucket(url)
+        if bucket is not None:
+            return bucket
+
+        rate = rate_from_parser(self.robots.parser(url), self.user_agent) or self.default_rate
+        with self._lock:
+            return self._buckets.setdefault(urlsplit(url).netloc, TokenBucket(rate, self.capacity))
+
+    def reserve(self, url):
+        return self.bucket_for(url).reserve()
+
+    async def wait(self, url):
+        """Wait for url's turn without holding a thread."""
+        if _offline():
+            return
+        bucket = self.get_bucket(url)
+        if bucket is None:
+            # First request to this domain may have to read robots.txt.
+            bucket = await asyncio.to_thread(self.bucket_for, url)
+        delay = bucket.reserve()
+        if delay:
+            await asyncio.sleep(delay)
+
+    def wait_blocking(self, url):
+        """Blocking counterpart of wait() for callers outside the event loop."""
+        if _offline():
+            return
+        delay = self.reserve(url)
+        if delay:
+            time.sleep(delay)
+
+
+def _offline():
+    # Cache replays never reach the server, so they are not rate limited.
+    cache = get_cache()
+    return cache is not None and cache.offline
+
+
+rate_limiter = DomainRateLimiter()
@@ -0,0 +1,270 @@
+# src/retry.py
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+from metrics import get_logger, registry
+
+log = get_logger("retry")
+
+RETRY_DENIED = registry.counter("scraper_retries_denied_total", "Retries not made, by reason")
+CIRCUIT_STATE = registry.gauge("scraper_circuit_state", "Per-host circuit breaker: 0 closed, 1 half-open, 2 open")
+
+# Statuses worth another attempt. Any other 4xx (404, 410, 403...) will not change on a retry.
+TRANSIENT_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+
+
+def classify(status):
+    """Whether a response with this status is "ok", worth a "retry" or "fatal" (retrying cannot help)."""
+    if status < 400:
+        return "ok"
+    if status in TRANSIENT_STATUSES or status >= 500:
+        return "retry"
+    return "fatal"
+
+
+def parse_retry_after(value, now=None):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP-date); None if absent or invalid."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - (now or datetime.now(timezone.utc))).total_seconds())
+
+
+class RetryBudget:
+    """Caps retries at ``ratio`` of first attempts (plus ``floor``), process-wide.
+
+    When a site is down every request failing three times would triple the
+    load on it; with a budget the extra load stays around ``ratio``.
+    """
+
+    def __init__(self, ratio=0.2, floor=10):
+        self.ratio = ratio
+        self.floor = floor
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.retries = 0
+
+    def request(self):
+        with self._lock:
+            self.requests += 1
+
+    def spend(self):
+        """True, and one retry used, if the budget allows another retry."""
+        with self._lock:
+            if self.retries >= self.floor + self.ratio * self.requests:
+                return False
+            self.retries += 1
+            return True
+
+
+class CircuitBreaker:
+    """Per-host breaker: opens for ``cooldown`` seconds once ``failure_rate`` of recent requests failed.
+
+    Recent means the last ``window`` outcomes, with at least ``min_calls``
+    of them, so a flaky host keeps being crawled while one that is down
+    is not. While open, requests to the host fail at once instead of tying
+    up a worker. After the cooldown one probe request is let through
+    (half-open): its success closes the breaker, its failure opens it again
+    for twice as long, up to ``max_cooldown``. A probe that ends with neither
+    (cancelled, or an unexpected exception) is given back with abandon(), so
+    the next request probes instead.
+    """
+
+    CLOSED, HALF_OPEN, OPEN = 0, 1, 2
+
+    def __init__(self, host, failure_rate=0.6, window=50, min_calls=20, cooldown=30.0, max_cooldown=300.0,
+                 clock=time.monotonic):
+        self.host = host
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.clock = clock
+        self.state = self.CLOSED
+        self.opened = 0
+        self._outcomes = deque(maxlen=window)  # True for a failure
+        self._cooldown = cooldown
+        self._open_until = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and self.clock() >= self._open_until:
+                self._set(self.HALF_OPEN)
+                return True  # the probe
+            return False
+
+    def success(self):
+        with self._lock:
+            self._outcomes.append(False)
+            if self.state != self.CLOSED:
+                self._cooldown = self.base_cooldown
+                self._outcomes.clear()
+                log(f"[CIRCUIT] {self.host} closed")
+                self._set(self.CLOSED)
+
+    def abandon(self):
+        """A try ended without an outcome: if it was the probe, open again without a new cooldown."""
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._set(self.OPEN)
+
+    def failure(self):
+        with self._lock:
+            self._outcomes.append(True)
+            if self.state == self.HALF_OPEN:
+                self._cooldown = min(self._cooldown * 2, self.max_cooldown)
+            elif self.state == self.OPEN or len(self._outcomes) < self.min_calls:
+                return
+            elif sum(self._outcomes) < self.failure_rate * len(self._outcomes):
+                return
+            self._open_until = self.clock() + self._cooldown
+            self.opened += 1
+            log.warning(f"[CIRCUIT] {self.host} open for {self._cooldown:.0f}s")
+            self._set(self.OPEN)
+
+    def _set(self, state):
+        self.state = state
+        CIRCUIT_STATE.set(state, host=self.host)
+
+
+class RetryPolicy:
+    """When and how long to wait before retrying a request, shared by every fetch site.
+
+    Each fetch gets an Attempt from start(); the caller reports how each try
+    went and sleeps for the delay failed() returns (None means give up).
+    Successful statuses and fatal ones (404 and other client errors) are
+    never retried. Transient ones (429, 5xx, 408) and network errors are
+    retried up to ``attempts`` tries in all, waiting for Retry-After when the
+    server sends one (giving up if it asks for more than
+    ``max_retry_after``), otherwise for a decorrelated-jitter delay between
+    ``base`` and three times the previous one, capped at ``cap``. Retries
+    also need the shared RetryBudget, and every host has a CircuitBreaker.
+    """
+
+    def __init__(self, attempts=3, base=0.5, cap=30.0, max_retry_after=120.0, budget=None,
+                 breaker_failure_rate=0.6, breaker_cooldown=30.0):
+        self.attempts = attempts
+        self.base = base
+        self.cap = cap
+        self.max_retry_after = max_retry_after
+        self.budget = budget or RetryBudget()
+        self.breaker_failure_rate = breaker_failure_rate
+        self.breaker_cooldown = breaker_cooldown
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def breaker(self, url):
+        host = urlsplit(url).netloc
+        with self._lock:
+            breaker = self._breakers.get(host)
+            if breaker is None:
+                breaker = self._breakers[host] = CircuitBreaker(
+                    host, self.breaker_failure_rate, cooldown=self.breaker_cooldown
+                )
+            return breaker
+
+    def start(self, url, attempts=None):
+        """An Attempt for url, or None if its host's circuit is open."""
+        breaker = self.breaker(url)
+        if not breaker.allow():
+            RETRY_DENIED.inc(reason="circuit_open")
+            log.debug("[CIRCUIT] Host is failing, skipped", url=url)
+            return None
+        self.budget.request()
+        return Attempt(self, url, breaker, attempts or self.attempts)
+
+    def jitter(self, previous):
+        return min(self.cap, random.uniform(self.base, max(self.base, previous * 3)))
+
+    def stats(self):
+        with self._lock:
+            breakers = list(self._breakers.values())
+        return {
+            "requests": self.budget.requests,
+            "retries": self.budget.retries,
+            "circuits_open": sum(b.state != CircuitBreaker.CLOSED for b in breakers),
+            "circuits_opened": sum(b.opened for b in breakers),
+        }
+
+
+class Attempt:
+    """One URL's tries under a RetryPolicy.
+
+    Each try ends in succeeded() or failed(); callers call release() in a
+    finally block, which abandons a try that got neither.
+    """
+
+    def __init__(self, policy, url, breaker, attempts):
+        self.policy = policy
+        self.url = url
+        self.breaker = breaker
+        self.attempts = attempts
+        self.number = 1
+        self.delay = policy.base
+        self._pending = True  # the current try has not reported its outcome
+
+    def succeeded(self):
+        self._pending = False
+        self.breaker.success()
+
+    def failed(self, status=None, retry_after=None, error=None):
+        """Seconds to wait before the next try, or None to give up.
+
+        Pass the response status and its Retry-After header, or the
+        exception for a network error or timeout.
+        """
+        self._pending = False
+        if status is not None and classify(status) != "retry":
+            self.breaker.success()  # the host answered; the URL is the problem
+            return None
+        if status == 429:
+            self.breaker.success()  # up, only throttling us
+        else:
+            self.breaker.failure()
+        if self.number >= self.attempts:
+            return None
+
+        wait = parse_retry_after(retry_after) if status in (429, 503) else None
+        if wait is not None and wait > self.policy.max_retry_after:
+            RETRY_DENIED.inc(reason="retry_after")
+            log.warning(f"[RETRY] {self.url} asks to wait {wait:.0f}s, giving up")
+            return None
+        if not self.policy.budget.spend():
+            RETRY_DENIED.inc(reason="budget")
+            log.debug("[RETRY] Retry budget exhausted", url=self.url)
+            return None
+
+        self.number += 1
+        self.delay = wait if wait is not None else self.policy.jitter(self.delay)
+        return self.delay
+
+    def resume(self):
+        """Whether to make the next try after sleeping: False if the host's circuit opened meanwhile."""
+        self._pending = self.breaker.allow()
+        return self._pending
+
+    def release(self):
+        """End the current try; one that reported nothing (cancelled, crashed) hands back a half-open probe."""
+        if self._pending:
+            self._pending = False
+            self.breaker.abandon()
+
+
+# Shared by the crawl engine and every blocking fetch.
+retry_policy = RetryPolicy()
@@ -8,36 +8,192 @@
 #     return rp.can_fetch(user_agent, url)
 # src/robots.py
 
+import asyncio
+import time
 import urllib.robotparser
 import threading
-from datetime import datetime
+from concurrent.futures import Future
+from urllib.parse import urlsplit
 
-_rp_cache = {}
-_cache_lock = threading.Lock()
+from cache import get_cache
+from http_client import get_client
+from metrics import get_logger
 
-def log(msg):
-    print(f"[{datetime.now().isoformat()}] {msg}")
+DEFAULT_TTL = 24 * 3600  # how long a robots.txt is trusted (Google uses a day too)
+ERROR_TTL = 300  # retry a robots.txt that could not be read after five minutes
 
-def can_fetch(url, user_agent="*"):
-    domain = "/".join(url.split("/")[:3])
+log = get_logger("robots")
+
+def read_robots(rp):
+    """RobotFileParser.read() over the shared keep-alive client instead of urllib."""
+    resp = get_client().get(rp.url)
+    if resp.status_code in (401, 403):
+        rp.disallow_all = True
+    elif 400 <= resp.status_code < 500:
+        rp.allow_all = True
+    else:
+        resp.raise_for_status()
+        rp.parse(resp.text.splitlines())
+
+
+class _Entry:
+    def __init__(self, rp, expires_at):
+        self.rp = rp
+        self.expires_at = expires_at
+        self.decisions = {}
+
+
+class RobotsPolicy:
+    """robots.txt per domain, read once per TTL, with per-URL decisions cached.
+
+    Reading a domain's robots.txt only blocks callers asking about that same
+    domain (they share the one read); other domains carry on. Entries expire
+    after ttl seconds, or error_ttl if the file could not be read (everything
+    on the domain is refused until then, as before). Decisions are counted in
+    stats() instead of being logged one by one. on_refresh() callbacks hear
+    about every (re)read, e.g. to pick up a new Crawl-delay.
+    """
+
+    def __init__(self, ttl=DEFAULT_TTL, error_ttl=ERROR_TTL, clock=time.monotonic):
+        self.ttl = ttl
+        self.error_ttl = error_ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._loading = {}
+        self._listeners = []
+        self.counters = {"allowed": 0, "blocked": 0, "decision_hits": 0, "fetches": 0, "fetch_errors": 0}
+
+    def parser(self, url):
+        """The RobotFileParser for url's domain, reading robots.txt if there is no fresh copy."""
+        return self._entry(url).rp
+
+    def allowed(self, url, user_agent="*"):
+        decision = self.cached_decision(url, user_agent)
+        if decision is None:
+            decision = self._decide(self._entry(url), url, user_agent)
+        return decision
+
+    def cached_decision(self, url, user_agent="*"):
+        """The decision for url if its domain's robots.txt is already loaded, else None. Never blocks."""
+        with self._lock:
+            entry = self._entries.get(_domain(url))
+            if entry is None or entry.expires_at <= self._clock():
+                return None
+            decision = entry.decisions.get((user_agent, url))
+            if decision is not None:
+                self.counters["decision_hits"] += 1
+                self.counters["allowed" if decision else "blocked"] += 1
+                return decision
+        return self._decide(entry, url, user_agent)
+
+    async def allowed_async(self, url, user_agent="*"):
+        """allowed() for the event loop: only goes to a thread when robots.txt has to be read."""
+        decision = self.cached_decision(url, user_agent)
+        if decision is None:
+            decision = await asyncio.to_thread(self.allowed, url, user_agent)
+        return decision
+
+    async def prefetch(self, urls):
+        """Read robots.txt for every domain in urls concurrently, e.g. at the start of a crawl."""
+        domains = {_domain(url): url for url in urls}
+        await asyncio.gather(*(asyncio.to_thread(self.parser, url) for url in domains.values()))
 
-    with _cache_lock:
-        if domain in _rp_cache:
-            rp = _rp_cache[domain]
-        else:
-            rp = urllib.robotparser.RobotFileParser()
-            rp.set_url(f"{domain}/robots.txt")
-            try:
-                rp.read()
-            except Exception as e:
-                log(f"[robots.txt] Failed to read {domain}/robots.txt: {e}")
-            _rp_cache[domain] = rp
+    def on_refresh(self, callback):
+        """Call callback(domain, parser) each time a domain's robots.txt is read, the first time included."""
+        with self._lock:
+            self._listeners.append(callback)
 
-    allowed = rp.can_fetch(user_agent, url)
+    def stats(self):
+        with self._lock:
+            return dict(self.counters, domains=len(self._entries))
 
-    status = "ALLOWED" if allowed else "BLOCKED"
-    log(f"[{status}] {url}")
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
 
-    return allowed
+    def _decide(self, entry, url, user_agent):
+        allowed = entry.rp.can_fetch(user_agent, url)
+        with self._lock:
+            entry.decisions[(user_agent, url)] = allowed
+            self.counters["allowed" if allowed else "blocked"] += 1
+        return allowed
 
+    def _entry(self, url):
+        domain = _domain(url)
+        with self._lock:
+            entry = self._entries.get(domain)
+            if entry is not None and entry.expires_at > self._clock():
+                return entry
+            future = self._loading.get(domain)
+            leader = future is None
+            if leader:
+                future = self._loading[domain] = Future()
+        if not leader:
+            return future.result()
+
+        # Only this domain waits on the read; the lock is not held.
+        rp = urllib.robotparser.RobotFileParser()
+        rp.set_url(f"{domain}/robots.txt")
+        ttl = self.ttl
+        try:
+            read_robots(rp)
+        except Exception as e:
+            log.error(f"[robots.txt] Failed to read {domain}/robots.txt: {e}")
+            ttl = self.error_ttl
+        entry = _Entry(rp, self._clock() + ttl)
+        with self._lock:
+            self.counters["fetches"] += 1
+            if ttl == self.error_ttl:
+                self.counters["fetch_errors"] += 1
+            self._entries[domain] = entry
+            del self._loading[domain]
+            listeners = list(self._listeners)
+        for callback in listeners:
+            callback(domain, rp)
+        future.set_result(entry)
+        return entry
+
+
+def _domain(url):
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+robots_policy = RobotsPolicy()
+
+def get_parser(url):
+    """Return the (cached) RobotFileParser for url's domain, reading it on first use."""
+    return robots_policy.parser(url)
+
+def rate_from_parser(rp, user_agent="*"):
+    """Requests per second allowed by Crawl-delay / Request-rate, or None if neither is set.
+
+    When both are present the stricter one wins.
+    """
+    rates = []
+    delay = rp.crawl_delay(user_agent)
+    if delay:
+        rates.append(1.0 / float(delay))
+    request_rate = rp.request_rate(user_agent)
+    if request_rate and request_rate.seconds:
+        rates.append(request_rate.requests / request_rate.seconds)
+    return min(rates) if rates else None
+
+def crawl_rate(url, user_agent="*"):
+    return rate_from_parser(get_parser(url), user_agent)
+
+def _offline():
+    # Nothing goes to the network; cached pages were allowed when they were fetched.
+    cache = get_cache()
+    return cache is not None and cache.offline
+
+def can_fetch(url, user_agent="*"):
+    if _offline():
+        return True
+    return robots_policy.allowed(url, user_agent)
 
+async def can_fetch_async(url, user_agent="*"):
+    if _offline():
+        return True
+    return await robots_policy.allowed_async(url, user_agent)
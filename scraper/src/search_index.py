@@ -0,0 +1,162 @@
+# src/search_index.py
+import bisect
+import json
+import re
+from array import array
+
+from encoder import encode
+from metrics import get_logger
+
+log = get_logger("search_index")
+
+# Same tokens as the UI's tokenize(): lower-cased runs of letters, digits and underscores.
+TOKEN_RE = re.compile(r"\w+")
+FIELDS = ("categories", "tags", "authors")
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+
+def intersect(a, b):
+    """Sorted postings present in both a and b (linear merge)."""
+    out = array("I")
+    i = j = 0
+    while i < len(a) and j < len(b):
+        if a[i] < b[j]:
+            i += 1
+        elif a[i] > b[j]:
+            j += 1
+        else:
+            out.append(a[i])
+            i += 1
+            j += 1
+    return out
+
+
+def _deltas(postings):
+    previous = 0
+    out = []
+    for doc in postings:
+        out.append(doc - previous)
+        previous = doc
+    return out
+
+
+def _undelta(gaps):
+    out = array("I")
+    doc = 0
+    for gap in gaps:
+        doc += gap
+        out.append(doc)
+    return out
+
+
+class SearchIndex:
+    """Inverted index over items.jsonl: a document is an item's line number.
+
+    tokens maps title/quote-text tokens, and categories/tags/authors map
+    their values, to sorted arrays of document numbers. Queries are
+    intersections of those arrays, so they cost postings length, not item
+    count. Saved as JSON with delta-encoded postings for the UI.
+    """
+
+    def __init__(self, count=0, tokens=None, categories=None, tags=None, authors=None):
+        self.count = count
+        self.tokens = tokens or {}
+        self.categories = categories or {}
+        self.tags = tags or {}
+        self.authors = authors or {}
+        self._sorted_tokens = sorted(self.tokens)
+
+    @classmethod
+    def from_items(cls, items_path):
+        with items_path.open("rb") as items:
+            return cls.build(json.loads(line) for line in items)
+
+    @classmethod
+    def build(cls, items):
+        """Index item dicts (as serialised), numbering them in iteration order."""
+        index = cls()
+        for doc, item in enumerate(items):
+            index._add(doc, item)
+            index.count += 1
+        index._sorted_tokens = sorted(index.tokens)
+        return index
+
+    def _add(self, doc, item):
+        text = item["title"] if item["type"] == "book" else item["text"]
+        for token in set(tokenize(text)):
+            self.tokens.setdefault(token, array("I")).append(doc)
+        if item["type"] == "book":
+            self.categories.setdefault(item["category"], array("I")).append(doc)
+        else:
+            self.authors.setdefault(item["author"], array("I")).append(doc)
+            for tag in set(item["tags"]):
+                self.tags.setdefault(tag, array("I")).append(doc)
+
+    def search(self, text):
+        """Documents containing every token of text; the last token also matches as a prefix ("harr" finds "harry").
+
+        None for a query without tokens, meaning no constraint.
+        """
+        words = tokenize(text)
+        if not words:
+            return None
+        result = None
+        for word in words[:-1]:
+            result = self._narrow(result, self.tokens.get(word, array("I")))
+        return self._narrow(result, self._prefix(words[-1]))
+
+    def _prefix(self, prefix):
+        start = bisect.bisect_left(self._sorted_tokens, prefix)
+        docs = set()
+        for token in self._sorted_tokens[start:]:
+            if not token.startswith(prefix):
+                break
+            docs.update(self.tokens[token])
+        return array("I", sorted(docs))
+
+    def query(self, text="", category=None, tag=None, author=None):
+        """Documents matching all given constraints, or None if there are none."""
+        result = self.search(text) if text else None
+        for field, value in (("categories", category), ("tags", tag), ("authors", author)):
+            if value:
+                result = self._narrow(result, getattr(self, field).get(value, array("I")))
+        return result
+
+    @staticmethod
+    def _narrow(result, postings):
+        return postings if result is None else intersect(result, postings)
+
+    def to_json(self):
+        return {
+            "version": 1,
+            "count": self.count,
+            "encoding": "delta",
+            "tokens": {token: _deltas(self.tokens[token]) for token in self._sorted_tokens},
+            **{field: {k: _deltas(v) for k, v in getattr(self, field).items()} for field in FIELDS},
+        }
+
+    @classmethod
+    def from_json(cls, data):
+        def decode(postings):
+            return {key: _undelta(gaps) for key, gaps in postings.items()}
+        return cls(data["count"], *(decode(data[field]) for field in ("tokens",) + FIELDS))
+
+    def save(self, path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        part_path = path.with_name(path.name + ".part")
+        part_path.write_bytes(encode(self.to_json()))
+        part_path.replace(path)
+        log(f"Saved search index to {path}: {len(self.tokens)} tokens over {self.count} items")
+        return path
+
+    @classmethod
+    def load(cls, path):
+        return cls.from_json(json.loads(path.read_bytes()))
+
+
+def write_search_index(items_path, path):
+    """Build the index for items.jsonl and save it next to it, for the UI."""
+    return SearchIndex.from_items(items_path).save(path)
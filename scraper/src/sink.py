@@ -0,0 +1,208 @@
+# src/sink.py
+import json
+import os
+import time
+from datetime import datetime, timezone
+
+from data_types import AuthorDetails, MetaInfo, item_from_dict
+from encoder import BatchWriter, encode, encode_lines, open_output
+from metrics import get_logger
+from summary import SummaryBuilder
+
+log = get_logger("sink")
+
+
+class JsonlSink:
+    """Appends items to a JSONL file as soon as they are parsed.
+
+    Items are encoded compactly (see encoder.encode) and written in batches
+    to ``<path>.part``, which is fsynced every checkpoint_every items
+    or checkpoint_seconds, whichever comes first, so a crash loses at most
+    one checkpoint's worth. close() moves the finished file over ``path``;
+    until then readers keep seeing the previous run's file. The summary is
+    kept up to date alongside, so nothing but counters stays in memory.
+
+    on_checkpoint, if given, is called after every fsync (the crawl frontier
+    uses it to persist completed URLs). With resume=True an existing part
+    file is kept and appended to; items already in it are counted again and
+    skipped if they are written a second time.
+
+    author_ids collects the authors the written quotes reference, for the
+    authors table (see write_authors()).
+    """
+
+    def __init__(self, path, checkpoint_every=500, checkpoint_seconds=5.0, on_checkpoint=None, resume=False):
+        self.path = path
+        self.part_path = path.with_name(path.name + ".part")
+        self.checkpoint_every = checkpoint_every
+        self.checkpoint_seconds = checkpoint_seconds
+        self.on_checkpoint = on_checkpoint
+        self.summary = SummaryBuilder()
+        self.author_ids = set()
+        self.count = 0
+        self._since_checkpoint = 0
+        self._last_checkpoint = time.monotonic()
+        self._resumed_ids = None
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if resume and self.part_path.exists():
+            self._reload_part_file()
+            self._file = self.part_path.open("ab")
+        else:
+            self._file = self.part_path.open("wb")
+        self._batch = BatchWriter(self._file)
+
+    def _reload_part_file(self):
+        """Recount the items a previous, interrupted run wrote, dropping a torn last line."""
+        self._resumed_ids = set()
+        good_bytes = 0
+        with self.part_path.open("rb") as f:
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    break
+                item = item_from_dict(json.loads(raw))
+                self._resumed_ids.add(item.id)
+                self._add(item)
+                good_bytes += len(raw)
+        with self.part_path.open("r+b") as f:
+            f.truncate(good_bytes)
+        log(f"Resuming {self.part_path} with {self.count} items")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close(commit=exc_type is None)
+
+    def write(self, item):
+        if self._resumed_ids is not None and item.id in self._resumed_ids:
+            return
+        self._batch.write(encode(item) + b"\n")
+        self._add(item)
+        self._since_checkpoint += 1
+        if (self._since_checkpoint >= self.checkpoint_every
+                or time.monotonic() - self._last_checkpoint >= self.checkpoint_seconds):
+            self.checkpoint()
+
+    def _add(self, item):
+        self.summary.add(item)
+        self.count += 1
+        if item.type == "quote" and item.author_id is not None:
+            self.author_ids.add(item.author_id)
+
+    def checkpoint(self):
+        self._batch.drain()
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._since_checkpoint = 0
+        self._last_checkpoint = time.monotonic()
+        if self.on_checkpoint:
+            self.on_checkpoint()
+
+    def close(self, commit=True):
+        """Flush and close; on commit the part file replaces path, otherwise it is left for inspection."""
+        if self._file.closed:
+            return
+        self.checkpoint()
+        self._file.close()
+        if commit:
+            self.part_path.replace(self.path)
+            log(f"Saved {self.count} items to {self.path}")
+        else:
+            log(f"Kept {self.count} items written before the failure in {self.part_path}")
+
+
+def write_authors(path, authors):
+    """Write the authors table, one AuthorDetails per line, replacing path once complete."""
+    part_path = path.with_name(path.name + ".part")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with part_path.open("wb") as f:
+        f.write(encode_lines(sorted(authors, key=lambda a: a.id)))
+    part_path.replace(path)
+    log(f"Saved {len(authors)} authors to {path}")
+
+
+def merge_items(paths, path, drop_books=()):
+    """Concatenate items files (one per worker of a distributed crawl) into path; returns their SummaryBuilder.
+
+    Books whose product_url is in drop_books (superseded duplicates, see
+    dedup.Deduplicator.superseded()) are left out. path may be one of paths.
+    """
+    summary = SummaryBuilder()
+    part_path = path.with_name(path.name + ".part")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with part_path.open("wb") as out:
+        batch = BatchWriter(out, batch_bytes=1 << 20)
+        for items_path in paths:
+            with items_path.open("rb") as lines:
+                for raw in lines:
+                    item = item_from_dict(json.loads(raw))
+                    if item.type == "book" and item.product_url in drop_books:
+                        continue
+                    summary.add(item)
+                    batch.write(raw)
+        batch.drain()
+    part_path.replace(path)
+    log(f"Merged {summary.total} items from {len(paths)} files into {path}")
+    return summary
+
+
+def merge_authors(paths, path):
+    """Merge authors files into one authors table, each author once."""
+    authors = {}
+    for authors_path in paths:
+        with authors_path.open("rb") as lines:
+            for raw in lines:
+                author = AuthorDetails(**json.loads(raw))
+                authors.setdefault(author.id, author)
+    write_authors(path, list(authors.values()))
+
+
+def _write_json_array(batch, jsonl_path):
+    """Copy a JSONL file into an open JSON array, one element per line."""
+    with jsonl_path.open("rb") as lines:
+        for i, line in enumerate(lines):
+            batch.write((b"\n" if i == 0 else b",\n") + line.rstrip(b"\n"))
+
+
+def dataset_meta(summary_builder, dataset="books_and_quotes"):
+    return MetaInfo(
+        dataset=dataset,
+        generated_at=datetime.now(timezone.utc).isoformat(),
+        total_items=summary_builder.total
+    )
+
+
+def write_summary_json(path, summary_builder, dataset="books_and_quotes"):
+    """Write meta, filters and summary, everything of dataset.json but the items, for the UI to use as is."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("wb") as out:
+        out.write(encode({
+            "meta": dataset_meta(summary_builder, dataset),
+            "filters": summary_builder.filters(),
+            "summary": summary_builder.summary(),
+        }) + b"\n")
+    log(f"Saved summary to {path}")
+
+
+def write_dataset_json(path, items_path, summary_builder, dataset="books_and_quotes", authors_path=None,
+                       compression=None):
+    """Write dataset.json by streaming items (and the authors table, if given) back from their JSONL files.
+
+    Output is compact JSON with one item per line. With compression ("gzip" or
+    "zstd") the file is written compressed, as dataset.json.gz/.zst. Returns the path written.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    out, path = open_output(path, compression)
+    with out:
+        batch = BatchWriter(out, batch_bytes=1 << 20)
+        batch.write(b'{"meta":' + encode(dataset_meta(summary_builder, dataset)) + b',"filters":' + encode(summary_builder.filters()) + b',"items":[')
+        _write_json_array(batch, items_path)
+        batch.write(b"\n]")
+        if authors_path is not None:
+            batch.write(b',"authors":[')
+            _write_json_array(batch, authors_path)
+            batch.write(b"\n]")
+        batch.write(b',"summary":' + encode(summary_builder.summary()) + b"}\n")
+        batch.drain()
+    log(f"Saved dataset to {path}")
+    return path
@@ -0,0 +1,9 @@
+# src/soup.py
+from bs4 import BeautifulSoup
+
+
+def as_soup(html):
+    """Return a parsed tree for html, reusing it if it was already parsed upstream."""
+    if isinstance(html, BeautifulSoup):
+        return html
+    return BeautifulSoup(html, "lxml")
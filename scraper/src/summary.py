@@ -0,0 +1,150 @@
+# src/summary.py
+from array import array
+from collections import Counter
+
+try:
+    import numpy
+except ImportError:  # optional: Counter over the same integer columns gives the same counts
+    numpy = None
+
+from data_types import (
+    SummaryData, CategoryCount, RatingCount, TagCount, AuthorCount, Filters,
+    PriceBucket, CategoryRatings, AuthorTags,
+)
+
+RATINGS = 6  # ratings are 0 (unknown) to 5
+PRICE_BUCKET_WIDTH = 10.0
+
+
+class _Codes:
+    """Distinct values of one column in first-seen order, each with a small integer code."""
+
+    def __init__(self):
+        self.codes = {}
+        self.values = []
+
+    def code(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+def _bincount(codes, size):
+    """How often each code 0..size-1 occurs, as a list."""
+    if not size:
+        return []
+    if numpy is not None:
+        return numpy.bincount(numpy.frombuffer(codes, dtype=numpy.int32), minlength=size).tolist()
+    counts = Counter(codes)  # counted in C, one pass
+    return [counts.get(code, 0) for code in range(size)]
+
+
+class SummaryBuilder:
+    """Summary counts and filter values, kept as integer-coded columns and counted in one batch.
+
+    add() only appends a few ints per item: category, author and tag values
+    are coded once (_Codes), prices and ratings go into typed arrays. summary()
+    then counts each column with a single bincount (numpy if installed, a C
+    Counter pass otherwise) instead of updating dicts per item, and derives the
+    cross-tabulations from combined codes such as category * RATINGS + rating.
+    Authors by tags is sparse, so only the pairs that occur are counted
+    (_pair_counts) rather than a dense authors * tags table.
+    Memory is a few bytes per item plus the distinct values.
+    """
+
+    def __init__(self, price_bucket_width=PRICE_BUCKET_WIDTH):
+        self.price_bucket_width = price_bucket_width
+        self.total = 0
+        self._categories = _Codes()
+        self._authors = _Codes()
+        self._tags = _Codes()
+        self._book_category = array("i")
+        self._book_rating = array("i")
+        self._book_price = array("d")
+        self._quote_author = array("i")
+        self._tag = array("i")
+        self._tag_author = array("i")  # author of the quote each _tag entry belongs to
+
+    def add(self, item):
+        self.total += 1
+        if item.type == "book":
+            self._book_category.append(self._categories.code(item.category))
+            self._book_rating.append(item.rating)
+            self._book_price.append(item.price)
+        else:
+            author = self._authors.code(item.author)
+            self._quote_author.append(author)
+            for tag in item.tags:
+                self._tag.append(self._tags.code(tag))
+                self._tag_author.append(author)
+
+    def add_many(self, items):
+        for item in items:
+            self.add(item)
+
+    def summary(self):
+        categories, authors, tags = self._categories.values, self._authors.values, self._tags.values
+
+        ratings_by_category = _bincount(
+            _combine(self._book_category, RATINGS, self._book_rating), len(categories) * RATINGS
+        )
+        tags_by_author = [[] for _ in authors]
+        for (author, tag), n in _pair_counts(self._tag_author, len(tags), self._tag):
+            tags_by_author[author].append(TagCount(tag=tags[tag], count=n))
+
+        return SummaryData(
+            books_by_category=[
+                CategoryCount(category=c, count=n) for c, n in zip(categories, _bincount(self._book_category, len(categories)))
+            ],
+            books_by_rating=[
+                RatingCount(rating=r, count=n) for r, n in enumerate(_bincount(self._book_rating, RATINGS)) if n
+            ],
+            quotes_by_tag=[TagCount(tag=t, count=n) for t, n in zip(tags, _bincount(self._tag, len(tags)))],
+            quotes_by_author=[
+                AuthorCount(author=a, count=n) for a, n in zip(authors, _bincount(self._quote_author, len(authors)))
+            ],
+            price_histogram=self._price_histogram(),
+            ratings_by_category=[
+                CategoryRatings(category=c, counts=ratings_by_category[i * RATINGS:(i + 1) * RATINGS])
+                for i, c in enumerate(categories)
+            ],
+            tags_by_author=[AuthorTags(author=a, tags=t) for a, t in zip(authors, tags_by_author)],
+        )
+
+    def _price_histogram(self):
+        if not self._book_price:
+            return []
+        width = self.price_bucket_width
+        if numpy is not None:
+            buckets = array("i", numpy.floor_divide(numpy.frombuffer(self._book_price), width).astype(numpy.int32).tobytes())
+        else:
+            buckets = array("i", [int(price // width) for price in self._book_price])
+        counts = _bincount(buckets, max(buckets) + 1)
+        return [
+            PriceBucket(low=i * width, high=(i + 1) * width, count=n) for i, n in enumerate(counts) if n
+        ]
+
+    def filters(self):
+        return Filters(categories=list(self._categories.values), tags=list(self._tags.values))
+
+
+def _pair_counts(major, minor_size, minor):
+    """((major, minor), count) for each pair that occurs, sorted by major then minor."""
+    if not major:
+        return []
+    if numpy is not None:
+        combined = numpy.frombuffer(major, dtype=numpy.int32).astype(numpy.int64) * minor_size
+        combined += numpy.frombuffer(minor, dtype=numpy.int32)
+        codes, counts = numpy.unique(combined, return_counts=True)
+        return [(divmod(code, minor_size), n) for code, n in zip(codes.tolist(), counts.tolist())]
+    return sorted(Counter(zip(major, minor)).items())
+
+
+def _combine(major, minor_size, minor):
+    """major * minor_size + minor, element-wise: one code per (major, minor) pair."""
+    if numpy is not None:
+        combined = numpy.frombuffer(major, dtype=numpy.int32) * minor_size + numpy.frombuffer(minor, dtype=numpy.int32)
+        return array("i", combined.astype(numpy.int32).tobytes())
+    return array("i", [a * minor_size + b for a, b in zip(major, minor)])
@@ -0,0 +1,87 @@
+# tests/test_api.py
+import gzip
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from src.api import ApiError, DatasetStore, serve
+
+
+def book(n, title, price, category):
+    return {"id": f"book-{n}", "type": "book", "title": title, "price": price, "availability": "In stock",
+            "rating": 3, "category": category, "product_url": f"u{n}"}
+
+
+def quote(n, text, author, tags):
+    return {"id": f"quote-{n}", "type": "quote", "text": text, "author": author, "tags": tags, "page_url": "p",
+            "author_id": "author-1" if author == "Mark Twain" else None}
+
+
+ITEMS = [book(n, f"Book {n % 7}", 10.0 + n % 5, "Travel" if n % 2 else "Poetry") for n in range(30)] + [
+    quote(1, "Work is love made visible.", "Kahlil Gibran", ["work", "love"]),
+    quote(2, "The secret of getting ahead is getting started.", "Mark Twain", ["work"]),
+]
+
+
+@pytest.fixture
+def store():
+    return DatasetStore(ITEMS, {"author-1": {"id": "author-1", "url": "a", "name": "Mark Twain"}}, version="v1")
+
+
+def pages(store, **query):
+    """Every page of a query, following the next cursors."""
+    result, after = [], None
+    while True:
+        page = store.query(after=after, limit=7, **query)
+        result.append([item["id"] for item in page["items"]])
+        after = page["next"]
+        if after is None:
+            return result
+
+
+@pytest.mark.parametrize("sort", [None, "title", "price"])
+@pytest.mark.parametrize("direction", ["asc", "desc"])
+def test_keyset_pages_cover_the_sorted_result(store, sort, direction):
+    query = {"sort": sort, "direction": direction, "category": "Travel"}
+    expected = [i for i in ITEMS if i.get("category") == "Travel"]
+    if sort is not None:
+        expected.sort(key=lambda i: (i[sort], i["id"]), reverse=direction == "desc")
+    elif direction == "desc":
+        expected.reverse()
+
+    result = pages(store, **query)
+
+    assert [len(p) for p in result] == [7, 7, 1]
+    assert sum(result, []) == [i["id"] for i in expected]
+    assert store.query(**query)["total"] == 15
+
+
+def test_filters_and_details(store):
+    assert [i["id"] for i in store.query(q="work", item_type="quote")["items"]] == ["quote-1"]
+    assert store.query(tag="work", sort="author")["total"] == 2
+    assert store.item("quote-2")["author_details"]["name"] == "Mark Twain"
+    with pytest.raises(ApiError):
+        store.item("missing")
+    with pytest.raises(ApiError):
+        store.query(after="not a cursor")
+
+
+def test_http_etag_and_gzip(store):
+    server = serve(store, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/api/items?limit=100&sort=price"
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, headers={"Accept-Encoding": "gzip"})) as resp:
+            assert resp.headers["Content-Encoding"] == "gzip"
+            assert json.loads(gzip.decompress(resp.read()))["total"] == len(ITEMS)
+            etag = resp.headers["ETag"]
+
+        with pytest.raises(urllib.error.HTTPError) as not_modified:
+            urllib.request.urlopen(urllib.request.Request(url, headers={"If-None-Match": etag}))
+        assert not_modified.value.code == 304
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,65 @@
+# tests/test_authors.py
+import asyncio
+import threading
+import time
+
+from src.authors import AuthorService
+from src.data_types import AuthorDetails
+
+URL = "https://quotes.toscrape.com/author/Jane-Austen"
+
+
+def test_concurrent_lookups_share_one_fetch():
+    service = AuthorService()
+    release = threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        release.wait(5)
+        return AuthorDetails(id="author-1", url=URL, name="Jane Austen")
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(service.get(URL, fetch))) for _ in range(5)]
+    for t in threads:
+        t.start()
+    time.sleep(0.1)
+    release.set()
+    for t in threads:
+        t.join()
+
+    async def fetch_async():
+        raise AssertionError("already cached")
+
+    assert asyncio.run(service.get_async(URL, fetch_async)).name == "Jane Austen"
+    assert len(calls) == 1
+    assert len({id(r) for r in results}) == 1
+    assert service.stats() == {"hits": 1, "misses": 1, "coalesced": 4, "expired": 0}
+
+
+def test_details_persist_until_ttl(tmp_path):
+    path = tmp_path / "authors.sqlite3"
+    first = AuthorService(path)
+    first.get(URL, lambda: AuthorDetails(id="author-1", url=URL, name="Jane Austen"))
+    first.get(URL + "x", lambda: AuthorDetails(id="author-2", url=URL + "x"))  # fetch failed: not persisted
+    first.close()
+
+    second = AuthorService(path)
+    assert second.cached(URL).name == "Jane Austen"
+    assert second.cached(URL + "x") is None
+    second.close()
+
+    expired = AuthorService(path, ttl=0)
+    time.sleep(0.01)
+    assert expired.cached(URL) is None
+    assert expired.stats()["expired"] == 1
+
+
+def test_peek_is_not_a_hit(tmp_path):
+    service = AuthorService(tmp_path / "authors.sqlite3")
+    service.get(URL, lambda: AuthorDetails(id="author-1", url=URL, name="Jane Austen"))
+    assert service.peek(URL).name == "Jane Austen" and service.peek(URL + "x") is None
+    assert service.stats()["hits"] == 0
+    assert service.cached(URL).name == "Jane Austen"
+    assert service.stats()["hits"] == 1
+    service.close()
@@ -0,0 +1,34 @@
+# tests/test_cache.py
+from src.cache import HttpCache
+
+
+def test_cache_round_trip_and_validators(tmp_path):
+    cache = HttpCache(tmp_path / "http.sqlite3")
+    url = "https://books.toscrape.com/index.html"
+
+    assert cache.lookup(url) is None
+    cache.store(url, "<html>v1</html>", etag='"abc"', last_modified="Mon, 01 Jan 2024 00:00:00 GMT")
+
+    cached = cache.lookup(url)
+    assert cached.body == "<html>v1</html>"
+    assert cached.conditional_headers() == {
+        "If-None-Match": '"abc"',
+        "If-Modified-Since": "Mon, 01 Jan 2024 00:00:00 GMT",
+    }
+    assert cache.revalidated(cached) == "<html>v1</html>"
+    assert cache.stats()["revalidated"] == 1
+    cache.close()
+
+
+def test_offline_cache_replays_across_runs(tmp_path):
+    path = tmp_path / "http.sqlite3"
+    cache = HttpCache(path)
+    cache.store("https://quotes.toscrape.com/", "<html>quotes</html>")
+    cache.close()
+
+    offline = HttpCache(path, offline=True)
+    assert offline.replay("https://quotes.toscrape.com/") == "<html>quotes</html>"
+    assert offline.replay("https://quotes.toscrape.com/page/2/") is None
+    assert offline.stats()["offline_hits"] == 1
+    assert offline.stats()["offline_misses"] == 1
+    offline.close()
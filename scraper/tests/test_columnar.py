@@ -0,0 +1,31 @@
+# tests/test_columnar.py
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+
+from src.columnar import export_columnar, read_columns  # noqa: E402
+from src.data_types import AuthorDetails, BookItem, QuoteItem  # noqa: E402
+from src.sink import JsonlSink, write_authors  # noqa: E402
+
+
+@pytest.mark.parametrize("fmt", ["parquet", "arrow"])
+def test_export_round_trips_with_dictionary_columns(tmp_path, fmt):
+    items_path = tmp_path / "items.jsonl"
+    with JsonlSink(items_path) as sink:
+        for n in range(5):
+            sink.write(BookItem(id=f"book-{n}", type="book", title=f"B{n}", price=10.0 + n, availability="In stock",
+                                rating=n % 2 + 1, category=["Poetry", "Travel"][n % 2], product_url=f"u{n}"))
+        sink.write(QuoteItem(id="quote-1", type="quote", text="Q", author="Jane Austen", tags=["books", "humor"],
+                             page_url="https://quotes.toscrape.com/", author_id="author-1"))
+    authors_path = tmp_path / "authors.jsonl"
+    write_authors(authors_path, [AuthorDetails(id="author-1", url="a", name="Jane Austen")])
+
+    paths = export_columnar(items_path, tmp_path / "columnar", authors_path, fmt)
+
+    books = read_columns(paths["books"], ["category", "price"])
+    assert books.column_names == ["category", "price"]
+    assert pa.types.is_dictionary(books.schema.field("category").type)
+    assert books.column("category").to_pylist() == ["Poetry", "Travel", "Poetry", "Travel", "Poetry"]
+    assert sum(books.column("price").to_pylist()) == 60.0
+    assert read_columns(paths["quote_tags"], ["tag"]).column("tag").to_pylist() == ["books", "humor"]
+    assert read_columns(paths["authors"]).num_rows == 1
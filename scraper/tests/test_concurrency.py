@@ -0,0 +1,67 @@
+# tests/test_concurrency.py
+import asyncio
+import random
+
+from src import concurrency
+from src.concurrency import AimdLimit
+
+
+def window(limit, seconds=0.05, errors=0, saturated=True):
+    limit._saturated = saturated  # whether the window used every slot
+    for i in range(limit.window):
+        limit.record(seconds, "error" if i < errors else None)
+
+
+def test_aimd_grows_when_healthy_and_backs_off_on_overload():
+    limit = AimdLimit("example.com", initial=4, max_limit=8, window=10)
+
+    for _ in range(3):
+        window(limit)
+    window(limit, saturated=False)  # demand below the limit: no reason to grow
+    assert limit.current == 7
+
+    window(limit, errors=1)  # scattered errors are tolerated
+    assert limit.current == 8
+    window(limit, errors=3)
+    assert limit.current == 4
+
+    for _ in range(limit.current):  # a round of requests after that cut
+        limit.record(0.05)
+    limit.record(0.05, "throttled")
+    limit.record(0.05, "throttled")  # same round of requests: no second cut
+    assert limit.current == 2
+
+    # Latency well above the baseline shrinks the limit even without errors.
+    window(limit, seconds=0.5)
+    assert limit.current == 1
+    reasons = [e["reason"] for e in concurrency.history() if e["host"] == "example.com"]
+    assert reasons == ["healthy"] * 4 + ["overload"] * 2 + ["latency"]
+
+
+def test_aimd_grows_through_ordinary_long_tail_latency():
+    limit = AimdLimit("longtail.example", initial=10, max_limit=100)
+    rng = random.Random(1)
+
+    # Steady lognormal latency, no errors: p95 is routinely over twice p50, which is not queueing.
+    for _ in range(100):
+        limit._saturated = True
+        for _ in range(limit.window):
+            limit.record(rng.lognormvariate(-3, 0.6))
+    assert limit.current > 40
+
+
+def test_limit_bounds_requests_in_flight():
+    limit = AimdLimit("bounded.example", initial=2)
+    peak = 0
+
+    async def request():
+        nonlocal peak
+        async with limit:
+            peak = max(peak, limit.in_flight)
+            await asyncio.sleep(0.01)
+
+    async def run():
+        await asyncio.gather(*(request() for _ in range(10)))
+
+    asyncio.run(run())
+    assert peak == 2 and limit.in_flight == 0
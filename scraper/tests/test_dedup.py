@@ -0,0 +1,52 @@
+# tests/test_dedup.py
+from pathlib import Path
+
+from src.dedup import Deduplicator, book_fingerprint, canonical_url
+
+FIXTURES = Path(__file__).parent / "fixtures"
+BOOK = "https://books.toscrape.com/catalogue/sharp-objects_997/index.html"
+
+
+def test_canonical_url_spellings_of_one_page():
+    for url in [
+        BOOK,
+        "HTTPS://Books.ToScrape.com:443/catalogue/sharp-objects_997/index.html#reviews",
+        "https://books.toscrape.com/catalogue/category/books/mystery_3/../../../sharp-objects_997/index.html",
+        "https://books.toscrape.com/catalogue//sharp-objects_997/",
+        "https://books.toscrape.com/catalogue/sharp-objects_997/index.html?utm_source=feed",
+        "https://books.toscrape.com/catalogue/sharp%2Dobjects_997/./index.html",
+    ]:
+        assert canonical_url(url) == BOOK, url
+
+    assert canonical_url("http://a.example:8080/p?b=2&a=1") == "http://a.example:8080/p?a=1&b=2"
+    assert canonical_url("https://quotes.toscrape.com/page/2/", index_page=None) == "https://quotes.toscrape.com/page/2/"
+
+
+def test_fingerprint_and_aliases():
+    html = (FIXTURES / "sample_book_page.html").read_text(encoding="utf-8")
+    assert book_fingerprint(html) == "upc:abeafe151a587d3b"
+    no_upc = '<div class="col-sm-6 product_main"><h1>Sharp Objects</h1> <p class="price_color">£47.82</p></div>'
+    assert book_fingerprint(no_upc).startswith("product_main:")
+    assert book_fingerprint(no_upc.replace("> <", "><")) == book_fingerprint(no_upc)
+    assert book_fingerprint("<html></html>") is None
+
+    other = "https://books.toscrape.com/catalogue/sharp-objects_998/index.html"
+    dedup = Deduplicator()
+    assert dedup.canonical(BOOK, "upc:1") == BOOK
+    assert dedup.canonical(BOOK, "upc:1") == BOOK  # the same URL again is not its own alias
+    assert dedup.canonical(other, "upc:1") == BOOK
+    assert dedup.canonical("https://books.toscrape.com/x", None) == "https://books.toscrape.com/x"
+    assert dedup.aliases() == {other: BOOK}
+    assert dedup.superseded() == set()
+    assert dedup.stats() == {"fingerprints": 1, "aliases": 1, "superseded": 0}
+
+
+def test_the_smallest_url_is_kept_whichever_is_fetched_first():
+    other = "https://books.toscrape.com/catalogue/sharp-objects_998/index.html"
+    dedup = Deduplicator()
+    assert dedup.canonical(other, "upc:1") == other  # parsed: nothing smaller seen yet
+    assert dedup.canonical(BOOK, "upc:1") == BOOK
+    assert dedup.canonical(other, "upc:1") == BOOK
+    # Same outcome as fetching BOOK first; the page parsed too early is left for the output to drop.
+    assert dedup.aliases() == {other: BOOK}
+    assert dedup.superseded() == {other}
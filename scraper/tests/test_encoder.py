@@ -0,0 +1,38 @@
+# tests/test_encoder.py
+import gzip
+import json
+from dataclasses import asdict
+
+from src.data_types import AuthorDetails, BookItem, QuoteItem, SummaryData, TagCount
+from src.encoder import _stdlib_encode, encode, encode_lines
+from src.sink import JsonlSink, write_dataset_json
+
+RECORDS = [
+    BookItem(id="book-1", type="book", title="Noah’s Ark", price=10.97, availability="In stock (3 available)",
+             rating=4, category="Travel", product_url="https://books.toscrape.com/a"),
+    QuoteItem(id="quote-1", type="quote", text="“Be yourself.” </script>", author="Oscar Wilde",
+              tags=["honesty"], page_url="https://quotes.toscrape.com/", author_id="author-1"),
+    AuthorDetails(id="author-1", url="https://quotes.toscrape.com/author/Oscar-Wilde"),
+    SummaryData(quotes_by_tag=[TagCount(tag="honesty", count=1)]),
+]
+
+
+def test_fast_and_stdlib_encoders_agree():
+    for record in RECORDS:
+        # Whichever encoder is active (orjson if installed), it decodes to what the stdlib path wrote.
+        assert json.loads(encode(record)) == json.loads(_stdlib_encode(record)) == asdict(record)
+    assert encode_lines(RECORDS[:2]).count(b"\n") == 2
+
+
+def test_compressed_dataset(tmp_path):
+    items_path = tmp_path / "items.jsonl"
+    with JsonlSink(items_path) as sink:
+        for record in RECORDS[:2]:
+            sink.write(record)
+
+    written = write_dataset_json(tmp_path / "dataset.json", items_path, sink.summary, compression="gzip")
+
+    assert written.name == "dataset.json.gz"
+    dataset = json.loads(gzip.decompress(written.read_bytes()))
+    assert [item["id"] for item in dataset["items"]] == ["book-1", "quote-1"]
+    assert dataset["meta"]["total_items"] == 2
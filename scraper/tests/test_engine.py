@@ -0,0 +1,89 @@
+# tests/test_engine.py
+import asyncio
+import time
+
+from aiohttp import web
+
+from src.engine import CrawlEngine
+from src.retry import CircuitBreaker, RetryPolicy
+
+
+class NoRateLimit:
+    async def wait(self, url):
+        pass
+
+
+async def start_server(handler):
+    app = web.Application()
+    app.router.add_get("/{tail:.*}", handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    return runner, f"http://127.0.0.1:{port}/"
+
+
+def test_waiting_on_a_busy_host_holds_no_global_slot():
+    async def slow(request):
+        await asyncio.sleep(0.3)
+        return web.Response(text="slow")
+
+    async def fast(request):
+        return web.Response(text="fast")
+
+    async def run():
+        slow_runner, slow_url = await start_server(slow)
+        fast_runner, fast_url = await start_server(fast)
+        try:
+            engine = CrawlEngine(max_per_host=1, max_in_flight=2, adaptive=False, rate_limiter=NoRateLimit())
+            async with engine:
+                slow_tasks = [asyncio.ensure_future(engine.get(f"{slow_url}{n}")) for n in range(3)]
+                await asyncio.sleep(0.05)  # one slow request in flight, two queued for its host
+                started = time.perf_counter()
+                assert await engine.get(fast_url) == "fast"
+                elapsed = time.perf_counter() - started
+                await asyncio.gather(*slow_tasks)
+            return elapsed
+        finally:
+            await slow_runner.cleanup()
+            await fast_runner.cleanup()
+
+    # With the global slot taken before the host slot, the fast host waited for a slow request to finish.
+    assert asyncio.run(run()) < 0.2
+
+
+def test_cancelled_or_undecodable_probe_does_not_wedge_the_circuit():
+    async def slow(request):
+        await asyncio.sleep(1)
+        return web.Response(text="slow")
+
+    async def mislabelled(request):
+        return web.Response(body=b"caf\xe9", content_type="text/html", charset="utf-8")
+
+    async def run():
+        slow_runner, slow_url = await start_server(slow)
+        bad_runner, bad_url = await start_server(mislabelled)
+        policy = RetryPolicy()
+        try:
+            async with CrawlEngine(adaptive=False, rate_limiter=NoRateLimit(), retry_policy=policy) as engine:
+                slow_breaker, bad_breaker = policy.breaker(slow_url), policy.breaker(bad_url)
+                for breaker in (slow_breaker, bad_breaker):
+                    breaker._set(CircuitBreaker.OPEN)  # cooldown over: the next request is the probe
+
+                # A speculative fetch cancelled mid-probe: the probe is handed back, not lost.
+                probe = asyncio.ensure_future(engine.get(slow_url))
+                await asyncio.sleep(0.05)
+                assert slow_breaker.state == CircuitBreaker.HALF_OPEN
+                probe.cancel()
+                await asyncio.gather(probe, return_exceptions=True)
+                assert slow_breaker.state == CircuitBreaker.OPEN and slow_breaker.allow()
+
+                # A body that does not decode as its declared charset still counts as an answer.
+                assert await engine.get(bad_url) == "caf\ufffd"
+                assert bad_breaker.state == CircuitBreaker.CLOSED
+        finally:
+            await slow_runner.cleanup()
+            await bad_runner.cleanup()
+
+    asyncio.run(run())
@@ -0,0 +1,172 @@
+# tests/test_frontier.py
+import sqlite3
+
+import pytest
+
+from src.frontier import CrawlFrontier
+
+
+def test_pop_orders_by_priority_then_insertion():
+    frontier = CrawlFrontier()
+    frontier.add("https://a/1")
+    frontier.add("https://a/2", priority=5, data="urgent")
+    frontier.add("https://a/3")
+    assert not frontier.add("https://a/1")
+
+    assert frontier.pop() == ("https://a/2", "urgent")
+    assert frontier.pop() == ("https://a/1", None)
+    assert frontier.pop() == ("https://a/3", None)
+    assert frontier.pop() is None
+
+
+def test_runs_are_scoped(tmp_path):
+    path = tmp_path / "frontier.sqlite3"
+    first = CrawlFrontier(path)
+    assert first.claim("https://a/1")
+    assert not first.claim("https://a/1")
+    first.add("https://a/1")
+    first.close()
+
+    second = CrawlFrontier(path)
+    assert second.claim("https://a/1")
+    assert second.pop() is None
+
+
+def test_resume_keeps_checkpointed_work_only(tmp_path):
+    path = tmp_path / "frontier.sqlite3"
+    first = CrawlFrontier(path)
+    for n in range(3):
+        first.add(f"https://a/{n}")
+    first.pop()
+    first.complete("https://a/0")
+    first.checkpoint()
+    first.pop()
+    first.complete("https://a/1")  # never checkpointed: the process "dies" here
+    first.close()
+
+    resumed = CrawlFrontier(path, resume=True)
+    assert resumed.resumed and resumed.run_id == first.run_id
+    assert resumed.is_done("https://a/0")
+    assert not resumed.is_done("https://a/1")
+    assert [resumed.pop()[0], resumed.pop()[0]] == ["https://a/1", "https://a/2"]
+
+    resumed.finish()
+    resumed.close()
+    assert not CrawlFrontier(path, resume=True).resumed
+
+
+def test_shared_frontier_splits_work_between_workers(tmp_path):
+    import asyncio
+    from src.frontier import SharedFrontier
+
+    path = tmp_path / "frontier.sqlite3"
+    now = [0.0]
+    a = SharedFrontier(path, "run", worker=0, workers=2, lease_seconds=60, clock=lambda: now[0])
+    b = SharedFrontier(path, "run", worker=1, workers=2, lease_seconds=60, clock=lambda: now[0])
+    assert [a.owns(c) for c in "abcd"] == [not b.owns(c) for c in "abcd"] == [False, False, False, True]
+
+    # Each URL is fetched by one worker until its lease runs out.
+    assert a.claim("https://a/list") and not b.claim("https://a/list")
+    now[0] = 61
+    assert b.claim("https://a/list")
+
+    # Queued URLs: own partition first, then the other worker's.
+    mine = next(c for c in "abcd" if a.owns(c))
+    theirs = next(c for c in "abcd" if b.owns(c))
+    a.add("https://a/1", data=theirs)
+    a.add("https://a/2", data=mine)
+    assert not b.add("https://a/2", data=mine)
+    assert a.pop() == ("https://a/2", mine)
+    assert a.claim("https://a/2")  # the fetch that follows the pop
+    assert a.pop() == ("https://a/1", theirs)
+    assert a.pop() is None and b.pop() is None
+
+    a.publish("categories", {"Travel": "https://a/travel"})
+    assert asyncio.run(b.published("categories")) == {"Travel": "https://a/travel"}
+
+    a.complete("https://a/1")
+    a.complete("https://a/2")
+    assert not a.finish()  # b is still crawling
+    assert b.finish()  # the last worker merges
+    a.close()
+    b.close()
+
+
+def test_shared_frontier_hands_over_abandoned_pages_and_fingerprints(tmp_path):
+    import asyncio
+    from src.dedup import Deduplicator
+    from src.frontier import SharedFrontier
+
+    path = tmp_path / "frontier.sqlite3"
+    now = [0.0]
+    a = SharedFrontier(path, "run", worker=0, workers=2, lease_seconds=60, clock=lambda: now[0])
+    b = SharedFrontier(path, "run", worker=1, workers=2, lease_seconds=60, clock=lambda: now[0])
+
+    # a claimed the home page and stopped: b waits out the lease instead of returning empty-handed.
+    assert a.claim("https://a/") and not b.claim("https://a/")
+    assert not b.lease_expired("https://a/") and not a.lease_expired("https://a/")
+    now[0] = 61
+    assert asyncio.run(b.published("categories", "https://a/", poll_seconds=0)) is None
+    assert b.lease_expired("https://a/") and b.claim("https://a/")
+
+    # The same product met by two workers is kept once.
+    first, second = Deduplicator(), Deduplicator()
+    first.share(a)
+    second.share(b)
+    assert first.canonical("https://a/y", "upc:1") == "https://a/y"
+    assert second.canonical("https://a/x", "upc:1") == "https://a/x"  # smaller: kept instead
+    assert first.canonical("https://a/z", "upc:1") == "https://a/x"
+    assert first.aliases() == second.aliases() == {"https://a/y": "https://a/x", "https://a/z": "https://a/x"}
+    assert second.superseded() == {"https://a/y"}
+    assert second.stats() == {"fingerprints": 1, "aliases": 2, "superseded": 1}
+
+    assert not a.finish() and b.finish()
+    a.close()
+    b.close()
+    conn = sqlite3.connect(path)
+    assert [conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0] for t in ("fingerprints", "aliases")] == [0, 0]
+    conn.close()
+
+
+def test_plain_resume_skips_distributed_runs(tmp_path):
+    from src.frontier import SharedFrontier
+
+    path = tmp_path / "frontier.sqlite3"
+    plain = CrawlFrontier(path)
+    plain.add("https://a/plain")
+    plain.close()
+    shared = SharedFrontier(path, "dist-run", worker=0, workers=2)
+    shared.add("https://a/shared", data="d")
+    shared.close()
+
+    resumed = CrawlFrontier(path, resume=True)
+    assert resumed.run_id == plain.run_id
+    assert resumed.pop() == ("https://a/plain", None) and resumed.pop() is None
+    resumed.close()
+    with pytest.raises(ValueError):
+        SharedFrontier(path, plain.run_id)  # nor is a plain run joined as a distributed one
+
+
+def test_queue_changes_wait_for_checkpoint_and_failures_are_retried(tmp_path):
+    path = tmp_path / "frontier.sqlite3"
+    first = CrawlFrontier(path)
+    assert first.add_many([("https://a/0", "x"), ("https://a/1", "x"), ("https://a/0", "x")]) == 2
+    assert first.pop() == ("https://a/0", "x")
+    first.fail("https://a/0")
+
+    # Nothing reaches the disk (no commit, no fsync) until the next checkpoint.
+    def states():
+        conn = sqlite3.connect(path)
+        rows = conn.execute("SELECT url, state FROM urls ORDER BY seq").fetchall()
+        conn.close()
+        return rows
+
+    assert states() == []
+    first.checkpoint()
+    assert states() == [("https://a/0", "failed"), ("https://a/1", "pending")]
+    first.close()
+
+    # A failure may have been transient: a resumed run tries it again.
+    resumed = CrawlFrontier(path, resume=True)
+    assert [resumed.pop(), resumed.pop(), resumed.pop()] == [("https://a/0", "x"), ("https://a/1", "x"), None]
+    resumed.close()
@@ -0,0 +1,69 @@
+# tests/test_incremental.py
+from src.data_types import BookItem, FetchedPage
+from src.incremental import Manifest
+from src.sink import JsonlSink
+from src.parser import stable_id
+
+URL = "https://books.toscrape.com/catalogue/a-light-in-the-attic_1000/index.html"
+
+
+def make_parser(calls):
+    def parse(page):
+        calls.append(page.url)
+        title = page.html.strip("<>")
+        return [BookItem(id=stable_id("book", page.url), type="book", title=title, price=1.0,
+                         availability="In stock", rating=3, category="Poetry", product_url=page.url)]
+    return parse
+
+
+def test_stable_ids_are_deterministic():
+    assert stable_id("book", URL) == stable_id("book", URL)
+    assert stable_id("book", URL) != stable_id("book", URL + "?x")
+    assert stable_id("book", URL).startswith("book-")
+
+
+def run(manifest, items_path, pages, calls, **kwargs):
+    """What main does with a manifest: parse or reuse each page, write items.jsonl, then the delta."""
+    items = [item for page in pages for item in manifest.items_for(page, make_parser(calls), **kwargs)]
+    with JsonlSink(items_path) as sink:
+        for item in items:
+            sink.write(item)
+    delta = manifest.delta(items_path)
+    delta = {key: list(values) for key, values in delta.items()}
+    manifest.save()
+    return items, delta
+
+
+def test_manifest_reparses_only_changed_pages(tmp_path):
+    path, items_path = tmp_path / "manifest.json", tmp_path / "items.jsonl"
+    calls = []
+
+    first_pages = [FetchedPage(url=URL, html="<v1>"), FetchedPage(url=URL + "2", html="<gone>")]
+    _, delta = run(Manifest(path, items_path), items_path, first_pages, calls)
+    assert len(delta["added"]) == 2
+    assert "v1" not in path.read_text()  # ids and hashes only, not the items
+
+    calls.clear()
+    items, delta = run(Manifest(path, items_path), items_path, [FetchedPage(url=URL, html="<v1>")], calls)
+    assert calls == []
+    assert items[0].title == "v1"
+    assert delta == {"added": [], "changed": [], "removed": [stable_id("book", URL + "2")]}
+
+    third = Manifest(path, items_path)
+    items, delta = run(third, items_path, [FetchedPage(url=URL, html="<v2>")], calls, depends_on="author changed")
+    assert calls == [URL]
+    assert [d["title"] for d in delta["changed"]] == ["v2"]
+
+
+def test_manifest_records_only_kept_items(tmp_path):
+    path, items_path = tmp_path / "manifest.json", tmp_path / "items.jsonl"
+    calls = []
+
+    def parse_two(page):
+        return make_parser(calls)(page) + make_parser(calls)(FetchedPage(url=page.url + "#b", html=page.html))
+
+    manifest = Manifest(path, items_path)
+    items = manifest.items_for(FetchedPage(url=URL, html="<v1>"), parse_two, keep=lambda items: items[:1])
+    assert [item.id for item in items] == manifest.current[URL]["ids"] == [stable_id("book", URL)]
+    # The page was cut short, so the next run parses it again instead of reusing one item of two.
+    assert manifest.current[URL]["hash"] is None
@@ -0,0 +1,48 @@
+# tests/test_metrics.py
+import io
+import json
+
+from src.metrics import Logger, Registry, configure_logging
+
+
+def test_histogram_and_counter_export():
+    registry = Registry()
+    seconds = registry.histogram("fetch_seconds", "Time per attempt", buckets=(0.1, 1))
+    for value in (0.05, 0.5, 3):
+        seconds.observe(value, source="engine")
+    registry.counter("responses_total").inc(status="200")
+    registry.counter("responses_total").inc(2, status="200")
+    registry.register_collector("robots", lambda: {"allowed": 7, "note": "ignored"})
+
+    snapshot = registry.snapshot()
+    assert snapshot["responses_total"]["samples"] == [{"name": "responses_total", "labels": {"status": "200"}, "value": 3}]
+    assert snapshot["robots_allowed"]["samples"][0]["value"] == 7
+    assert "robots_note" not in snapshot
+
+    text = registry.prometheus_text()
+    assert '# TYPE fetch_seconds histogram' in text
+    assert 'fetch_seconds_bucket{source="engine",le="0.1"} 1' in text
+    assert 'fetch_seconds_bucket{source="engine",le="1"} 2' in text
+    assert 'fetch_seconds_bucket{source="engine",le="+Inf"} 3' in text
+    assert 'fetch_seconds_count{source="engine"} 3' in text
+
+
+def test_levels_and_debug_sampling():
+    out = io.StringIO()
+    log = Logger("test")
+    try:
+        configure_logging("DEBUG", debug_sample=0.25, fmt="json", stream=out)
+        for n in range(8):
+            log.debug("fetched", n=n)
+        log.warning("slow")
+
+        lines = [json.loads(line) for line in out.getvalue().splitlines()]
+        assert [line.get("n") for line in lines] == [0, 4, None]
+        assert lines[-1]["level"] == "WARNING"
+
+        configure_logging("WARNING")
+        log("hidden")
+        log.debug("hidden")
+        assert len(out.getvalue().splitlines()) == 3
+    finally:
+        configure_logging("INFO", debug_sample=1.0, fmt="text", stream="stdout")
@@ -35,3 +35,78 @@ def test_quotes_next_page_url():
 
     last_page_url = get_quotes_next_page_url(html_no_next, current_url)
     assert last_page_url is None
+
+def test_next_page_url_accepts_parsed_tree():
+    from bs4 import BeautifulSoup
+    html = '<ul class="pager"><li class="next"><a href="page-2.html">next</a></li></ul>'
+    soup = BeautifulSoup(html, "lxml")
+    current_url = "https://books.toscrape.com/catalogue/category/books/crime_51/index.html"
+
+    assert get_books_category_next_page_url(soup, current_url) == get_books_category_next_page_url(html, current_url)
+
+def test_page_count_and_numbered_urls():
+    from src.pagination import books_category_page_url, get_books_category_page_count, quotes_page_url
+    html = """
+    <ul class="pager">
+        <li class="current">
+            Page 1 of 8
+        </li>
+        <li class="next"><a href="page-2.html">next</a></li>
+    </ul>
+    """
+    category_url = "https://books.toscrape.com/catalogue/category/books/mystery_3/index.html"
+
+    assert get_books_category_page_count(html) == 8
+    assert get_books_category_page_count("<ul class='pager'></ul>") is None
+    assert get_books_category_next_page_url(html, category_url) == books_category_page_url(category_url, 2)
+    assert books_category_page_url(category_url, 1) == category_url
+    assert quotes_page_url("https://quotes.toscrape.com/", 3) == "https://quotes.toscrape.com/page/3/"
+
+
+def test_walk_without_page_count_requests_little_past_the_end():
+    import asyncio
+    from aiohttp import web
+    from src.engine import CrawlEngine
+    from src.fetcher import PAGES_AHEAD, walk_pages
+    from src.pagination import quotes_page_has_items, quotes_page_url
+
+    last_page = 10
+    requested = []
+
+    async def page(request):
+        n = int(request.match_info.get("n", 1))
+        requested.append(n)
+        if n > last_page:
+            return web.Response(text="<div class='col-md-8'>No quotes found!</div>", content_type="text/html")
+        pager = f'<ul class="pager"><li class="next"><a href="/page/{n + 1}/">Next</a></li></ul>' if n < last_page else ""
+        return web.Response(text=f'<div class="quote"><span class="text">{n}</span></div>{pager}',
+                            content_type="text/html")
+
+    class NoRateLimit:
+        async def wait(self, url):
+            pass
+
+    async def run():
+        app = web.Application()
+        app.router.add_get("/", page)
+        app.router.add_get("/page/{n}/", page)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        base = f"http://127.0.0.1:{runner.addresses[0][1]}/"
+        try:
+            async with CrawlEngine(adaptive=False, rate_limiter=NoRateLimit()) as engine:
+                pages = walk_pages(
+                    engine, quotes_page_url(base, 1), get_quotes_next_page_url,
+                    page_url=lambda n: quotes_page_url(base, n), has_items=quotes_page_has_items,
+                )
+                return [p.url async for p in pages]
+        finally:
+            await runner.cleanup()
+
+    urls = asyncio.run(run())
+    assert len(urls) == last_page and urls[-1].endswith(f"/page/{last_page}/")
+    # Every page once, and at most PAGES_AHEAD - 1 guesses past the last one (page 11 at most, here).
+    assert sorted(requested)[:last_page] == list(range(1, last_page + 1))
+    assert last_page <= len(requested) <= last_page + PAGES_AHEAD - 1
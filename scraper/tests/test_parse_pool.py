@@ -0,0 +1,33 @@
+# tests/test_parse_pool.py
+import asyncio
+from pathlib import Path
+
+from src.data_types import FetchedPage
+# Top-level imports, so the author cache seeded below is the one parse_pool's parent side reads.
+from parse_pool import ParsePool
+from parser import cache_author_page, extract_author_urls, parse_book_page, parse_quotes_from_a_page
+
+BOOK_URL = "https://books.toscrape.com/catalogue/the-long-shadow-of-small-ghosts-murder-and-memory-in-an-american-city_848/index.html"
+QUOTES_URL = "https://quotes.toscrape.com/"
+
+
+def test_pool_matches_in_process_parsing():
+    book_html = Path("./fixtures/sample_book_page.html").read_text(encoding="utf-8")
+    quote_html = Path("./fixtures/sample_quote_page.html").read_text(encoding="utf-8")
+    for url in extract_author_urls(quote_html):
+        cache_author_page(url, None)
+
+    async def parse_in_pool(pool):
+        return await asyncio.gather(
+            pool.book_items(BOOK_URL, "Crime", book_html),
+            pool.quote_items(QUOTES_URL, quote_html),
+        )
+
+    with ParsePool(workers=2) as pool:
+        books, quotes = asyncio.run(parse_in_pool(pool))
+        mapped = pool.map_books([FetchedPage(BOOK_URL, book_html)], {BOOK_URL: "Crime"})
+
+    assert books == mapped == [parse_book_page(BOOK_URL, "Crime", book_html)]
+    assert quotes == parse_quotes_from_a_page(QUOTES_URL, quote_html)
+    # Author IDs come from the parent's cache, not from the workers.
+    assert all(q.author_id.startswith("author-") for q in quotes)
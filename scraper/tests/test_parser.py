@@ -2,6 +2,8 @@
 from dataclasses import asdict
 from pathlib import Path
 from src import parse_book_page, parse_quotes_from_a_page
+# The parser modules import html_backend as a top-level sibling, so switch it there.
+from html_backend import get_backend, use_backend
 
 
 def test_parse_books_page():
@@ -41,7 +43,7 @@ def test_parse_quotes_from_a_page():
 
     for q in quotes_dicts:
       q.pop("id", None)
-      q.pop("author_details", None)
+      q.pop("author_id", None)
 
     true_quotes = [
       {
@@ -117,4 +119,38 @@ def test_parse_quotes_from_a_page():
     ]
 
     for parsed, true in zip(quotes_dicts, true_quotes):
-      assert parsed == true, f"Mismatch in quote: {parsed['text']}"
\ No newline at end of file
+      assert parsed == true, f"Mismatch in quote: {parsed['text']}"
+
+def test_quote_author_ids_need_no_author_lookup(monkeypatch):
+    from src import parser
+
+    def no_lookups():
+        raise AssertionError("parsing quotes must not look authors up")
+
+    monkeypatch.setattr(parser, "get_author_service", no_lookups)
+    html = Path("./fixtures/sample_quote_page.html").read_text(encoding="utf-8")
+    quotes = parse_quotes_from_a_page("https://quotes.toscrape.com/", html)
+
+    einstein = parser.stable_id("author", "https://quotes.toscrape.com/author/Albert-Einstein")
+    assert quotes[0].author_id == einstein == parser.parse_author_page(
+        "https://quotes.toscrape.com/author/Albert-Einstein", None).id
+
+def test_backends_produce_identical_items():
+  book_html = Path("./fixtures/sample_book_page.html").read_text(encoding="utf-8")
+  quote_html = Path("./fixtures/sample_quote_page.html").read_text(encoding="utf-8")
+  book_url = "https://books.toscrape.com/catalogue/the-long-shadow-of-small-ghosts-murder-and-memory-in-an-american-city_848/index.html"
+
+  results = {}
+  previous = get_backend().name
+  try:
+    for name in ("bs4", "lxml"):
+      use_backend(name)
+      results[name] = (
+        asdict(parse_book_page(url=book_url, category=None, html=book_html)),
+        [asdict(q) for q in parse_quotes_from_a_page("https://quotes.toscrape.com/", quote_html)],
+      )
+  finally:
+    use_backend(previous)
+
+  assert results["lxml"] == results["bs4"]
+  assert len(results["lxml"][1]) == 10
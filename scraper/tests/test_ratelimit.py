@@ -0,0 +1,65 @@
+# tests/test_ratelimit.py
+import urllib.robotparser
+
+from src import robots
+from src.ratelimit import DomainRateLimiter, TokenBucket
+from src.robots import RobotsPolicy, rate_from_parser
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_token_bucket_spaces_reservations():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2.0, capacity=1, clock=clock)
+
+    # The first request goes straight away, the next ones queue up 1/rate apart.
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == 0.5
+    assert bucket.reserve() == 1.0
+
+    # Once the backlog has drained the bucket refills up to its capacity only.
+    clock.now = 10.0
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == 0.5
+
+
+def test_rate_from_robots_uses_the_stricter_directive():
+    rp = urllib.robotparser.RobotFileParser()
+    rp.parse([
+        "User-agent: *",
+        "Crawl-delay: 2",
+        "Request-rate: 3/1",
+    ])
+    assert rate_from_parser(rp) == 0.5
+
+    rp = urllib.robotparser.RobotFileParser()
+    rp.parse(["User-agent: *", "Disallow:"])
+    assert rate_from_parser(rp) is None
+
+
+def test_domain_bucket_follows_robots_refreshes(monkeypatch):
+    robots_txt = ["User-agent: *", "Crawl-delay: 2"]
+    monkeypatch.setattr(robots, "read_robots", lambda rp: rp.parse(robots_txt))
+    clock = FakeClock()
+    policy = RobotsPolicy(ttl=60, clock=clock)
+    limiter = DomainRateLimiter(default_rate=10.0, robots=policy)
+
+    bucket = limiter.bucket_for("https://a.example/1")
+    assert bucket.rate == 0.5
+
+    # Once the entry expires robots.txt is read again, and the same bucket slows down or speeds up with it.
+    robots_txt = ["User-agent: *", "Crawl-delay: 4"]
+    clock.now = 61.0
+    assert policy.allowed("https://a.example/2")
+    assert limiter.bucket_for("https://a.example/3") is bucket and bucket.rate == 0.25
+
+    robots_txt = ["User-agent: *", "Disallow:"]
+    clock.now = 122.0
+    policy.allowed("https://a.example/4")
+    assert bucket.rate == 10.0
@@ -0,0 +1,61 @@
+# tests/test_retry.py
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+from src.retry import CircuitBreaker, RetryBudget, RetryPolicy, classify, parse_retry_after
+
+URL = "https://books.toscrape.com/catalogue/page-2.html"
+
+
+def test_classify_and_retry_after():
+    assert [classify(s) for s in (200, 304, 404, 410, 408, 429, 500, 503)] == (
+        ["ok", "ok", "fatal", "fatal", "retry", "retry", "retry", "retry"]
+    )
+    now = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    assert parse_retry_after("7") == 7.0
+    assert parse_retry_after(format_datetime(now + timedelta(seconds=30), usegmt=True), now) == 30.0
+    assert parse_retry_after("soon") is None and parse_retry_after(None) is None
+
+
+def test_attempt_decisions():
+    policy = RetryPolicy(attempts=3, base=0.5, cap=4.0, max_retry_after=60)
+
+    assert policy.start(URL).failed(404) is None  # never retried
+
+    attempt = policy.start(URL)
+    assert attempt.failed(503, retry_after="2") == 2.0
+    delay = attempt.failed(error=TimeoutError())
+    assert 0.5 <= delay <= 4.0  # decorrelated jitter: base up to 3x the previous delay, capped
+    assert attempt.failed(500) is None  # out of attempts
+
+    assert policy.start(URL).failed(429, retry_after="600") is None  # longer than max_retry_after
+
+
+def test_budget_limits_retries():
+    budget = RetryBudget(ratio=0.5, floor=1)
+    for _ in range(4):
+        budget.request()
+    assert [budget.spend() for _ in range(4)] == [True, True, True, False]
+
+
+def test_circuit_breaker_opens_probes_and_closes():
+    now = [0.0]
+    breaker = CircuitBreaker("books.toscrape.com", failure_rate=0.5, window=10, min_calls=4, cooldown=10,
+                             clock=lambda: now[0])
+    for failed in [False, True, False, True, False, False, True]:  # flaky, but mostly working
+        breaker.failure() if failed else breaker.success()
+    assert breaker.allow()
+    for _ in range(3):
+        breaker.failure()
+    assert not breaker.allow()  # 6 of the last 10 failed
+
+    now[0] = 10
+    assert breaker.allow()  # the probe
+    assert not breaker.allow()  # only one while half-open
+    breaker.failure()  # probe failed: open again, for twice as long
+    now[0] = 25
+    assert not breaker.allow()
+    now[0] = 30
+    assert breaker.allow()
+    breaker.success()
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.allow()
@@ -0,0 +1,63 @@
+# tests/test_robots.py
+import threading
+
+from src import robots
+from src.robots import RobotsPolicy
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_policy_reads_each_domain_once_per_ttl(monkeypatch):
+    reads = []
+
+    def fake_read(rp):
+        reads.append(rp.url)
+        rp.parse(["User-agent: *", "Disallow: /private"])
+
+    monkeypatch.setattr(robots, "read_robots", fake_read)
+    clock = FakeClock()
+    policy = RobotsPolicy(ttl=60, clock=clock)
+
+    assert policy.allowed("https://a.test/page")
+    assert not policy.allowed("https://a.test/private/x")
+    assert policy.allowed("https://a.test/page")
+    assert policy.cached_decision("https://b.test/page") is None
+    assert reads == ["https://a.test/robots.txt"]
+
+    clock.now = 61
+    assert policy.allowed("https://a.test/page")
+    assert reads == ["https://a.test/robots.txt"] * 2
+
+    stats = policy.stats()
+    assert (stats["allowed"], stats["blocked"], stats["decision_hits"], stats["fetches"]) == (3, 1, 1, 2)
+
+
+def test_slow_domain_does_not_block_others(monkeypatch):
+    slow_started, release = threading.Event(), threading.Event()
+
+    def fake_read(rp):
+        if "slow" in rp.url:
+            slow_started.set()
+            release.wait(5)
+        rp.parse(["User-agent: *", "Disallow:"])
+
+    monkeypatch.setattr(robots, "read_robots", fake_read)
+    policy = RobotsPolicy()
+    results = []
+    slow = [threading.Thread(target=lambda: results.append(policy.allowed("https://slow.test/x"))) for _ in range(3)]
+    for t in slow:
+        t.start()
+    slow_started.wait(5)
+
+    assert policy.allowed("https://fast.test/x")  # would deadlock behind a global lock
+    release.set()
+    for t in slow:
+        t.join()
+    assert results == [True] * 3
+    assert policy.stats()["fetches"] == 2
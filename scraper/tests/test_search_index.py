@@ -0,0 +1,35 @@
+# tests/test_search_index.py
+from src.data_types import BookItem, QuoteItem
+from src.search_index import SearchIndex, write_search_index
+from src.sink import JsonlSink
+
+ITEMS = [
+    BookItem(id="book-1", type="book", title="Harry Potter and the Sorcerer's Stone", price=10.0,
+             availability="In stock", rating=5, category="Fantasy", product_url="u1"),
+    BookItem(id="book-2", type="book", title="The Harvest", price=12.0,
+             availability="In stock", rating=3, category="Poetry", product_url="u2"),
+    QuoteItem(id="quote-1", type="quote", text="The harder you work, the luckier you get.", author="Mark Twain",
+              tags=["work", "luck"], page_url="p"),
+    QuoteItem(id="quote-2", type="quote", text="Work is love made visible.", author="Kahlil Gibran",
+              tags=["work", "love"], page_url="p"),
+]
+
+
+def test_search_index_round_trip(tmp_path):
+    items_path = tmp_path / "items.jsonl"
+    with JsonlSink(items_path) as sink:
+        for item in ITEMS:
+            sink.write(item)
+
+    index = SearchIndex.load(write_search_index(items_path, tmp_path / "search_index.json"))
+
+    assert index.count == 4
+    assert list(index.query("the")) == [0, 1, 2]
+    assert list(index.query("harr")) == [0]  # the last token matches as a prefix
+    assert list(index.query("har")) == [0, 1, 2]
+    assert list(index.query("you work")) == [2]
+    assert list(index.query(tag="work")) == [2, 3]
+    assert list(index.query("work", tag="love")) == [3]
+    assert list(index.query(category="Poetry")) == [1]
+    assert list(index.query(author="Mark Twain", tag="love")) == []
+    assert index.query("  ") is None and index.query() is None
@@ -0,0 +1,111 @@
+# tests/test_sink.py
+import json
+
+import pytest
+
+from src.data_types import AuthorDetails, BookItem, QuoteItem
+from src.sink import JsonlSink, merge_items, write_authors, write_dataset_json
+
+ITEMS = [
+    BookItem(id="book-1", type="book", title="A", price=1.5, availability="In stock",
+             rating=3, category="Poetry", product_url="https://books.toscrape.com/a"),
+    BookItem(id="book-2", type="book", title="B", price=2.5, availability="In stock",
+             rating=3, category="Travel", product_url="https://books.toscrape.com/b"),
+    QuoteItem(id="quote-1", type="quote", text="Q", author="Jane Austen",
+              tags=["books", "humor"], page_url="https://quotes.toscrape.com/"),
+]
+
+
+def test_sink_streams_items_and_summary(tmp_path):
+    items_path = tmp_path / "items.jsonl"
+    items_path.write_text("previous run\n", encoding="utf-8")
+
+    with JsonlSink(items_path, checkpoint_every=2) as sink:
+        for item in ITEMS:
+            sink.write(item)
+        # The previous file stays in place until the run completes.
+        assert items_path.read_text(encoding="utf-8") == "previous run\n"
+
+    lines = items_path.read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line)["id"] for line in lines] == ["book-1", "book-2", "quote-1"]
+
+    dataset_path = tmp_path / "dataset.json"
+    write_dataset_json(dataset_path, items_path, sink.summary)
+    dataset = json.loads(dataset_path.read_text(encoding="utf-8"))
+    assert dataset["meta"]["total_items"] == 3
+    assert dataset["filters"] == {"categories": ["Poetry", "Travel"], "tags": ["books", "humor"]}
+    assert [item["id"] for item in dataset["items"]] == ["book-1", "book-2", "quote-1"]
+    assert dataset["summary"]["books_by_rating"] == [{"rating": 3, "count": 2}]
+    assert dataset["summary"]["quotes_by_author"] == [{"author": "Jane Austen", "count": 1}]
+
+
+def test_sink_keeps_partial_output_on_failure(tmp_path):
+    items_path = tmp_path / "items.jsonl"
+
+    with pytest.raises(RuntimeError):
+        with JsonlSink(items_path) as sink:
+            sink.write(ITEMS[0])
+            raise RuntimeError("crawl died")
+
+    assert not items_path.exists()
+    assert len(sink.part_path.read_text(encoding="utf-8").splitlines()) == 1
+
+
+def test_sink_resumes_part_file(tmp_path):
+    items_path = tmp_path / "items.jsonl"
+    with pytest.raises(RuntimeError):
+        with JsonlSink(items_path) as sink:
+            sink.write(ITEMS[0])
+            raise RuntimeError("crawl died")
+    with sink.part_path.open("a", encoding="utf-8") as f:
+        f.write('{"id": "book-2", "ty')  # torn write
+
+    checkpoints = []
+    with JsonlSink(items_path, resume=True, on_checkpoint=lambda: checkpoints.append(1)) as sink:
+        for item in ITEMS:
+            sink.write(item)
+
+    lines = items_path.read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line)["id"] for line in lines] == ["book-1", "book-2", "quote-1"]
+    assert sink.summary.total == 3
+    assert checkpoints
+
+
+def test_quotes_reference_one_authors_table(tmp_path):
+    author = AuthorDetails(id="author-1", url="https://quotes.toscrape.com/author/Jane-Austen",
+                           name="Jane Austen", description="A long biography. " * 50)
+    quotes = [
+        QuoteItem(id=f"quote-{n}", type="quote", text=f"Q{n}", author="".join(["Jane ", "Austen"]),
+                  tags=["books"], page_url="https://quotes.toscrape.com/", author_id=author.id)
+        for n in range(3)
+    ]
+    # Repeated values are shared, not copied per item.
+    assert quotes[0].author is quotes[1].author and quotes[0].tags[0] is quotes[2].tags[0]
+
+    items_path = tmp_path / "items.jsonl"
+    with JsonlSink(items_path) as sink:
+        for quote in quotes:
+            sink.write(quote)
+    authors_path = tmp_path / "authors.jsonl"
+    write_authors(authors_path, [author])
+    write_dataset_json(tmp_path / "dataset.json", items_path, sink.summary, authors_path=authors_path)
+
+    assert sink.author_ids == {"author-1"}
+    assert "biography" not in items_path.read_text(encoding="utf-8")
+    dataset = json.loads((tmp_path / "dataset.json").read_text(encoding="utf-8"))
+    assert [a["name"] for a in dataset["authors"]] == ["Jane Austen"]
+    assert {item["author_id"] for item in dataset["items"]} == {"author-1"}
+
+
+def test_merge_drops_superseded_books(tmp_path):
+    items_path = tmp_path / "items.jsonl"
+    with JsonlSink(items_path) as sink:
+        for item in ITEMS:
+            sink.write(item)
+
+    # Filtering a file in place, as a single-process run does when a duplicate was parsed too early.
+    summary = merge_items([items_path], items_path, {"https://books.toscrape.com/b"})
+
+    lines = items_path.read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line)["id"] for line in lines] == ["book-1", "quote-1"]
+    assert summary.total == 2 and summary.filters().categories == ["Poetry"]
@@ -0,0 +1,69 @@
+# tests/test_summary.py
+from dataclasses import asdict
+
+import pytest
+
+from src import summary
+from src.data_types import BookItem, QuoteItem
+
+
+def book(n, category, rating, price):
+    return BookItem(id=f"book-{n}", type="book", title="T", price=price, availability="In stock",
+                    rating=rating, category=category, product_url=f"u{n}")
+
+
+def quote(n, author, tags):
+    return QuoteItem(id=f"quote-{n}", type="quote", text="Q", author=author, tags=tags, page_url="p")
+
+
+ITEMS = [
+    book(1, "Poetry", 3, 12.5), book(2, "Travel", 5, 19.99), book(3, "Poetry", 3, 45.0),
+    quote(1, "Jane Austen", ["love", "books"]), quote(2, "Mark Twain", ["humor"]), quote(3, "Jane Austen", ["love"]),
+]
+
+
+@pytest.mark.parametrize("with_numpy", [True, False])
+def test_summary_aggregates(monkeypatch, with_numpy):
+    if not with_numpy:
+        monkeypatch.setattr(summary, "numpy", None)
+    elif summary.numpy is None:
+        pytest.skip("numpy is not installed")
+
+    builder = summary.SummaryBuilder()
+    builder.add_many(ITEMS)
+    result = asdict(builder.summary())
+
+    assert builder.total == 6
+    assert result["books_by_category"] == [{"category": "Poetry", "count": 2}, {"category": "Travel", "count": 1}]
+    assert result["books_by_rating"] == [{"rating": 3, "count": 2}, {"rating": 5, "count": 1}]
+    assert result["quotes_by_tag"] == [
+        {"tag": "love", "count": 2}, {"tag": "books", "count": 1}, {"tag": "humor", "count": 1},
+    ]
+    assert result["quotes_by_author"] == [{"author": "Jane Austen", "count": 2}, {"author": "Mark Twain", "count": 1}]
+    assert result["price_histogram"] == [
+        {"low": 10.0, "high": 20.0, "count": 2}, {"low": 40.0, "high": 50.0, "count": 1},
+    ]
+    assert result["ratings_by_category"] == [
+        {"category": "Poetry", "counts": [0, 0, 0, 2, 0, 0]}, {"category": "Travel", "counts": [0, 0, 0, 0, 0, 1]},
+    ]
+    assert result["tags_by_author"] == [
+        {"author": "Jane Austen", "tags": [{"tag": "love", "count": 2}, {"tag": "books", "count": 1}]},
+        {"author": "Mark Twain", "tags": [{"tag": "humor", "count": 1}]},
+    ]
+    assert asdict(builder.filters()) == {"categories": ["Poetry", "Travel"], "tags": ["love", "books", "humor"]}
+
+
+@pytest.mark.parametrize("with_numpy", [True, False])
+def test_tags_by_author_counts_only_pairs_that_occur(monkeypatch, with_numpy):
+    if not with_numpy:
+        monkeypatch.setattr(summary, "numpy", None)
+    elif summary.numpy is None:
+        pytest.skip("numpy is not installed")
+
+    # 20000 authors with a tag each: a dense authors * tags table would have 400 million cells.
+    builder = summary.SummaryBuilder()
+    builder.add_many(quote(n, f"author {n}", [f"tag {n}"]) for n in range(20000))
+    tags_by_author = builder.summary().tags_by_author
+
+    assert len(tags_by_author) == 20000
+    assert asdict(tags_by_author[123]) == {"author": "author 123", "tags": [{"tag": "tag 123", "count": 1}]}
@@ -1,10 +1,11 @@
-import { useState, useMemo, useEffect } from "react";
+import { useState, useMemo, useEffect, useRef } from "react";
 import Table from "./components/Table/Table";
 import Filters from "./components/Filters/Filters";
 import Chart from "./components/Chart/Chart";
 import DetailPanel from "./components/Detail Panel/DetailPanel.tsx";
 import type { Dataset, Item } from "./libs/Types.tsx";
-import { loadData } from "./libs/LoadData.tsx";
+import { loadData, fetchItems, fetchItem, type ItemsPage } from "./libs/LoadData.tsx";
+import { queryIndex } from "./libs/SearchIndex.tsx";
 import { ChevronLeft, ChevronRight } from "lucide-react";
 import "./App.css";
 
@@ -20,6 +21,10 @@ export default function App() {
     const [currentPage, setCurrentPage] = useState(1);
     const [sortBy, setSortBy] = useState<"title" | "author" | "price" | undefined>();
     const [sortDir, setSortDir] = useState<"asc" | "desc">("asc");
+    // With the API, only the shown page is fetched; cursors[p - 1] is the "after" cursor of page p.
+    const [remotePage, setRemotePage] = useState<ItemsPage | null>(null);
+    const cursors = useRef<(string | null)[]>([null]);
+    const remote = dataset?.remote ?? false;
 
     useEffect(() => {
         loadData()
@@ -30,6 +35,11 @@ export default function App() {
 
     const filteredItems = useMemo(() => {
         if (!dataset) return [];
+        if (dataset.index) {
+            // Intersect the postings of each search word, category and tag instead of scanning every item.
+            const matches = queryIndex(dataset.index, search, filterCategory, filterTag);
+            return matches ? Array.from(matches, (doc) => dataset.items[doc]) : dataset.items;
+        }
         return dataset.items.filter((item) => {
             const matchesSearch =
                 "title" in item
@@ -57,9 +67,36 @@ export default function App() {
         });
     }, [filteredItems, sortBy, sortDir]);
 
-    const totalPages = Math.ceil(sortedItems.length / ITEMS_PER_PAGE);
+    useEffect(() => {
+        if (!remote) return;
+        const controller = new AbortController();
+        cursors.current = cursors.current.slice(0, currentPage);
+        fetchItems(
+            {
+                search,
+                category: filterCategory,
+                tag: filterTag,
+                sortBy,
+                sortDir,
+                after: cursors.current[currentPage - 1] ?? null,
+                limit: ITEMS_PER_PAGE,
+            },
+            controller.signal,
+        )
+            .then((page) => {
+                cursors.current[currentPage] = page.next;
+                setRemotePage(page);
+            })
+            .catch((e) => e.name !== "AbortError" && console.error(e));
+        return () => controller.abort();
+    }, [remote, search, filterCategory, filterTag, sortBy, sortDir, currentPage]);
+
+    const totalItems = remote ? remotePage?.total ?? 0 : sortedItems.length;
+    const totalPages = Math.ceil(totalItems / ITEMS_PER_PAGE);
     const startIndex = (currentPage - 1) * ITEMS_PER_PAGE;
-    const paginatedItems = sortedItems.slice(startIndex, startIndex + ITEMS_PER_PAGE);
+    const paginatedItems = remote
+        ? remotePage?.items ?? []
+        : sortedItems.slice(startIndex, startIndex + ITEMS_PER_PAGE);
 
     const handlePrev = () => setCurrentPage((p) => Math.max(p - 1, 1));
     const handleNext = () => setCurrentPage((p) => Math.min(p + 1, totalPages));
@@ -74,6 +111,12 @@ export default function App() {
         setCurrentPage(1);
     };
 
+    const handleRowClick = (item: Item) => {
+        setSelectedItem(item);
+        // Rows from the API are as stored; the item endpoint adds a quote's author details.
+        if (remote) fetchItem(item.id).then(setSelectedItem).catch(console.error);
+    };
+
     const handleSearch = (value: string) => {
         setSearch(value);
         setCurrentPage(1);
@@ -134,7 +177,7 @@ export default function App() {
                     sortBy={sortBy}
                     sortDir={sortDir}
                     onSortChange={handleSortChange}
-                    onRowClick={setSelectedItem}
+                    onRowClick={handleRowClick}
                 />
             </div>
 
@@ -174,7 +217,7 @@ export default function App() {
                         Page {currentPage} of {totalPages}
                     </small>
                     <small className="text-muted">
-                        {"Item "}{startIndex + 1} – {"Item "}{Math.min(startIndex + ITEMS_PER_PAGE, sortedItems.length)}
+                        {"Item "}{startIndex + 1} – {"Item "}{Math.min(startIndex + ITEMS_PER_PAGE, totalItems)}
                     </small>
                 </div>
             )}
@@ -1,4 +1,5 @@
-import type { Dataset, Item, CategoryCount, RatingCount, TagCount, AuthorCount } from "./Types.tsx";
+import type { AuthorDetails, Dataset, Item, CategoryCount, RatingCount, TagCount, AuthorCount } from "./Types.tsx";
+import { decodeSearchIndex, type SearchIndex, type SearchIndexFile } from "./SearchIndex.tsx";
 
 function fixGarbled(text: string): string {
     return text
@@ -9,76 +10,182 @@ function fixGarbled(text: string): string {
         .replace(/â€�/g, "”");
 }
 
+// Quotes reference their author by author_id; each author's details are stored once, in authors.jsonl.
+async function loadAuthors(): Promise<Map<string, AuthorDetails>> {
+    const authors = new Map<string, AuthorDetails>();
+    const res = await fetch("/data/authors.jsonl");
+    if (!res.ok) return authors;
+    for (const line of (await res.text()).split("\n")) {
+        if (line.trim() === "") continue;
+        try {
+            const author = JSON.parse(line) as AuthorDetails;
+            author.born_location = fixGarbled(author.born_location ?? "");
+            author.description = fixGarbled(author.description ?? "");
+            authors.set(author.id, author);
+        } catch {
+            return authors; // not a JSONL file, e.g. the dev server's index.html fallback
+        }
+    }
+    return authors;
+}
+
+// Applied to every item, whether it comes from items.jsonl or the API.
+function cleanItem(item: Item, authors?: Map<string, AuthorDetails>): Item {
+    if (item.type === "book") {
+        item.title = fixGarbled(item.title);
+        item.category = fixGarbled(item.category);
+    } else if (item.type === "quote") {
+        item.text = fixGarbled(item.text);
+        item.author = fixGarbled(item.author);
+        if (item.tags) {
+            item.tags = item.tags.map(fixGarbled);
+        }
+        if (!item.author_details && item.author_id) {
+            // Shared with every other quote by the same author, not copied.
+            item.author_details = authors?.get(item.author_id);
+        } else if (item.author_details) {
+            // Older files embed the details in each quote.
+            item.author_details.born_location = fixGarbled(item.author_details.born_location ?? "");
+            item.author_details.description = fixGarbled(item.author_details.description ?? "");
+        }
+    }
+    return item;
+}
+
 export async function loadData(): Promise<Dataset> {
-    const res = await fetch("/data/items.jsonl");
+    // With the scraper's api.py running (proxied under /api), items are fetched a page at a time instead.
+    const remote = await loadApiSummary();
+    if (remote) return { ...remote, items: [], remote: true };
+
+    const summaryPromise = loadSummary();
+    const indexPromise = loadSearchIndex();
+    const [res, authors] = await Promise.all([fetch("/data/items.jsonl"), loadAuthors()]);
     const text = await res.text();
 
     const items: Item[] = text
         .split("\n")
         .filter((line) => line.trim() !== "")
-        .map((line) => {
-            const item = JSON.parse(line) as Item;
-
-            if (item.type === "book") {
-                item.title = fixGarbled(item.title);
-                item.category = fixGarbled(item.category);
-            } else if (item.type === "quote") {
-                item.text = fixGarbled(item.text);
-                item.author = fixGarbled(item.author);
-                if (item.tags) {
-                    item.tags = item.tags.map(fixGarbled);
-                }
-                if (item.author_details) {
-                    item.author_details.born_location = fixGarbled(item.author_details.born_location ?? "");
-                    item.author_details.description = fixGarbled(item.author_details.description ?? "");
-                }
-            }
-
-            return item;
-        });
+        .map((line) => cleanItem(JSON.parse(line) as Item, authors));
+
+    // Precomputed by the scraper (summary.json); only re-counted here for data without one.
+    const precomputed = await summaryPromise;
+    // Postings point at line numbers, so an index built for another items.jsonl is ignored.
+    const index = await indexPromise;
+    return {
+        ...(precomputed ?? summarize(items)),
+        items,
+        index: index?.count === items.length ? index : undefined,
+    };
+}
+
+export type ItemsQuery = {
+    search: string;
+    category: string;
+    tag: string;
+    sortBy?: "title" | "author" | "price";
+    sortDir: "asc" | "desc";
+    after: string | null; // the previous page's next cursor
+    limit: number;
+};
+
+export type ItemsPage = { items: Item[]; total: number; limit: number; next: string | null };
+
+export async function fetchItems(query: ItemsQuery, signal?: AbortSignal): Promise<ItemsPage> {
+    const params = new URLSearchParams({ limit: String(query.limit), dir: query.sortDir });
+    if (query.search) params.set("q", query.search);
+    if (query.category) params.set("category", query.category);
+    if (query.tag) params.set("tag", query.tag);
+    if (query.sortBy) params.set("sort", query.sortBy);
+    if (query.after) params.set("after", query.after);
+    const res = await fetch(`/api/items?${params}`, { signal });
+    if (!res.ok) throw new Error(`/api/items: ${res.status}`);
+    const page = (await res.json()) as ItemsPage;
+    page.items = page.items.map((item) => cleanItem(item));
+    return page;
+}
+
+// Full details of one item; quotes come with their author's details.
+export async function fetchItem(id: string): Promise<Item> {
+    const res = await fetch(`/api/items/${encodeURIComponent(id)}`);
+    if (!res.ok) throw new Error(`/api/items/${id}: ${res.status}`);
+    return cleanItem((await res.json()) as Item);
+}
 
+async function loadApiSummary(): Promise<Summary | null> {
+    try {
+        const res = await fetch("/api/summary");
+        return res.ok ? cleanSummary((await res.json()) as Summary) : null;
+    } catch {
+        return null; // no API: the proxy's error page or the dev server's index.html fallback
+    }
+}
+
+type Summary = Omit<Dataset, "items" | "index" | "remote">;
+
+async function loadSearchIndex(): Promise<SearchIndex | null> {
+    const res = await fetch("/data/search_index.json");
+    if (!res.ok) return null;
+    try {
+        return decodeSearchIndex((await res.json()) as SearchIndexFile, fixGarbled);
+    } catch {
+        return null; // e.g. the dev server's index.html fallback
+    }
+}
+
+async function loadSummary(): Promise<Summary | null> {
+    const res = await fetch("/data/summary.json");
+    if (!res.ok) return null;
+    let summary: Summary;
+    try {
+        summary = (await res.json()) as Summary;
+    } catch {
+        return null; // e.g. the dev server's index.html fallback
+    }
+    return cleanSummary(summary);
+}
+
+function cleanSummary(summary: Summary): Summary {
+    // Labels must match the items' cleaned-up strings, which the filters compare against.
+    summary.filters.categories = summary.filters.categories.map(fixGarbled);
+    summary.filters.tags = summary.filters.tags.map(fixGarbled);
+    const s = summary.summary;
+    s.books_by_category.forEach((c) => (c.category = fixGarbled(c.category)));
+    s.quotes_by_tag.forEach((t) => (t.tag = fixGarbled(t.tag)));
+    s.quotes_by_author.forEach((a) => (a.author = fixGarbled(a.author)));
+    return summary;
+}
+
+function countBy<K>(keys: Iterable<K>): Map<K, number> {
+    const counts = new Map<K, number>();
+    for (const key of keys) counts.set(key, (counts.get(key) ?? 0) + 1);
+    return counts;
+}
+
+// One pass per aggregate, for item files without a summary.json next to them.
+function summarize(items: Item[]): Summary {
     const books = items.filter((i) => i.type === "book");
     const quotes = items.filter((i) => i.type === "quote");
 
-    const booksByCategory: CategoryCount[] = Array.from(
-        new Set(books.map((b) => b.category))
-    ).map((category) => ({
-        category,
-        count: books.filter((b) => b.category === category).length,
-    }));
-
-    const booksByRating: RatingCount[] = Array.from(
-        new Set(books.map((b) => b.rating))
-    ).map((rating) => ({
-        rating,
-        count: books.filter((b) => b.rating === rating).length,
-    }));
-
-    const quotesByTag: TagCount[] = Array.from(
-        new Set(quotes.flatMap((q) => q.tags))
-    ).map((tag) => ({
-        tag,
-        count: quotes.filter((q) => q.tags.includes(tag)).length,
-    }));
-
-    const quotesByAuthor: AuthorCount[] = Array.from(
-        new Set(quotes.map((q) => q.author))
-    ).map((author) => ({
-        author,
-        count: quotes.filter((q) => q.author === author).length,
-    }));
-
-    const dataset: Dataset = {
+    const byCategory = countBy(books.map((b) => b.category));
+    const byRating = countBy(books.map((b) => b.rating));
+    const byTag = countBy(quotes.flatMap((q) => q.tags));
+    const byAuthor = countBy(quotes.map((q) => q.author));
+
+    const booksByCategory: CategoryCount[] = Array.from(byCategory, ([category, count]) => ({ category, count }));
+    const booksByRating: RatingCount[] = Array.from(byRating, ([rating, count]) => ({ rating, count }));
+    const quotesByTag: TagCount[] = Array.from(byTag, ([tag, count]) => ({ tag, count }));
+    const quotesByAuthor: AuthorCount[] = Array.from(byAuthor, ([author, count]) => ({ author, count }));
+
+    return {
         meta: {
             dataset: "books_and_quotes",
             generated_at: new Date().toISOString(),
             total_items: items.length,
         },
         filters: {
-            categories: Array.from(new Set(books.map((b) => b.category))),
-            tags: Array.from(new Set(quotes.flatMap((q) => q.tags))),
+            categories: Array.from(byCategory.keys()),
+            tags: Array.from(byTag.keys()),
         },
-        items,
         summary: {
             books_by_category: booksByCategory,
             books_by_rating: booksByRating,
@@ -86,6 +193,4 @@ export async function loadData(): Promise<Dataset> {
             quotes_by_author: quotesByAuthor,
         },
     };
-
-    return dataset;
 }
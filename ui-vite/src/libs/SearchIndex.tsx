@@ -0,0 +1,105 @@
+// Postings are sorted item positions (line numbers in items.jsonl), as written by the scraper's search_index.py.
+export type Postings = Uint32Array;
+
+export type SearchIndex = {
+    count: number;
+    tokens: string[]; // sorted, for prefix lookups
+    postings: Map<string, Postings>;
+    categories: Map<string, Postings>;
+    tags: Map<string, Postings>;
+    authors: Map<string, Postings>;
+};
+
+export type SearchIndexFile = {
+    version: number;
+    count: number;
+    encoding: "delta";
+    tokens: Record<string, number[]>;
+    categories: Record<string, number[]>;
+    tags: Record<string, number[]>;
+    authors: Record<string, number[]>;
+};
+
+// Same tokens as the scraper: lower-cased runs of letters, digits and underscores.
+export function tokenize(text: string): string[] {
+    return text.toLowerCase().match(/[\p{L}\p{N}_]+/gu) ?? [];
+}
+
+function undelta(gaps: number[]): Postings {
+    const out = new Uint32Array(gaps.length);
+    let doc = 0;
+    gaps.forEach((gap, i) => (out[i] = doc += gap));
+    return out;
+}
+
+function decode(postings: Record<string, number[]>, key: (k: string) => string = (k) => k): Map<string, Postings> {
+    return new Map(Object.entries(postings).map(([k, gaps]) => [key(k), undelta(gaps)]));
+}
+
+// key maps stored labels to the ones the filters show (the UI cleans up garbled text).
+export function decodeSearchIndex(file: SearchIndexFile, key?: (k: string) => string): SearchIndex {
+    const postings = decode(file.tokens);
+    return {
+        count: file.count,
+        tokens: Array.from(postings.keys()).sort(),
+        postings,
+        categories: decode(file.categories, key),
+        tags: decode(file.tags, key),
+        authors: decode(file.authors, key),
+    };
+}
+
+export function intersect(a: Postings, b: Postings): Postings {
+    const out = new Uint32Array(Math.min(a.length, b.length));
+    let i = 0, j = 0, n = 0;
+    while (i < a.length && j < b.length) {
+        if (a[i] < b[j]) i++;
+        else if (a[i] > b[j]) j++;
+        else {
+            out[n++] = a[i];
+            i++;
+            j++;
+        }
+    }
+    return out.subarray(0, n);
+}
+
+const EMPTY: Postings = new Uint32Array(0);
+
+// Items containing the prefix as the start of any token, e.g. "harr" for "harry".
+function prefixPostings(index: SearchIndex, prefix: string): Postings {
+    let lo = 0, hi = index.tokens.length;
+    while (lo < hi) {
+        const mid = (lo + hi) >> 1;
+        if (index.tokens[mid] < prefix) lo = mid + 1;
+        else hi = mid;
+    }
+    const docs = new Set<number>();
+    for (let i = lo; i < index.tokens.length && index.tokens[i].startsWith(prefix); i++) {
+        index.postings.get(index.tokens[i])!.forEach((doc) => docs.add(doc));
+    }
+    return Uint32Array.from(docs).sort();
+}
+
+// Positions of the items matching every given constraint, or null when there is none (all items match).
+// Every search word must be a token of the title or quote; the last one may be the start of a token.
+export function queryIndex(
+    index: SearchIndex,
+    search: string,
+    category?: string,
+    tag?: string,
+    author?: string,
+): Postings | null {
+    const words = tokenize(search);
+    const constraints: (Postings | undefined)[] = words.slice(0, -1).map((word) => index.postings.get(word));
+    if (words.length) constraints.push(prefixPostings(index, words[words.length - 1]));
+    if (category) constraints.push(index.categories.get(category));
+    if (tag) constraints.push(index.tags.get(tag));
+    if (author) constraints.push(index.authors.get(author));
+
+    let result: Postings | null = null;
+    for (const postings of constraints) {
+        result = result === null ? postings ?? EMPTY : intersect(result, postings ?? EMPTY);
+    }
+    return result;
+}
@@ -1,3 +1,5 @@
+import type { SearchIndex } from "./SearchIndex.tsx";
+
 export type BookItem = {
     id: string;
     type: "book";
@@ -25,6 +27,7 @@ export type QuoteItem = {
     author: string;
     tags: string[];
     page_url: string;
+    author_id?: string;
     author_details?: AuthorDetails;
 };
 
@@ -34,12 +37,20 @@ export type CategoryCount = { category: string; count: number };
 export type RatingCount = { rating: number; count: number };
 export type TagCount = { tag: string; count: number };
 export type AuthorCount = { author: string; count: number };
+export type PriceBucket = { low: number; high: number; count: number };
+// counts[r] = books rated r, r = 0 (unknown) to 5
+export type CategoryRatings = { category: string; counts: number[] };
+export type AuthorTags = { author: string; tags: TagCount[] };
 
 export type SummaryData = {
     books_by_category: CategoryCount[];
     books_by_rating: RatingCount[];
     quotes_by_tag: TagCount[];
     quotes_by_author: AuthorCount[];
+    // Computed by the scraper only; absent when the UI had to count items itself.
+    price_histogram?: PriceBucket[];
+    ratings_by_category?: CategoryRatings[];
+    tags_by_author?: AuthorTags[];
 };
 
 export type MetaInfo = { dataset: string; generated_at: string; total_items: number };
@@ -50,4 +61,8 @@ export type Dataset = {
     filters: Filters;
     items: Item[];
     summary: SummaryData;
+    // Inverted index over items (search_index.json); absent when filtering has to scan items.
+    index?: SearchIndex;
+    // Served by the scraper's api.py: items is empty and each page is fetched (fetchItems()).
+    remote?: boolean;
 };
@@ -4,4 +4,8 @@ import react from '@vitejs/plugin-react'
 // https://vite.dev/config/
 export default defineConfig({
   plugins: [react()],
+  server: {
+    // The scraper's query API (python src/api.py); without it the UI loads public/data instead.
+    proxy: { '/api': 'http://127.0.0.1:8000' },
+  },
 })